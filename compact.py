@@ -0,0 +1,214 @@
+import sys
+import copy
+from collections.abc import MutableMapping
+
+
+"""
+A compact alternative to the plain dicts of the JSON picture. Frequent
+attributes are stored in __slots__, rare attributes in a side dict, and
+the key order (needed to reproduce the JSON exactly) is a tuple shared by
+all objects created with the same keys in the same order.
+"""
+_orders = {}
+_missing = object()
+
+
+def _intern_order(order):
+  return _orders.setdefault(order, order)
+
+
+def _intern(value):
+  if isinstance(value, str) and len(value) <= 32:
+    return sys.intern(value)
+  return value
+
+
+class CompactObject(MutableMapping):
+  __slots__ = ("_order", "_extra")
+  _slot_of = {}
+
+  def __init__(self, *args, **kwargs):
+    self._order = ()
+    self._extra = None
+    self.update(*args, **kwargs)
+
+  def __getitem__(self, key):
+    slot = self._slot_of.get(key)
+    if slot is not None:
+      value = getattr(self, slot, _missing)
+      if value is _missing:
+        raise KeyError(key)
+      return value
+    if self._extra is None:
+      raise KeyError(key)
+    return self._extra[key]
+
+  def get(self, key, default=None):
+    slot = self._slot_of.get(key)
+    if slot is not None:
+      return getattr(self, slot, default)
+    if self._extra is None:
+      return default
+    return self._extra.get(key, default)
+
+  def __contains__(self, key):
+    slot = self._slot_of.get(key)
+    if slot is not None:
+      return hasattr(self, slot)
+    return self._extra is not None and key in self._extra
+
+  def __setitem__(self, key, value):
+    key = sys.intern(key)
+    slot = self._slot_of.get(key)
+    if slot is not None:
+      if not hasattr(self, slot):
+        self._order = _intern_order(self._order + (key,))
+      setattr(self, slot, value)
+      return
+    if self._extra is None:
+      self._extra = {}
+    if key not in self._extra:
+      self._order = _intern_order(self._order + (key,))
+    self._extra[key] = value
+
+  def __delitem__(self, key):
+    slot = self._slot_of.get(key)
+    if slot is not None:
+      if not hasattr(self, slot):
+        raise KeyError(key)
+      delattr(self, slot)
+    else:
+      if self._extra is None:
+        raise KeyError(key)
+      del self._extra[key]
+      if len(self._extra) == 0:
+        self._extra = None
+    self._order = _intern_order(tuple(k for k in self._order if k != key))
+
+  def __iter__(self):
+    return iter(self._order)
+
+  def __len__(self):
+    return len(self._order)
+
+  def __repr__(self):
+    return repr(dict(self.items()))
+
+  def __copy__(self):
+    ret = type(self).__new__(type(self))
+    ret._order = self._order
+    ret._extra = None if self._extra is None else dict(self._extra)
+    for slot in type(self).__slots__:
+      value = getattr(self, slot, _missing)
+      if value is not _missing:
+        setattr(ret, slot, value)
+    return ret
+
+  def __deepcopy__(self, memo):
+    ret = type(self).__new__(type(self))
+    memo[id(self)] = ret
+    ret._order = self._order
+    ret._extra = copy.deepcopy(self._extra, memo)
+    for slot in type(self).__slots__:
+      value = getattr(self, slot, _missing)
+      if value is not _missing:
+        setattr(ret, slot, copy.deepcopy(value, memo))
+    return ret
+
+  def copy(self):
+    return self.__copy__()
+
+
+def _compact_class(name, keys):
+  slot_of = {key: sys.intern("_" + key.replace(".", "_")) for key in keys}
+  return type(name, (CompactObject,), {
+      "__slots__": tuple(slot_of.values()),
+      "_slot_of": slot_of,
+  })
+
+
+_node_keys = [
+    "type", "id", "name", "text", "at", "at.anchor", "anchor", "align",
+    "draw", "fill", "color", "text.color", "text.width", "line.width",
+    "rounded.corners", "xshift", "yshift", "scale", "rotate", "inner.sep",
+    "width", "height", "in_path", "midway", "above", "sloped",
+]
+CompactBox = _compact_class("CompactBox", _node_keys)
+CompactText = _compact_class("CompactText", _node_keys)
+CompactPath = _compact_class("CompactPath", [
+    "type", "items", "draw", "fill", "color", "line.width", "dashed",
+    "stealth", "reversed.stealth", "double.stealth",
+])
+CompactCoordinate = _compact_class("CompactCoordinate",
+                                   ["type", "x", "y", "relative"])
+CompactNodename = _compact_class("CompactNodename",
+                                 ["type", "name", "anchor",
+                                  "xshift", "yshift"])
+CompactIntersection = _compact_class("CompactIntersection",
+                                     ["type", "name1", "name2",
+                                      "anchor1", "anchor2"])
+CompactLine = _compact_class("CompactLine",
+                             ["type", "in", "out", "annotates"])
+CompactArc = _compact_class("CompactArc",
+                            ["type", "start", "end", "radius", "annotates"])
+CompactItem = _compact_class("CompactItem", ["type"])
+
+
+_class_of_type = {
+    "box": CompactBox,
+    "text": CompactText,
+    "path": CompactPath,
+    "coordinate": CompactCoordinate,
+    "nodename": CompactNodename,
+    "intersection": CompactIntersection,
+    "line": CompactLine,
+    "arc": CompactArc,
+}
+
+
+def to_compact(value):
+  if isinstance(value, dict):
+    cls = _class_of_type.get(value.get("type"), CompactItem)
+    slot_of = cls._slot_of
+    ret = cls.__new__(cls)
+    ret._extra = None
+    keys = []
+    for key, v in value.items():
+      key = sys.intern(key)
+      keys.append(key)
+      v = to_compact(v)
+      slot = slot_of.get(key)
+      if slot is None:
+        if ret._extra is None:
+          ret._extra = {}
+        ret._extra[key] = v
+      else:
+        setattr(ret, slot, v)
+    ret._order = _intern_order(tuple(keys))
+    return ret
+  if isinstance(value, list):
+    return [to_compact(v) for v in value]
+  return _intern(value)
+
+
+def from_compact(value):
+  if isinstance(value, (dict, CompactObject)):
+    return {key: from_compact(v) for key, v in value.items()}
+  if isinstance(value, list):
+    return [from_compact(v) for v in value]
+  return value
+
+
+def is_mapping(value):
+  return isinstance(value, (dict, CompactObject))
+
+
+def json_default(value):
+  """
+  Pass to json.dumps as the default, so that pictures mixing compact
+  objects and plain dicts are dumped exactly like the JSON they came from.
+  """
+  if isinstance(value, CompactObject):
+    return dict(value.items())
+  raise TypeError(f"Object of type {type(value).__name__} "
+                  "is not JSON serializable")
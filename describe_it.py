@@ -340,7 +340,7 @@ class DescribeIt(object):
       self.delete_objects_related_to_id(id_, deleted_ids)
 
   def paste_data(self, data, atx, aty, check_all_relative_pos=False,
-                 bounding_boxes=None):
+                 bounding_boxes=None, path_boxes=None):
     if len(data) == 0:
       return
     pos = get_first_absolute_coordinate(data)
@@ -350,7 +350,7 @@ class DescribeIt(object):
       if bounding_boxes is None:
         raise ValueError("Must provide the bounding boxes "
                          "if not check relative positions")
-      pos = get_top_left_corner(data, bounding_boxes)
+      pos = get_top_left_corner(data, bounding_boxes, path_boxes)
     x0, y0 = pos
     dx, dy = atx - x0, aty - y0
     old_to_new_id_dict = {}
@@ -2,6 +2,7 @@ import tkinter as tk
 import argparse
 import os
 from english2tikz.gui.editor import Editor
+from english2tikz.gui.preview import write_preview
 
 
 screen_width, screen_height = 1200, 750
@@ -15,6 +16,9 @@ if __name__ == "__main__":
   canvas.pack()
   parser = argparse.ArgumentParser(prog="vimdraw")
   parser.add_argument('filename', nargs='?')
+  parser.add_argument('--preview', metavar='OUTPUT',
+                      help='write a .svg or .png preview of the picture '
+                           'without LaTeX and exit')
   args = parser.parse_args()
 
   editor = Editor(root, canvas, screen_width, screen_height)
@@ -23,6 +27,11 @@ if __name__ == "__main__":
     editor.filename = filename
     if os.path.exists(filename):
       editor._read(filename)
+  if args.preview is not None:
+    write_preview(editor._context._picture, canvas, args.preview)
+    root.destroy()
+    exit(0)
+  editor.start_journal(args.filename)
 
   root.title("Vim Draw")
   root.minsize(screen_width, screen_height)
@@ -0,0 +1,312 @@
+import io
+import math
+import html
+import base64
+from PIL import Image, ImageDraw, ImageFont, ImageColor
+from english2tikz.utils import *
+from english2tikz.gui.display_list import *
+from english2tikz.gui.image_utils import image_cache
+
+
+"""
+Backends consuming display lists. TkBackend keeps the canvas in sync
+with the latest display list, changing only the items that differ from
+the previous one; render_pil and render_svg draw a display list into an
+image or a document; RecordingBackend keeps what it is given, for tests.
+"""
+tk_points_per_pixel = 0.75
+pil_font_names = ["DejaVuSerif.ttf", "Times New Roman.ttf", "times.ttf",
+                  "LiberationSerif-Regular.ttf"]
+_fonts = {}
+
+
+def _color(value):
+  if value is None or value == "":
+    return None
+  try:
+    return ImageColor.getrgb(value)
+  except ValueError:
+    return (0, 0, 0)
+
+
+def _font(font):
+  if font is None:
+    font = ("Times New Roman", 12, "normal")
+  size = max(int(round(abs(font[1]) / tk_points_per_pixel)), 1)
+  ret = _fonts.get(size)
+  if ret is None:
+    for name in pil_font_names:
+      try:
+        ret = ImageFont.truetype(name, size)
+        break
+      except OSError:
+        continue
+    if ret is None:
+      ret = ImageFont.load_default()
+    _fonts[size] = ret
+  return ret
+
+
+def _arrowhead(draw, tip, base, width, fill):
+  d1, d2, d3 = default_arrowshape
+  (x1, y1), (x0, y0) = tip, base
+  length = math.hypot(x1 - x0, y1 - y0)
+  if length == 0:
+    return
+  ux, uy = (x1 - x0) / length, (y1 - y0) / length
+  half = d3 + width / 2
+  bx, by = x1 - ux * d2, y1 - uy * d2
+  draw.polygon([(x1, y1), (bx - uy * half, by + ux * half),
+                (x1 - ux * d1, y1 - uy * d1),
+                (bx + uy * half, by - ux * half)], fill=fill)
+
+
+def draw_item(img, draw, kind, coords, kwargs, bound, dx, dy):
+  """
+  Draw a primitive on a PIL image, shifted by (dx, dy). Dashes and
+  smoothing are not reproduced.
+  """
+  points = [(coords[i] + dx, coords[i+1] + dy)
+            for i in range(0, len(coords) - 1, 2)]
+  width = kwargs.get("width")
+  width = 1 if width is None else max(int(round(float(width))), 1)
+  fill = _color(kwargs.get("fill", "black" if kind in ["line", "text"]
+                           else None))
+  outline = _color(kwargs.get("outline", "black"))
+  if kind == "line":
+    if fill is None or len(points) < 2:
+      return
+    draw.line(points, fill=fill, width=width)
+    arrow = kwargs.get("arrow")
+    if arrow in ["last", "both"]:
+      _arrowhead(draw, points[-1], points[-2], width, fill)
+    if arrow in ["first", "both"]:
+      _arrowhead(draw, points[0], points[1], width, fill)
+  elif kind in ["rectangle", "oval", "arc"]:
+    (x0, y0), (x1, y1) = points[0], points[1]
+    box = [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)]
+    if kind == "rectangle":
+      draw.rectangle(box, fill=fill, outline=outline, width=width)
+    elif kind == "oval":
+      draw.ellipse(box, fill=fill, outline=outline, width=width)
+    else:
+      start = float(kwargs.get("start", 0))
+      extent = float(kwargs.get("extent", 90))
+      if outline is not None:
+        """
+        Tk measures angles counterclockwise and PIL clockwise
+        """
+        draw.arc(box, -(start + max(extent, 0)), -(start + min(extent, 0)),
+                 fill=outline, width=width)
+  elif kind == "polygon":
+    if len(points) < 2:
+      return
+    draw.polygon(points, fill=fill, outline=outline)
+  elif kind == "text":
+    x0, y0, x1, y1 = bound
+    font = _font(kwargs.get("font"))
+    text = str(kwargs.get("text", ""))
+    angle = kwargs.get("angle", 0) or 0
+    if angle % 360 == 0:
+      draw.multiline_text((x0 + dx, y0 + dy), text, fill=fill, font=font)
+    else:
+      w, h = draw.multiline_textbbox((0, 0), text, font=font)[2:]
+      layer = Image.new("RGBA", (max(w, 1), max(h, 1)), (0, 0, 0, 0))
+      ImageDraw.Draw(layer).multiline_text((0, 0), text, fill=fill,
+                                           font=font)
+      layer = layer.rotate(angle, expand=True)
+      cx, cy = (x0 + x1) / 2 + dx, (y0 + y1) / 2 + dy
+      img.alpha_composite(layer, (int(cx - layer.width / 2),
+                                  int(cy - layer.height / 2)))
+  elif kind == "image":
+    source = image_cache.source(kwargs["image"])
+    if source is None:
+      return
+    x0, y0, _, _ = bound
+    x0, y0 = int(round(x0 + dx)), int(round(y0 + dy))
+    """
+    alpha_composite does not take negative offsets, so crop instead
+    """
+    cx, cy = max(-x0, 0), max(-y0, 0)
+    if cx >= source.width or cy >= source.height:
+      return
+    if cx > 0 or cy > 0:
+      source = source.crop((cx, cy, source.width, source.height))
+    if x0 + cx < img.width and y0 + cy < img.height:
+      img.alpha_composite(source.convert("RGBA"), (x0 + cx, y0 + cy))
+
+
+def render_pil(display_list, width, height, dx=0, dy=0,
+               background=(0, 0, 0, 0)):
+  img = Image.new("RGBA", (width, height), background)
+  draw = ImageDraw.Draw(img)
+  for kind, coords, style, bound, _ in display_list.items():
+    draw_item(img, draw, kind, coords, style, bound, dx, dy)
+  return img
+
+
+class TkBackend(object):
+  """
+  Primitives equal to one of the previous display list keep their item,
+  as long as this keeps the items in drawing order; the others are
+  created, and placed below the item that follows them, and the items
+  left over are deleted.
+  """
+  def __init__(self, canvas):
+    self._canvas = canvas
+    self._items = []
+    self.created = 0
+    self.deleted = 0
+
+  def update(self, display_list):
+    c = self._canvas
+    available = {}
+    for index, (sig, item) in enumerate(self._items):
+      available.setdefault(sig, []).append((index, item))
+    for entries in available.values():
+      entries.reverse()
+    last = -1
+    plan = []
+    for primitive in display_list.items():
+      sig = signature(primitive)
+      entries = available.get(sig)
+      reused = None
+      while entries:
+        index, item = entries.pop()
+        if index > last:
+          reused, last = item, index
+          break
+      plan.append((sig, primitive, reused))
+    kept = {item for _, _, item in plan if item is not None}
+    stale = [item for _, item in self._items if item not in kept]
+    if len(stale) > 0:
+      c.delete(*stale)
+      self.deleted += len(stale)
+    items = []
+    above = None
+    for sig, primitive, item in reversed(plan):
+      if item is None:
+        kind, coords, style, _, _ = primitive
+        item = getattr(c, f"create_{kind}")(*coords, **style)
+        self.created += 1
+        if above is not None:
+          c.tag_lower(item, above)
+      items.append((sig, item))
+      above = item
+    items.reverse()
+    self._items = items
+
+  def clear(self):
+    if len(self._items) > 0:
+      self._canvas.delete(*[item for _, item in self._items])
+    self._items = []
+
+
+def _svg_color(value):
+  if value is None or value == "":
+    return "none"
+  return value
+
+
+def _svg_style(kind, style):
+  width = style.get("width")
+  width = 1 if width is None else float(width)
+  if kind in ["line", "arc"]:
+    stroke = style.get("fill" if kind == "line" else "outline", "black")
+    fill = "none"
+  else:
+    stroke = style.get("outline", "black" if kind != "polygon" else "")
+    fill = style.get("fill", "")
+  attrs = (f'fill="{_svg_color(fill)}" stroke="{_svg_color(stroke)}" '
+           f'stroke-width="{width:g}"')
+  if style.get("dash") is not None:
+    attrs += f' stroke-dasharray="{style["dash"]}"'
+  return attrs
+
+
+def render_svg(display_list, width, height):
+  lines = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+           f'height="{height}" viewBox="0 0 {width} {height}">']
+  for kind, coords, style, bound, _ in display_list.items():
+    points = " ".join(f"{coords[i]:g},{coords[i+1]:g}"
+                      for i in range(0, len(coords) - 1, 2))
+    attrs = _svg_style(kind, style)
+    if kind == "line":
+      lines.append(f'<polyline points="{points}" {attrs}/>')
+    elif kind == "polygon":
+      lines.append(f'<polygon points="{points}" {attrs}/>')
+    elif kind in ["rectangle", "oval", "arc"]:
+      x0, y0, x1, y1 = coords[:4]
+      x0, x1 = min(x0, x1), max(x0, x1)
+      y0, y1 = min(y0, y1), max(y0, y1)
+      if kind == "rectangle":
+        lines.append(f'<rect x="{x0:g}" y="{y0:g}" width="{x1-x0:g}" '
+                     f'height="{y1-y0:g}" {attrs}/>')
+      elif kind == "oval":
+        lines.append(f'<ellipse cx="{(x0+x1)/2:g}" cy="{(y0+y1)/2:g}" '
+                     f'rx="{(x1-x0)/2:g}" ry="{(y1-y0)/2:g}" {attrs}/>')
+      else:
+        cx, cy, rx, ry = (x0+x1)/2, (y0+y1)/2, (x1-x0)/2, (y1-y0)/2
+        start = math.radians(float(style.get("start", 0)))
+        end = start + math.radians(float(style.get("extent", 90)))
+        sx, sy = cx + rx * math.cos(start), cy - ry * math.sin(start)
+        ex, ey = cx + rx * math.cos(end), cy - ry * math.sin(end)
+        large = 1 if abs(end - start) > math.pi else 0
+        sweep = 0 if end > start else 1
+        lines.append(f'<path d="M {sx:g} {sy:g} A {rx:g} {ry:g} 0 {large} '
+                     f'{sweep} {ex:g} {ey:g}" {attrs}/>')
+    elif kind == "text":
+      x0, y0, x1, y1 = bound
+      fill = _svg_color(style.get("fill", "black"))
+      font = style.get("font")
+      size = 12 if font is None else abs(font[1]) / tk_points_per_pixel
+      family = "serif" if font is None else font[0]
+      """
+      The text is centered in its bound, as Tk draws it around its
+      anchor, one tspan per line, and rotated about the center, clockwise
+      in SVG as in PIL
+      """
+      cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+      rows = str(style.get("text", "")).split("\n")
+      angle = style.get("angle", 0) or 0
+      transform = ""
+      if angle % 360 != 0:
+        transform = f' transform="rotate({-angle:g} {cx:g} {cy:g})"'
+      first = -(len(rows) - 1) * 0.6
+      tspans = "".join(f'<tspan x="{cx:g}" dy="{first if i == 0 else 1.2:g}'
+                       f'em">{html.escape(row)}</tspan>'
+                       for i, row in enumerate(rows))
+      lines.append(f'<text x="{cx:g}" y="{cy:g}" fill="{fill}" '
+                   f'font-family="{family}" font-size="{size:g}" '
+                   f'text-anchor="middle" dominant-baseline="central"'
+                   f'{transform}>{tspans}</text>')
+    elif kind == "image":
+      x0, y0, x1, y1 = bound
+      source = image_cache.source(style["image"])
+      if source is None:
+        continue
+      data = io.BytesIO()
+      source.save(data, format="PNG")
+      data = base64.b64encode(data.getvalue()).decode("ascii")
+      lines.append(f'<image x="{x0:g}" y="{y0:g}" width="{x1-x0:g}" '
+                   f'height="{y1-y0:g}" '
+                   f'href="data:image/png;base64,{data}"/>')
+  lines.append("</svg>")
+  return "\n".join(lines)
+
+
+class RecordingBackend(object):
+  """
+  Keeps the primitives of every display list it is given, without the
+  Tk specific style objects, for tests to compare
+  """
+  def __init__(self):
+    self.frames = []
+
+  def update(self, display_list):
+    self.frames.append([(kind, tuple(coords), source)
+                        for kind, coords, _, _, source
+                        in display_list.items()])
+
+  def last(self):
+    return self.frames[-1] if len(self.frames) > 0 else []
@@ -1,66 +1,112 @@
 """
 Modified from
 https://git.sr.ht/~torresjrjr/Bezier.py/tree/bc87b14eaa226f8fb68d2925fb4f37c3344418c1/item/Bezier.py
-Modified to avoid using numpy
 Bezier, a module for creating Bezier curves.
 Version 1.1, from < BezierCurveFunction-v1.ipynb > on 2019-05-02
+
+Curves are evaluated in the Bernstein basis for all t values at once,
+with NumPy if it is available, and in pure Python otherwise.
 """
+import math
+from collections import OrderedDict
+try:
+  import numpy as np
+except ImportError:
+  np = None
 
 
-class Bezier():
-  def TwoPoints(t, P1, P2):
-    assert len(P1) == 2
-    assert len(P2) == 2
-    assert isinstance(P1[0], float) or isinstance(P1[0], int)
-    assert isinstance(P1[1], float) or isinstance(P1[1], int)
-    """
-    Returns a point between P1 and P2, parametised by t.
-    """
+"""
+Flattened curves, keyed by the control points and the tolerance.
+"""
+flattened_curves = OrderedDict()
+flattened_curves_limit = 4096
+min_flatten_steps = 16
+max_flatten_steps = 4096
 
-    Q1 = [(1 - t) * e1 + t * e2 for e1, e2 in zip(P1, P2)]
-    assert len(Q1) == 2
-    assert isinstance(Q1[0], float) or isinstance(Q1[0], int)
-    return Q1
 
-  def Points(t, *points):
-    """
-    Returns a list of points interpolated by the Bezier process
-    """
-    newpoints = []
-    for i in range(0, len(points) - 1):
-      point = Bezier.TwoPoints(t, points[i], points[i + 1])
-      assert isinstance(point, list)
-      assert len(point) == 2
-      assert isinstance(point[0], float) or isinstance(point[0], int)
-      assert isinstance(point[1], float) or isinstance(point[1], int)
-      newpoints.append(point)
-    assert isinstance(newpoints, list)
-    assert isinstance(newpoints[0], list)
-    assert isinstance(newpoints[0][0], float) or isinstance(
-        newpoints[0][1], int)
-    return newpoints
+def _binomials(n):
+  return [math.comb(n, i) for i in range(n + 1)]
+
+
+def _evaluate_python(t_values, points):
+  n = len(points) - 1
+  coeffs = _binomials(n)
+  ret = []
+  for t in t_values:
+    s = 1 - t
+    x, y = 0, 0
+    for i, (px, py) in enumerate(points):
+      b = coeffs[i] * (t ** i) * (s ** (n - i))
+      x += b * px
+      y += b * py
+    ret.append((x, y))
+  return ret
+
 
+def _evaluate_numpy(t_values, points):
+  n = len(points) - 1
+  t = np.asarray(t_values, dtype=float)[:, None]
+  i = np.arange(n + 1)
+  basis = np.asarray(_binomials(n), dtype=float) * t ** i * (1 - t) ** (n - i)
+  curve = basis @ np.asarray(points, dtype=float)
+  return [(x, y) for x, y in curve.tolist()]
+
+
+def _evaluate(t_values, points):
+  if np is not None:
+    return _evaluate_numpy(t_values, points)
+  return _evaluate_python(t_values, points)
+
+
+def flatten_steps(points, tolerance):
+  """
+  Wang's formula: the number of uniform steps after which every chord of
+  the curve stays within the given distance of the curve itself.
+  """
+  n = len(points) - 1
+  if n < 2:
+    return 1
+  longest = 0
+  for i in range(n - 1):
+    dx = points[i+2][0] - 2 * points[i+1][0] + points[i][0]
+    dy = points[i+2][1] - 2 * points[i+1][1] + points[i][1]
+    longest = max(longest, math.sqrt(dx * dx + dy * dy))
+  steps = math.ceil(math.sqrt(n * (n - 1) * longest / (8 * tolerance)))
+  return steps
+
+
+class Bezier():
   def Point(t, *points):
     """
     Returns a point interpolated by the Bezier process
     """
-    newpoints = points
-    while len(newpoints) > 1:
-      newpoints = Bezier.Points(t, *newpoints)
-    assert len(newpoints) == 1, f"Got new points = {newpoints}"
-    assert isinstance(newpoints[0], list), f"Got newpoints[0] = {newpoints[0]}"
-    assert len(newpoints[0]) == 2, f"Got newpoints[0] = {newpoints[0]}"
-    assert isinstance(newpoints[0][0], float) or isinstance(
-        newpoints[0][0], int), f"Got type {type(newpoints[0][0])}"
-    return newpoints[0]
+    return list(_evaluate_python([t], points)[0])
 
   def Curve(t_values, *points):
     """
-    Returns a point interpolated by the Bezier process
+    Returns the points interpolated by the Bezier process
     """
-    return [Bezier.Point(t, *points) for t in t_values]
+    return [list(point) for point in _evaluate(t_values, points)]
 
   def generate_line_segments(*points, steps=100):
     t_values = [i/steps for i in range(steps+1)]
-    curve = Bezier.Curve(t_values, *points)
-    return [(x, y) for x, y in curve]
+    return _evaluate(t_values, points)
+
+  def flatten(*points, tolerance=0.01):
+    """
+    Returns a polyline approximating the curve within the tolerance,
+    sampled uniformly in t so that positions along the curve can still
+    be looked up by index.
+    """
+    key = (tuple((float(x), float(y)) for x, y in points), tolerance)
+    curve = flattened_curves.get(key)
+    if curve is not None:
+      flattened_curves.move_to_end(key)
+      return curve
+    steps = flatten_steps(key[0], tolerance)
+    steps = min(max(steps, min_flatten_steps), max_flatten_steps)
+    curve = tuple(Bezier.generate_line_segments(*key[0], steps=steps))
+    flattened_curves[key] = curve
+    if len(flattened_curves) > flattened_curves_limit:
+      flattened_curves.popitem(last=False)
+    return curve
@@ -4,7 +4,7 @@ from english2tikz.gui.geometry import *
 
 class BoundingBox(object):
   def __init__(self, x, y, width, height, shape="rectangle", angle=0,
-               center=None, obj=None, points=None):
+               center=None, obj=None, points=None, rounded=0):
     self._x = x
     self._y = y
     self._width = width
@@ -13,6 +13,7 @@ class BoundingBox(object):
     self._shape = shape
     self._obj = obj
     self._points = points
+    self._rounded = rounded
     if center is None:
       self._centerx = x + width/2
       self._centery = y + width/2
@@ -240,33 +241,35 @@ class BoundingBox(object):
     x0p, y0p = self.geometry_center()
     x1p, y1p = self.rev_rotate(x1, y1)
     if self._shape == "rectangle":
-      cliped_point = clip_line(x0p, y0p, x1p, y1p,
-                               (self._x, self._y, self._width, self._height))
+      rect = (self._x, self._y, self._width, self._height)
+      if self._rounded:
+        cliped_point = clip_line_rounded_rect(x0p, y0p, x1p, y1p,
+                                              rect, self._rounded)
+      else:
+        cliped_point = clip_line(x0p, y0p, x1p, y1p, rect)
       if cliped_point is None:
         return None
       return self.rotate(*cliped_point)
 
     if self._shape == "circle":
-      distance = euclidean_dist((x0, y0), (x1, y1))
       r = self.radius()
-      return (x1 - x0) / distance * r + x0, (y1 - y0) / distance * r + y0
+      return ray_ellipse_point(x0, y0, r, r, x1, y1)
 
     if self._shape == "ellipse":
       a, b = self.radius()
-      sx1p = (x1p - x0p) / a + x0p
-      sy1p = (y1p - y0p) / b + y0p
-      distance = euclidean_dist((x0p, y0p), (sx1p, sy1p))
-      sx1p = (sx1p - x0p) / distance * a + x0p
-      sy1p = (sy1p - y0p) / distance * b + y0p
-      return self.rotate(sx1p, sy1p)
+      point = ray_ellipse_point(x0p, y0p, a, b, x1p, y1p)
+      if point is None:
+        return None
+      return self.rotate(*point)
 
     raise ValueError(f"Cannot compute direction from a shape: {self._shape}")
 
   def clip_curve(self, curve):
-    for i in range(len(curve)):
-      if not self.contain_point(*curve[i], strict=True):
-        return curve[i:]
-    return None
+    i = last_exit_index(
+        curve, lambda x, y: self.contain_point(x, y, strict=True))
+    if i is None:
+      return None
+    return curve[i:]
 
 
 def shift_by_anchor(x, y, anchor, width, height):
@@ -287,7 +290,41 @@ def enlarge_bound_box(x0, y0, x1, y1, x, y):
   return x0, y0, x1, y1
 
 
-def get_bounding_box(data, bounding_boxes):
+def union_bound(bbs):
+  x0, y0, x1, y1 = None, None, None, None
+  for bb in bbs:
+    x2, y2, x3, y3 = bb.get_bound()
+    x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
+    x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
+  if x0 is None:
+    return None
+  return x0, y0, x1, y1
+
+
+def get_path_bound(path, bounding_boxes, path_boxes=None):
+  """
+  The drawer records the segment boxes of every path it draws, keyed by
+  the identity of the path. Paths that were not drawn, e.g. copies in
+  the clipboard, are bounded by their positions instead.
+  """
+  if path_boxes is not None:
+    entry = path_boxes.get(id(path))
+    if entry is not None and entry[0] is path:
+      return entry[2]
+  from english2tikz.gui.object_utils import generate_path_positions_and_draws
+  try:
+    positions, _ = generate_path_positions_and_draws(path, bounding_boxes)
+  except KeyError:
+    return None
+  x0, y0, x1, y1 = None, None, None, None
+  for (x, y), _, _, _ in positions:
+    x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x, y)
+  if x0 is None:
+    return None
+  return x0, y0, x1, y1
+
+
+def get_bounding_box(data, bounding_boxes, path_boxes=None):
   x0, y0, x1, y1 = None, None, None, None
   for obj in data:
     id_ = obj.get("id")
@@ -297,12 +334,12 @@ def get_bounding_box(data, bounding_boxes):
       x2, y2, x3, y3 = bb.get_bound()
       x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
       x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
-    else:
-      for id_, bb in bounding_boxes.items():
-        if obj == bb._obj:
-          x2, y2, x3, y3 = bb.get_bound()
-          x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
-          x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
+    elif "items" in obj:
+      bound = get_path_bound(obj, bounding_boxes, path_boxes)
+      if bound is not None:
+        x2, y2, x3, y3 = bound
+        x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
+        x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
     if "items" in obj:
       for item in obj["items"]:
         if "annotates" in item:
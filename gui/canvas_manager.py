@@ -1,7 +1,27 @@
 import traceback
 from english2tikz.utils import *
 from english2tikz.errors import *
+from english2tikz.latex import compile_scheduler
 from english2tikz.gui.drawers import *
+from english2tikz.gui.point_collection import PointCollection
+from english2tikz.gui.tiles import TileCache
+from english2tikz.gui.grid_layer import GridLayer
+from english2tikz.gui.display_list import DisplayList
+from english2tikz.gui.backends import TkBackend
+from english2tikz.gui.image_utils import image_cache
+
+
+"""
+Milliseconds. Redraws are requested by marking the canvas dirty, and
+issued once per frame when Tk is idle. A frame that takes longer than
+frame_budget delays the next one by as long as it took, so that the
+key events queued meanwhile are handled before drawing again. The
+pointer animates every animation_interval, until nothing happened for
+animation_idle_timeout.
+"""
+frame_budget = 16
+animation_interval = 100
+animation_idle_timeout = 10000
 
 
 class CanvasManager(object):
@@ -19,7 +39,18 @@ class CanvasManager(object):
     self._pointer_objects = []
     self._editor = editor
     self._preview = None
-    root.after(100, self._draw_animated)
+    self._tiled = False
+    self._tile_cache = TileCache()
+    self._grid_layer = GridLayer(canvas)
+    self._tk_backend = TkBackend(canvas)
+    self._display_list = None
+    self._frame_drew_texts = True
+    self._draw_pending = False
+    self._last_frame_end = 0
+    self._last_frame_time = 0
+    self._last_activity = now()
+    self._animating = True
+    root.after(animation_interval, self._draw_animated)
     root.after(1, self.draw)
 
   def _pointer(self):
@@ -57,47 +88,107 @@ class CanvasManager(object):
     assert isinstance(drawer, Drawer)
     self._drawers.append(drawer)
 
+  def request_draw(self):
+    """
+    Mark the canvas dirty. The requests made before the next frame are
+    served by a single draw
+    """
+    self._last_activity = now()
+    if not self._animating:
+      self._animating = True
+      self._root.after(animation_interval, self._draw_animated)
+    if self._end or self._draw_pending:
+      return
+    self._draw_pending = True
+    wait = self._last_frame_time - (now() - self._last_frame_end)
+    if self._last_frame_time > frame_budget and wait > 0:
+      self._root.after(wait, self._frame)
+    else:
+      self._root.after_idle(self._frame)
+
+  def _frame(self):
+    self._draw_pending = False
+    start = now()
+    self.draw()
+    self._last_frame_end = now()
+    self._last_frame_time = self._last_frame_end - start
+
   def draw(self):
     if self._end:
       return
 
-    self._canvas.delete("all")
-
+    compile_scheduler.begin_frame(self._cs()._view_width,
+                                  self._cs()._view_height)
+    image_cache.begin_frame()
+    self._frame_drew_texts = True
+    try:
+      self._draw()
+    finally:
+      if self._frame_drew_texts:
+        compile_scheduler.end_frame()
+        image_cache.end_frame()
+      else:
+        compile_scheduler.cancel_frame()
+        image_cache.cancel_frame()
+
+  def _draw(self):
+    """
+    Everything but the grid layer and the pointer is drawn into a display
+    list, which the Tk backend compares with the previous one to update
+    only the items that changed
+    """
+    c = DisplayList(self._canvas)
     if self._preview is not None:
-      self._draw_preview()
-      return
+      self._grid_layer.remove()
+      self._draw_preview(c)
+    else:
+      self._draw_frame(c)
+    self._display_list = c
+    self._tk_backend.update(c)
+    self._update_pointer()
+
+  def _draw_frame(self, c):
+    self._grid_layer.draw(self._cs(), self._pointer().grid_size(),
+                          self._show_grid, self._show_axes)
     if self._show_grid:
-      self._draw_grid(self._canvas)
-    if self._show_axes:
-      self._draw_axes(self._canvas)
-    self._draw_picture(self._canvas,
-                       self._editor._context._picture,
-                       {}, [])
-    self._draw_visual(self._canvas)
-    self._draw_marks(self._canvas)
-    self._draw_attributes(self._canvas)
+      self._grid_layer.draw_pointer_labels(c, self._cs(),
+                                           self._pointer().grid_size(),
+                                           self._pointer().ix(),
+                                           self._pointer().iy())
+    if self._tiled:
+      self._draw_tiled_picture(c, self._editor._context._picture)
+    else:
+      self._draw_picture(c, self._editor._context._picture,
+                         {}, PointCollection())
+    self._draw_visual(c)
+    self._draw_marks(c)
+    self._draw_attributes(c)
     if self._editor._has_suggest():
       self._editor._suggest._propose_suggestions()
       for candidate in self._editor._suggest._new_suggestions:
-        self._draw_picture(self._canvas,
+        self._draw_picture(c,
                            candidate._content,
                            self._bounding_boxes,
                            self._point_collection,
-                           no_new_bound_box=True)
-      self._draw_picture(self._canvas,
+                           no_new_bound_box=True,
+                           path_boxes=self._path_boxes)
+      self._draw_picture(c,
                          self._editor._suggest.suggestion()._content,
                          self._bounding_boxes,
                          self._point_collection,
                          hint=self._editor._suggest._hint,
+                         path_boxes=self._path_boxes,
                          no_new_bound_box=True)
     if self._editing_text() is not None:
-      self._draw_editing_text(self._canvas)
+      self._draw_editing_text(c)
     else:
-      self._draw_pointer_indicator(self._canvas)
-    self._draw_command(self._canvas)
+      self._draw_pointer_indicator(c)
+    self._draw_command(c)
 
-  def _draw_preview(self):
-    img = Image.open(self._preview)
+  def _draw_preview(self, c):
+    img = self._preview
+    if isinstance(img, str):
+      img = Image.open(img)
     img = img.convert("RGBA")
     w, h = img.size
     if w >= self._cs()._view_width:
@@ -110,63 +201,46 @@ class CanvasManager(object):
     img = img.resize((w, h))
     image = ImageTk.PhotoImage(img)
     self._image_references["view"] = image
-    self._canvas.create_image(x0, y0, image=image)
+    c.create_image(x0, y0, image=image)
 
   def _draw_animated(self):
     if self._end:
       return
-    for obj in self._pointer_objects:
-      self._canvas.delete(obj)
-    if self._editing_text() is None and self._preview is None:
-      self._pointer_objects = self._draw_pointer(self._canvas)
-    else:
+    if now() - self._last_activity > animation_idle_timeout:
+      self._animating = False
+      return
+    self._update_pointer()
+    self._root.after(animation_interval, self._draw_animated)
+
+  def _update_pointer(self):
+    if self._editing_text() is not None or self._preview is not None:
+      for obj in self._pointer_objects:
+        self._canvas.delete(obj)
       self._pointer_objects = []
-    self._root.after(100, self._draw_animated)
-
-  def _draw_grid(self, c):
-    upper, lower, left, right = self._pointer().boundary_grids()
-    step = round(1 / self._pointer().grid_size())
-    for i in range(lower, upper+1):
-      x, y = self._cs().map_point(0, self._pointer().grid_size() * i)
-      c.create_line(self._cs().horizontal_line(y),
-                    fill="gray", dash=2)
-      draw_text = i == self._pointer().iy() or i % step == 0
-      color = "red" if i == self._pointer().iy() else "gray"
-      if draw_text:
-        text = "%g" % (i * self._pointer().grid_size())
-        c.create_text(5, y, text=text, anchor="sw", fill=color)
-        c.create_text(self._cs().right_boundary()-3, y,
-                      text=text, anchor="se", fill=color)
-    for i in range(left, right+1):
-      x, y = self._cs().map_point(
-          self._pointer().grid_size() * i, 0)
-      c.create_line(self._cs().vertical_line(x),
-                    fill="gray", dash=2)
-      draw_text = i == self._pointer().ix() or i % step == 0
-      color = "red" if i == self._pointer().ix() else "gray"
-      if draw_text:
-        text = "%g" % (i * self._pointer().grid_size())
-        c.create_text(x, 0, text=text, anchor="nw", fill=color)
-        c.create_text(x, self._cs().bottom_boundary(),
-                      text=text, anchor="sw", fill=color)
-
-  def _draw_axes(self, c):
-    c.create_line(self._cs().center_horizontal_line(),
-                  fill="#888888", width=1.5)
-    c.create_line(self._cs().center_vertical_line(),
-                  fill="#888888", width=1.5)
+      return
+    if len(self._pointer_objects) == 0:
+      self._pointer_objects = self._create_pointer(self._canvas)
+    else:
+      self._canvas.tag_raise("pointer")
+    self._move_pointer(self._canvas, self._pointer_objects)
 
-  def _draw_picture(self, c, picture, bounding_box,
-                    point_collection=[], hint={},
-                    no_new_bound_box=False):
-    env = {
+  def _make_env(self, bounding_box, point_collection, path_boxes):
+    return {
         "bounding box": bounding_box,
-        "point collection": point_collection,
+        "path boxes": {} if path_boxes is None else path_boxes,
+        "point collection": (PointCollection() if point_collection is None
+                             else point_collection),
         "coordinate system": self._cs(),
         "selection": self._selection(),
         "image references": self._image_references,
         "finding": self._editor._finding,
+        "preview": False,
     }
+
+  def _draw_picture(self, c, picture, bounding_box,
+                    point_collection=None, hint={},
+                    no_new_bound_box=False, path_boxes=None):
+    env = self._make_env(bounding_box, point_collection, path_boxes)
     try:
       for obj in picture:
         self._draw_obj(c, obj, env, hint, no_new_bound_box)
@@ -174,14 +248,66 @@ class CanvasManager(object):
       traceback.print_exc()
       self._editor._error_msg = f"Error in drawing {obj}: {e}"
     self._bounding_boxes = env["bounding box"]
+    self._path_boxes = env["path boxes"]
     self._point_collection = env["point collection"]
     self._pointer().find_closest(self._point_collection)
 
+  def _tile_key(self):
+    selection = self._selection()
+    finding = self._editor._finding
+    return (self._editor._picture_version,
+            self._cs()._scale,
+            tuple(selection.ids()),
+            tuple(id(path) for path in selection.paths()),
+            selection._selected_path_position,
+            selection._selected_anchor,
+            None if finding is None else (id(finding), finding._prefix),
+            compile_scheduler.completed)
+
+  def _draw_tiled_picture(self, c, picture):
+    """
+    Record the picture again only when something it depends on changed;
+    otherwise the tiles and the recorded selected objects are reused,
+    along with the bounding boxes and snapping points of the recording
+    """
+    key = self._tile_key()
+    cs = self._cs()
+    if key != self._tile_cache.key():
+      static, live = DisplayList(self._canvas), DisplayList(self._canvas)
+      env = self._make_env({}, None, None)
+      selection = self._selection()
+      try:
+        for obj in picture:
+          selected = ((obj.get("id") is not None or is_type(obj, "path")) and
+                      selection.selected(obj))
+          self._draw_obj(live if selected else static, obj, env)
+      except Exception as e:
+        traceback.print_exc()
+        self._editor._error_msg = f"Error in drawing {obj}: {e}"
+      self._bounding_boxes = env["bounding box"]
+      self._path_boxes = env["path boxes"]
+      self._point_collection = env["point collection"]
+      self._tile_cache.record(key, cs._scale, (cs._centerx, cs._centery),
+                              static, live)
+    else:
+      self._frame_drew_texts = False
+    self._tile_cache.draw(c, cs._centerx, cs._centery,
+                          cs._view_width, cs._view_height)
+    self._pointer().find_closest(self._point_collection)
+
+  def set_tiled(self, tiled):
+    self._tiled = tiled
+    self._tile_cache.clear()
+
   def _draw_obj(self, c, obj, env, hint={}, no_new_bound_box=False):
     for drawer in self._drawers:
       if not drawer.match(obj):
         continue
-      drawer.draw(c, obj, env, hint, no_new_bound_box)
+      c.source = obj.get("id") or id(obj)
+      try:
+        drawer.draw(c, obj, env, hint, no_new_bound_box)
+      finally:
+        c.source = None
       return
     raise ConfigurationError(f"Cannot find drawer for obj {obj}")
 
@@ -244,26 +370,38 @@ class CanvasManager(object):
     c.create_line(self._cs().vertical_line(x),
                   fill="red", width=1)
 
-  def _draw_pointer(self, c):
-    ret = []
+  def _create_pointer(self, c):
+    """
+    The items of the pointer are created once, kept above the display
+    list, and moved by the animation
+    """
+    return [c.create_line(0, 0, 0, 0, fill="red", width=2, tags="pointer"),
+            c.create_line(0, 0, 0, 0, fill="red", width=2, tags="pointer"),
+            c.create_line(0, 0, 0, 0, fill="blue", dash=4, width=1.5,
+                          tags="pointer"),
+            c.create_oval(0, 0, 0, 0, fill="blue", outline="red",
+                          tags="pointer")]
+
+  def _move_pointer(self, c, items):
+    cross1, cross2, line, oval = items
     x, y = self._pointer().vpos()
     angle = int((self._elapsed() / 5)) % 360
     rad = angle / 180 * math.pi
     dx1, dy1 = 10 * math.cos(rad), 10 * math.sin(rad)
     dx2, dy2 = -10 * math.sin(rad), 10 * math.cos(rad)
-    ret.append(c.create_line((x+dx1, y+dy1, x-dx1, y-dy1),
-                             fill="red", width=2))
-    ret.append(c.create_line((x+dx2, y+dy2, x-dx2, y-dy2),
-                             fill="red", width=2))
+    c.coords(cross1, x+dx1, y+dy1, x-dx1, y-dy1)
+    c.coords(cross2, x+dx2, y+dy2, x-dx2, y-dy2)
     if self._pointer().has_closest():
       x1, y1 = self._pointer().closest_vpos()
-      ret.append(c.create_line(x, y, x1, y1, fill="blue",
-                               dash=4, width=1.5,
-                               dashoffset=int(self._elapsed()/100)%8))
       radius = int(self._elapsed()/100) % 5
-      ret.append(c.create_oval(x1-radius, y1-radius, x1+radius, y1+radius,
-                               fill="blue", outline="red"))
-    return ret
+      c.coords(line, x, y, x1, y1)
+      c.itemconfigure(line, state="normal",
+                      dashoffset=int(self._elapsed()/100)%8)
+      c.coords(oval, x1-radius, y1-radius, x1+radius, y1+radius)
+      c.itemconfigure(oval, state="normal")
+    else:
+      c.itemconfigure(line, state="hidden")
+      c.itemconfigure(oval, state="hidden")
 
   def _draw_attributes(self, c):
     if not self._show_attributes:
@@ -281,7 +419,7 @@ class CanvasManager(object):
         t = c.create_text(120, y, anchor="nw", text=str(value),
                           fill="#000077", font=("Courier", 15, "normal"))
         _, _, _, y = c.bbox(t)
-      elif isinstance(value, dict):
+      elif is_mapping(value):
         t = c.create_text(15, y, anchor="nw", text=key, fill="blue",
                           font=("Courier", 15, "normal"))
         for k, v in value.items():
@@ -325,5 +463,8 @@ class CanvasManager(object):
 
     return selected_ids, selected_paths
 
-  def preview(self, path):
-    self._preview = path
+  def preview(self, image):
+    """
+    Show the png at a path, or a PIL image, until Ctrl-c
+    """
+    self._preview = image
@@ -0,0 +1,203 @@
+import math
+from collections import OrderedDict
+
+
+"""
+The drawers lay out the picture by calling the item creation methods of
+a Tk canvas. A DisplayList takes these calls in place of the canvas and
+keeps them as primitives
+
+  (kind, coords, style, bound, source)
+
+where kind is line, rectangle, oval, polygon, arc, text or image, coords
+the flattened coordinates, style the keyword arguments of the call,
+bound the screen bound of the item, and source the key of the object
+being drawn when the primitive was made. Backends in
+english2tikz.gui.backends turn display lists into Tk items, PIL images
+or SVG.
+
+Text is measured on a real canvas, so the layout does not depend on the
+backend. The extent of a text relative to its position is kept in an
+LRU cache of at most text_extent_cache_max_entries texts.
+"""
+text_extent_cache_max_entries = 4096
+_text_extents = OrderedDict()
+
+
+def _flatten(args):
+  ret = []
+  for arg in args:
+    if isinstance(arg, (list, tuple)):
+      ret += _flatten(arg)
+    else:
+      ret.append(arg)
+  return ret
+
+
+def _points_bound(coords, pad=0):
+  xs, ys = coords[0::2], coords[1::2]
+  return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+
+def anchored(x, y, w, h, anchor):
+  if "w" in anchor:
+    x0 = x
+  elif "e" in anchor:
+    x0 = x - w
+  else:
+    x0 = x - w / 2
+  if anchor.startswith("n"):
+    y0 = y
+  elif anchor.startswith("s"):
+    y0 = y - h
+  else:
+    y0 = y - h / 2
+  return x0, y0
+
+
+def _hashable(value):
+  if isinstance(value, (list, tuple)):
+    return tuple(_hashable(v) for v in value)
+  if isinstance(value, (str, int, float, bool)) or value is None:
+    return value
+  return id(value)
+
+
+def signature(item):
+  """
+  Equal for primitives that would make identical items, whatever object
+  they were drawn for
+  """
+  kind, coords, style, _, _ = item
+  return (kind, tuple(coords),
+          tuple(sorted((k, _hashable(v)) for k, v in style.items())))
+
+
+"""
+Arrow heads of Tk lines, which extend past the end points
+"""
+default_arrowshape = (8, 10, 3)
+
+
+class DisplayList(object):
+  def __init__(self, measure):
+    self._measure = measure
+    self._items = OrderedDict()
+    self._keys = {}
+    self._lowered = False
+    self._lowerings = 0
+    self._next_id = 1
+    self.source = None
+
+  def __len__(self):
+    return len(self._items)
+
+  def _add(self, kind, coords, style, bound):
+    id_ = self._next_id
+    self._next_id += 1
+    self._items[id_] = (kind, coords, style, bound, self.source)
+    self._keys[id_] = (id_, 0)
+    return id_
+
+  def _shape(self, kind, args, style):
+    coords = _flatten(args)
+    width = style.get("width")
+    pad = (1 if width is None else float(width)) / 2 + 1
+    if style.get("arrow") is not None:
+      pad += max(default_arrowshape)
+    return self._add(kind, coords, style, _points_bound(coords, pad))
+
+  def create_line(self, *args, **style):
+    return self._shape("line", args, style)
+
+  def create_rectangle(self, *args, **style):
+    return self._shape("rectangle", args, style)
+
+  def create_oval(self, *args, **style):
+    return self._shape("oval", args, style)
+
+  def create_polygon(self, *args, **style):
+    return self._shape("polygon", args, style)
+
+  def create_arc(self, *args, **style):
+    return self._shape("arc", args, style)
+
+  def _text_extent(self, style):
+    key = tuple(sorted((k, _hashable(v)) for k, v in style.items()))
+    extent = _text_extents.get(key)
+    if extent is not None:
+      _text_extents.move_to_end(key)
+      return extent
+    t = self._measure.create_text(0, 0, **style)
+    extent = tuple(self._measure.bbox(t))
+    self._measure.delete(t)
+    _text_extents[key] = extent
+    while len(_text_extents) > text_extent_cache_max_entries:
+      _text_extents.popitem(last=False)
+    return extent
+
+  def create_text(self, *args, **style):
+    coords = _flatten(args)
+    x, y = coords
+    x0, y0, x1, y1 = self._text_extent(style)
+    return self._add("text", coords, style, (x + x0, y + y0, x + x1, y + y1))
+
+  def create_image(self, *args, **style):
+    coords = _flatten(args)
+    image = style["image"]
+    w, h = image.width(), image.height()
+    x0, y0 = anchored(*coords, w, h, style.get("anchor", "center"))
+    return self._add("image", coords, style, (x0, y0, x0 + w, y0 + h))
+
+  def bbox(self, item):
+    x0, y0, x1, y1 = self._items[item][3]
+    return (int(math.floor(x0)), int(math.floor(y0)),
+            int(math.ceil(x1)), int(math.ceil(y1)))
+
+  def delete(self, item):
+    if item == "all":
+      self._items.clear()
+      self._keys.clear()
+    else:
+      self._items.pop(item, None)
+      self._keys.pop(item, None)
+
+  def tag_lower(self, item, below):
+    """
+    Move the item just below the other item in the drawing order. The
+    items are ordered by keys ending with 0, and the key of a lowered
+    item replaces that 0 of the other key with -1 and a count of the
+    lowerings, so that it comes after the items lowered below the same
+    item before it. The items are sorted once, when they are next read
+    """
+    self._lowerings += 1
+    key = self._keys[below]
+    self._keys[item] = key[:-1] + (-1, self._lowerings, 0)
+    self._lowered = True
+
+  def _ordered(self):
+    if self._lowered:
+      self._items = OrderedDict(
+          sorted(self._items.items(), key=lambda item: self._keys[item[0]]))
+      self._lowered = False
+    return self._items
+
+  def items(self):
+    return list(self._ordered().values())
+
+  def by_source(self, source):
+    return [item for item in self._ordered().values() if item[4] == source]
+
+  def replay(self, canvas, dx=0, dy=0):
+    """
+    Make the primitives again on a canvas or another display list,
+    shifted by (dx, dy)
+    """
+    source = getattr(canvas, "source", None)
+    for kind, coords, style, _, item_source in self._ordered().values():
+      shifted = [v + (dx if i % 2 == 0 else dy) for i, v in enumerate(coords)]
+      if isinstance(canvas, DisplayList):
+        canvas.source = item_source
+      getattr(canvas, f"create_{kind}")(*shifted, **style)
+    if isinstance(canvas, DisplayList):
+      canvas.source = source
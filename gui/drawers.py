@@ -5,49 +5,64 @@ from PIL import Image
 from PIL import ImageTk
 from english2tikz.utils import *
 from english2tikz.errors import *
-from english2tikz.latex import text_to_latex_image_path
+from english2tikz.latex import latex_image, latex_density
 from english2tikz.gui.object_utils import *
 from english2tikz.gui.image_utils import *
 from english2tikz.gui.bezier import *
 from english2tikz.gui.bounding_box import *
 from english2tikz.gui.geometry import *
+from english2tikz.gui.style import *
 
 
 """
 The LaTeX equations are smaller than expected.
 """
-line_width_ratio = 2.5
 latex_scale_ratio = 0.42
-font_size = 40
+"""
+The coordinate system scale at which LaTeX rasters are shown at
+latex_scale_ratio times their size at latex_density.
+"""
+latex_reference_scale = 100
+"""
+How far, in screen pixels, a flattened curve may deviate from the curve.
+"""
+curve_flatness = 0.25
 
 
 def draw_text(canvas, x, y, obj, scale, cs_scale,
-              text_color, text_width, angle=0, temp=False):
+              text_color, text_width, angle=0, temp=False, wait=False):
+  """
+  With wait, as for previews, a formula is compiled before drawing it,
+  and one that cannot be compiled is not drawn, instead of being drawn
+  as its source until the background compilation finishes
+  """
   should_compile = False
   if need_latex(obj["text"]):
     should_compile = True
-    image_path, ready = text_to_latex_image_path(obj["text"],
-                                                 text_color,
-                                                 text_width)
+    screen_dpi = (latex_density * latex_scale_ratio * scale *
+                  cs_scale / latex_reference_scale)
+    image_path, ready, dpi = latex_image(obj["text"], text_color,
+                                         text_width, screen_dpi,
+                                         x=None if temp else x,
+                                         y=None if temp else y,
+                                         wait=wait)
     if ready:
+      image_scale = screen_dpi / dpi
       try:
         return canvas.create_image(
             x, y,
-            image=get_image_from_path(
-                image_path,
-                scale * latex_scale_ratio, obj["id"],
-                angle))
+            image=get_image_from_path(image_path, image_scale, angle))
       except tk.TclError:
         return canvas.create_image(
             x, y,
-            image=get_image_from_path(
-                image_path,
-                scale * latex_scale_ratio, obj["id"],
-                angle, recreate=True))
+            image=get_image_from_path(image_path, image_scale, angle,
+                                      recreate=True))
+    if wait and not temp:
+      return None
   ret = canvas.create_text(
       x, y, text=obj["text"],
       fill=color_to_tk(text_color),
-      font=("Times New Roman", int(font_size * scale), "normal"),
+      font=text_font(scale),
       width=dist_to_num(text_width) * scale * cs_scale
       if text_width is not None else None,
       angle=angle % 360)
@@ -77,11 +92,12 @@ class BoxDrawer(Drawer):
     BoxDrawer._draw(canvas, obj, env,
                     hint=hint, no_new_bound_box=no_new_bound_box)
 
-  def _precompute_text_size(canvas, obj, scale, cs_scale, inner_sep):
+  def _precompute_text_size(canvas, obj, scale, cs_scale, inner_sep,
+                            wait=False):
     text_width = obj.get("text.width")
     tmptext = draw_text(canvas, 0, 0, obj, scale,
                         cs_scale, "black", text_width,
-                        temp=True)
+                        temp=True, wait=wait)
     x0, y0, x1, y1 = canvas.bbox(tmptext)
     canvas.delete(tmptext)
     width = (x1 - x0) / cs_scale + inner_sep * 2 * scale
@@ -95,24 +111,24 @@ class BoxDrawer(Drawer):
     ratio = scale / cs_scale * 250 / dpi
     return w * ratio, h * ratio
 
-  def _compute_object_size(canvas, obj, cs_scale):
+  def _compute_object_size(canvas, obj, cs_scale, wait=False):
     circle = "circle" in obj
     ellipse = "ellipse" in obj
     text = obj.get("text")
     img_path = extract_image_path(text)
-    inner_sep = dist_to_num(obj.get("inner.sep", 0.1))
-    scale = float(obj.get("scale", 1))
+    inner_sep = get_dist(obj, "inner.sep", 0.1)
+    scale = get_num(obj, "scale", 1)
     if text:
       if img_path is None:
         width, height = BoxDrawer._precompute_text_size(
-            canvas, obj, scale, cs_scale, inner_sep)
+            canvas, obj, scale, cs_scale, inner_sep, wait)
       else:
         width, height = BoxDrawer._precompute_image_size(
           canvas, obj, img_path, scale, cs_scale
         )
         if width is None or height is None:
           width, height = BoxDrawer._precompute_text_size(
-              canvas, obj, scale, cs_scale, inner_sep)
+              canvas, obj, scale, cs_scale, inner_sep, wait)
     else:
       width = inner_sep * 2 * scale
       height = inner_sep * 2 * scale
@@ -124,8 +140,8 @@ class BoxDrawer(Drawer):
       width *= 1.414
       height *= 1.414
 
-    width = max(dist_to_num(obj.get("width", 0)) * scale, width)
-    height = max(dist_to_num(obj.get("height", 0)) * scale, height)
+    width = max(get_dist(obj, "width") * scale, width)
+    height = max(get_dist(obj, "height") * scale, height)
 
     if circle:
       width = max(width, height)
@@ -143,25 +159,23 @@ class BoxDrawer(Drawer):
     cs = env["coordinate system"]
     cs_scale = cs._scale
 
-    angle = dist_to_num(obj.get("rotate", 0)) + slope
-    scale = float(obj.get("scale", 1))
-    circle = "circle" in obj
-    ellipse = "ellipse" in obj
-    fill = obj.get("fill", "")
-    line_width = obj.get("line.width")
-    if line_width is not None:
-      line_width = dist_to_num(line_width) * line_width_ratio
-    dash = 2 if "dashed" in obj else None
-    if line_width is not None and dash is not None:
-      dash = int(dash * line_width)
-    rounded_corners = get_rounded_corners(obj, 0.2)
-    draw = draw_border(obj)
-    color = get_draw_color(obj)
-    text_color = get_text_color(obj)
+    style = box_style(obj)
+    angle = get_num(obj, "rotate") + slope
+    scale = style.scale
+    circle = style.shape == "circle"
+    ellipse = style.shape == "ellipse"
+    fill = style.fill
+    line_width = style.line_width
+    dash = style.dash
+    rounded_corners = style.rounded_corners
+    draw = style.draw
+    text_color = style.text_color
     text = obj.get("text")
     img_path = extract_image_path(text)
     text_width = obj.get("text.width")
-    width, height = BoxDrawer._compute_object_size(canvas, obj, cs_scale)
+    wait = env["preview"]
+    width, height = BoxDrawer._compute_object_size(canvas, obj, cs_scale,
+                                                   wait)
     direction = get_direction_of(obj)
     bounding_boxes = env["bounding box"]
     point_collection = env["point collection"]
@@ -177,8 +191,7 @@ class BoxDrawer(Drawer):
     x, y = shift_by_anchor(x, y, anchor, width, height)
 
     if "xshift" in obj or "yshift" in obj:
-      dx, dy = dist_to_num(obj.get("xshift", 0),
-                           obj.get("yshift", 0))
+      dx, dy = get_xy(obj, "xshift", "yshift")
       if angle != 0:
         dx, dy = rotate(dx, dy, 0, 0, 360-(angle % 360))
       x += dx
@@ -186,15 +199,12 @@ class BoxDrawer(Drawer):
 
     anchorx, anchory = BoundingBox._get_anchor_pos(
         (x, y, width, height), anchor)
-    bb = BoundingBox(x, y, width, height, shape=get_shape(obj),
+    bb = BoundingBox(x, y, width, height, shape=style.shape,
                      angle=none_or(angle, 0), center=(anchorx, anchory),
-                     obj=obj)
+                     obj=obj, rounded=none_or(rounded_corners, 0))
     if not no_new_bound_box:
       bounding_boxes[obj["id"]] = bb
-      for a in anchor_list:
-        point_collection.append((create_nodename(id_, a),
-                                bb.get_anchor_pos(a),
-                                None, None))
+      point_collection.add_box(id_, bb)
     centerx, centery = bb.get_anchor_pos("center")
 
     x0, y0 = cs.map_point(x, y)
@@ -202,8 +212,8 @@ class BoxDrawer(Drawer):
     anchor_screen_x, anchor_screen_y = cs.map_point(anchorx, anchory)
     center_screen_x, center_screen_y = cs.map_point(centerx, centery)
     draw_fill_style = {
-        "fill": color_to_tk(fill),
-        "outline": color_to_tk(color),
+        "fill": style.fill_tk,
+        "outline": style.outline_tk,
         "width": line_width,
         "dash": dash,
     }
@@ -230,7 +240,7 @@ class BoxDrawer(Drawer):
       radius = width / 2 * cs_scale
       rx0, ry0 = center_screen_x - radius, center_screen_y - radius
       rx1, ry1 = center_screen_x + radius, center_screen_y + radius
-      if (fill or draw) and "hidden" not in obj:
+      if (fill or draw) and not style.hidden:
         canvas.create_oval((rx0, ry0, rx1, ry1), **draw_fill_style)
       if selected:
         canvas.create_oval((rx0 - select_buff, ry0 - select_buff,
@@ -238,7 +248,7 @@ class BoxDrawer(Drawer):
                            **select_style)
     elif ellipse:
       if angle != 0:
-        if (fill or draw) and "hidden" not in obj:
+        if (fill or draw) and not style.hidden:
           BoxDrawer.rotated_oval(canvas, x0, y0, x1, y1,
                                  **rotate_draw_fill_style)
         if selected:
@@ -246,14 +256,14 @@ class BoxDrawer(Drawer):
                                  x1 + select_buff, y1 - select_buff,
                                  **rotate_select_style)
       else:
-        if (fill or draw) and "hidden" not in obj:
+        if (fill or draw) and not style.hidden:
           canvas.create_oval((x0, y0, x1, y1), **draw_fill_style)
         if selected:
           canvas.create_oval(x0 - select_buff, y0 + select_buff,
                              x1 + select_buff, y1 - select_buff,
                              **select_style)
     elif rounded_corners:
-      if (fill or draw) and "hidden" not in obj:
+      if (fill or draw) and not style.hidden:
         BoxDrawer.round_rectangle(canvas, x0, y0, x1, y1,
                                   radius=rounded_corners*cs._scale,
                                   **rotate_draw_fill_style)
@@ -263,7 +273,7 @@ class BoxDrawer(Drawer):
                                   **rotate_select_style)
     else:
       if angle != 0:
-        if (fill or draw) and "hidden" not in obj:
+        if (fill or draw) and not style.hidden:
           canvas.create_polygon(
               BoxDrawer.rotate_rect(x0, y0, x1, y1, anchor_screen_x,
                                     anchor_screen_y, angle),
@@ -275,24 +285,24 @@ class BoxDrawer(Drawer):
                                     anchor_screen_x, anchor_screen_y, angle),
               **select_style)
       else:
-        if (fill or draw) and "hidden" not in obj:
+        if (fill or draw) and not style.hidden:
           canvas.create_rectangle((x0, y0, x1, y1), **draw_fill_style)
         if selected:
           canvas.create_rectangle(x0 - select_buff, y0 + select_buff,
                                   x1 + select_buff, y1 - select_buff,
                                   **select_style)
 
-    if text and "hidden" not in obj:
+    if text and not style.hidden:
       if img_path is None:
         draw_text(canvas, center_screen_x, center_screen_y,
-                  obj, scale, cs_scale, text_color, text_width, angle)
+                  obj, scale, cs_scale, text_color, text_width, angle,
+                  wait=wait)
       else:
         try:
           canvas.create_image(
             center_screen_x, center_screen_y,
             image=get_image_from_path(img_path,
-                                scale,
-                                id_, angle,
+                                scale, angle,
                                 recreate=False,
                                 reset_size=(int(width * cs_scale),
                                             int(height * cs_scale))))
@@ -300,14 +310,14 @@ class BoxDrawer(Drawer):
           canvas.create_image(
             center_screen_x, center_screen_y,
             image=get_image_from_path(img_path,
-                                scale,
-                                id_, angle,
+                                scale, angle,
                                 recreate=True,
                                 reset_size=(int(width * cs_scale),
                                             int(height * cs_scale))))
         except FileNotFoundError as e:
           draw_text(canvas, center_screen_x, center_screen_y,
-                    obj, scale, cs_scale, text_color, text_width, angle)
+                    obj, scale, cs_scale, text_color, text_width, angle,
+                    wait=wait)
     if selected:
       canvas.create_oval(anchor_screen_x - 3, anchor_screen_y - 3,
                          anchor_screen_x + 3, anchor_screen_y + 3,
@@ -390,23 +400,11 @@ class PathDrawer(Drawer):
     return "type" in obj and obj["type"] == "path"
 
   def draw(self, canvas, obj, env, hint={}, no_new_bound_box=False):
-    draw = "draw" in obj and "hidden" not in obj
+    style = path_style(obj)
     fill = "fill" in obj
     fill_polygon = []
-    line_width = obj.get("line.width")
-    if line_width is not None:
-      line_width = dist_to_num(line_width) * line_width_ratio
-    arrow = "stealth" in obj or "arrow" in obj
-    rarrow = "reversed.stealth" in obj or "reversed.arrow" in obj
-    darrow = "double.stealth" in obj or "double.arrow" in obj
-    if arrow:
-      arrow = tk.LAST
-    elif rarrow:
-      arrow = tk.FIRST
-    elif darrow:
-      arrow = tk.BOTH
-    else:
-      arrow = None
+    line_width = style.line_width
+    arrow = style.arrow
     to_draw = None
     cs = env["coordinate system"]
     selection = env["selection"]
@@ -426,8 +424,7 @@ class PathDrawer(Drawer):
       hint_directions.append(None)
     
     if not no_new_bound_box:
-      for pos, _, item, index in positions:
-        point_collection.append((item, pos, obj, index))
+      point_collection.add_path(obj, positions)
 
     fill_polygon = []
     first_item = None
@@ -450,9 +447,16 @@ class PathDrawer(Drawer):
       if is_first:
         first_item = citem
 
+    if not no_new_bound_box:
+      segment_boxes = [bounding_boxes[f"segment_{id(obj)}_{index}"]
+                       for _, _, _, index in draws
+                       if f"segment_{id(obj)}_{index}" in bounding_boxes]
+      env["path boxes"][id(obj)] = (obj, segment_boxes,
+                                    union_bound(segment_boxes))
+
     if fill:
       fill_polygon = [e for x, y in fill_polygon for e in cs.map_point(x, y)]
-      polygon = canvas.create_polygon(fill_polygon, fill=color_to_tk(obj["fill"]), outline="")
+      polygon = canvas.create_polygon(fill_polygon, fill=style.fill_tk, outline="")
       if first_item is not None:
         canvas.tag_lower(polygon, first_item)
     
@@ -489,22 +493,17 @@ class PathDrawer(Drawer):
     x1, y1 = end_pos
     hint_directions = hint["last_path"]["directions"]
     hint_positions = hint["last_path"]["positions"]
-    line_width = path.get("line.width")
-    if line_width is not None:
-      line_width = dist_to_num(line_width) * line_width_ratio
-    dash = 2 if "dashed" in path else None
-    if line_width is not None and dash is not None:
-      dash = int(dash * line_width)
-    color = path.get("color", "black")
-    draw = "draw" in path and "hidden" not in path
-    fill = path.get("fill", "")
+    style = path_style(path)
+    line_width = style.line_width
+    dash = style.dash
+    draw = style.draw
     cs = env["coordinate system"]
     bounding_boxes = env["bounding box"]
     ret = None
 
     if is_type(item, "line"):
       line_style = {
-          "fill": color_to_tk(color),
+          "fill": style.color_tk,
           "width": line_width,
           "arrow": arrow,
           "dash": dash,
@@ -577,8 +576,8 @@ class PathDrawer(Drawer):
                                                    x1, y1), 0) % 360)
         points.append([x1, y1])
 
-        curve = Bezier.generate_line_segments(
-            *points, steps=max(int(dist / 0.01) + 1, 20))
+        curve = Bezier.flatten(*points,
+                               tolerance=curve_flatness / cs._scale)
 
         fill_polygon += curve
         if not no_new_bound_box:
@@ -626,8 +625,8 @@ class PathDrawer(Drawer):
       hint_directions.append((x1, y1))
       hint_positions.append(None)
       line_style = {
-          "fill": color_to_tk(fill),
-          "outline": color_to_tk(color),
+          "fill": style.fill_tk,
+          "outline": style.color_tk,
           "width": line_width,
           "dash": dash,
       }
@@ -652,7 +651,7 @@ class PathDrawer(Drawer):
         ret = canvas.create_rectangle((x0p, y0p, x1p, y1p), **line_style)
     elif is_type(item, "arc"):
       line_style = {
-          "outline": color_to_tk(color),
+          "outline": style.color_tk,
           "width": line_width,
           "arrow": arrow,
           "dash": dash,
@@ -664,7 +663,7 @@ class PathDrawer(Drawer):
       }
       start = int(item["start"])
       end = int(item["end"])
-      radius = dist_to_num(item["radius"])
+      radius = get_dist(item, "radius")
       hint_directions.append((end + 90) % 360 if end > start else
                              (end + 270) % 360)
       hint_positions.append((x1, y1))
@@ -2,6 +2,7 @@ import os
 import re
 import json
 import copy
+import shutil
 import string
 import traceback
 from functools import partial
@@ -11,12 +12,14 @@ from contextlib import contextmanager
 from english2tikz.utils import *
 from english2tikz.describe_it import DescribeIt
 from english2tikz.handlers import WithAttributeHandler, DirectionOfHandler
-from english2tikz.latex import tikzimage
+from english2tikz.compact import to_compact, from_compact, json_default
+from english2tikz import picture_file
 from english2tikz.errors import *
 from english2tikz.gui.canvas_manager import CanvasManager
 from english2tikz.gui.keyboard import KeyboardManager
 from english2tikz.gui.text_editor import TextEditor
 from english2tikz.gui.selection import Selection
+from english2tikz.gui.search_index import SearchIndex
 from english2tikz.gui.finding import Finding
 from english2tikz.gui.coordinate_system import CoordinateSystem
 from english2tikz.gui.command_line import CommandLine
@@ -27,6 +30,10 @@ from english2tikz.gui.command_parse import Parser
 from english2tikz.gui.suggest import Suggest
 from english2tikz.gui.object_utils import *
 from english2tikz.gui.bounding_box import *
+from english2tikz.gui.export import ExportService
+from english2tikz.gui.preview import preview_image, write_preview
+from english2tikz.gui.file_watch import FileWatcher
+from english2tikz.gui.journal import *
 
 
 class Editor(object):
@@ -44,17 +51,22 @@ class Editor(object):
     self._editing_text_pos = None
     self._command_line = CommandLine(self._object_path)
     self._history = [self._context._picture]
+    self._history_splices = []
     self._history_index = 0
+    self._picture_version = 0
     self._visual = Visual(self._pointer)
     self._marks = MarkManager()
     self._clipboard = []
     self._finding = None
-    self._command_refreshing_timer_started = False
-    self._editing_refreshing_timer_started = False
+    self._syncing_command = False
+    self._syncing_editing = False
+    self._file_watcher = None
     self.filename = None
-    self._selection = Selection(self._context)
+    self._compact = False
+    self._search_index = SearchIndex()
+    self._search_index.rebuild(self._context._picture)
+    self._selection = Selection(self._context, self._search_index)
     self._suggest = Suggest(self)
-    self._point_collection = []
     self._keyboard_managers = {
         "normal": KeyboardManager(","),
         "visual": KeyboardManager(","),
@@ -65,6 +77,8 @@ class Editor(object):
     }
     self._canvas_manager = CanvasManager(root, canvas,
                                          screen_width, screen_height, self)
+    self._export_service = ExportService(root)
+    self._journal = None
     root.bind("<Key>", self.handle_key)
     self._register_keys()
 
@@ -241,13 +255,90 @@ class Editor(object):
     self.register_key("preview", "Ctrl-c", self._exit_preview)
 
   @contextmanager
-  def _modify_picture(self):
+  def _modify_picture(self, appended=False, touched=None):
+    """
+    The edit site tells what it changes, so that the splice of the edit
+    is found without comparing the pictures: appended when it only
+    appends objects to the picture, touched the objects it changes in
+    place. Otherwise the splice is found by comparing the picture with
+    the copy kept in the history.
+    """
     self._history = self._history[:self._history_index+1]
+    self._history_splices = self._history_splices[:self._history_index]
     self._history[self._history_index] = copy.deepcopy(
         self._history[self._history_index])
+    before = self._history[self._history_index]
+    length = len(self._context._picture)
     yield
-    self._history.append(self._context._picture)
+    picture = self._context._picture
+    if appended:
+      splice = appended_splice(length, picture)
+    elif touched is not None:
+      splice = touched_splice(picture, touched)
+    else:
+      splice = picture_splice(before, picture)
+    start, delete, insert = splice
+    self._history.append(picture)
+    self._history_splices.append((start, delete, len(insert)))
     self._history_index = len(self._history) - 1
+    self._picture_changed(before, splice)
+
+  def _picture_changed(self, before, splice, replaced=False):
+    """
+    Undo and redo replace the picture by a list of copies, equal to the
+    indexed objects out of the splice, which the search index is pointed
+    to
+    """
+    picture = self._context._picture
+    self._picture_version += 1
+    if replaced:
+      self._search_index.repoint(picture, *splice)
+    else:
+      self._search_index.apply(picture, *splice)
+    if self._journal is not None:
+      self._journal.record(before, picture,
+                           self._context._state.get("nextid", 0), splice)
+
+  def start_journal(self, filename=None):
+    """
+    Journal the changes to the picture under the object path, and
+    recover the changes left unsaved by a previous session on the file,
+    or by the last untitled session that did not end. The journal of a
+    file changed since is kept aside instead
+    """
+    directory = journal_dir_for(self._object_path, filename)
+    stamp = file_stamp(filename)
+    self._journal = Journal(directory, stamp)
+    if filename is None:
+      leftovers = leftover_untitled_journals(self._object_path)
+    else:
+      leftovers = [directory]
+    recovered, recovered_from = None, []
+    for leftover in leftovers:
+      journal = self._journal if leftover == directory else Journal(leftover)
+      recovered = journal.recover()
+      if recovered is not None and journal.recovered_stamp() != stamp:
+        kept = keep_journal(leftover)
+        self._error_msg = (f"{filename} changed after its journal, "
+                           f"kept the journal in {kept}")
+        recovered = None
+        break
+      recovered_from.append(leftover)
+      if recovered is not None:
+        self.load(recovered)
+        self._error_msg = "Recovered unsaved changes from the journal"
+        break
+    self._journal.start(self._context._picture,
+                        self._context._state.get("nextid", 0),
+                        clean=recovered is None)
+    """
+    The recovered picture is in the snapshot of the new journal once it
+    is flushed, so the journals it came from can go
+    """
+    self._journal.flush()
+    for leftover in recovered_from:
+      if leftover != directory:
+        remove_journal(leftover)
 
   def _undo(self):
     if self._has_suggest():
@@ -257,8 +348,14 @@ class Editor(object):
       self._error_msg = "Already the oldest"
       return
 
+    before = self._context._picture
     self._history_index -= 1
     self._context._picture = self._history[self._history_index]
+    start, delete, inserted = self._history_splices[self._history_index]
+    splice = (start, inserted,
+              self._context._picture[start:start+delete])
+    self._selection.refresh()
+    self._picture_changed(before, splice, replaced=True)
 
   def _redo(self):
     if self._has_suggest():
@@ -267,8 +364,14 @@ class Editor(object):
     if self._history_index >= len(self._history) - 1:
       self._error_msg = "Already at newest change"
       return
+    before = self._context._picture
+    start, delete, inserted = self._history_splices[self._history_index]
     self._history_index += 1
     self._context._picture = self._history[self._history_index]
+    splice = (start, delete,
+              self._context._picture[start:start+inserted])
+    self._selection.refresh()
+    self._picture_changed(before, splice, replaced=True)
 
   def handle_key_by_code(self, keycode):
     try:
@@ -276,7 +379,7 @@ class Editor(object):
     except ErrorMessage as e:
       self._error_msg = f"Error: {e}"
 
-    self._canvas_manager.draw()
+    self._canvas_manager.request_draw()
 
   def handle_key(self, event):
     try:
@@ -287,9 +390,7 @@ class Editor(object):
       self._error_msg = f"Error: {e}"
       traceback.print_exc()
 
-    if self._has_suggest():
-      self._suggest._propose_suggestions()
-    self._canvas_manager.draw()
+    self._canvas_manager.request_draw()
 
   def _scroll(self, dx, dy):
     self._pointer.scroll(dx, dy)
@@ -306,7 +407,7 @@ class Editor(object):
 
   def _insert_char_to_edit(self, c):
     self._editing_text.insert(c)
-    self._editing_refreshing_timer_started = False
+    self._syncing_editing = False
 
   def _move_edit_cursor(self, offset):
     self._editing_text.move_cursor(offset)
@@ -336,15 +437,15 @@ class Editor(object):
     self._editing_text.move_right()
 
   def _insert_char_to_command(self, c):
-    self._command_refreshing_timer_started = False
+    self._syncing_command = False
     self._command_line.insert(c)
 
   def _delete_char_from_edit(self):
     self._editing_text.delete()
-    self._editing_refreshing_timer_started = False
+    self._syncing_editing = False
 
   def _delete_char_from_command(self):
-    self._command_refreshing_timer_started = False
+    self._syncing_command = False
     self._command_line.delete()
 
   def _move_command_cursor(self, offset):
@@ -423,14 +524,14 @@ class Editor(object):
     self._exit_visual_mode()
 
   def _exit_editing_mode(self):
-    self._editing_refreshing_timer_started = False
+    self._syncing_editing = False
     if self._obj_to_edit_text is None:
       if len(self._editing_text) > 0:
         x, y = self._pointer.posstr()
         self._parse(f"""there.is.text "{self._editing_text}" at.x.{x}.y.{y}
                         with.align=left""")
     else:
-      with self._modify_picture():
+      with self._modify_picture(touched=[self._obj_to_edit_text]):
         self._obj_to_edit_text["text"] = str(self._editing_text)
     self._editing_text = None
 
@@ -443,7 +544,7 @@ class Editor(object):
     self._clear_error_message()
 
   def _exit_command_mode(self):
-    self._command_refreshing_timer_started = False
+    self._syncing_command = False
     self._command_line.exit()
 
   def _execute_command(self):
@@ -453,11 +554,11 @@ class Editor(object):
       self._exit_command_mode()
 
   def _fetch_previous_command(self):
-    self._command_refreshing_timer_started = False
+    self._syncing_command = False
     self._command_line.fetch_previous()
 
   def _fetch_next_command(self):
-    self._command_refreshing_timer_started = False
+    self._syncing_command = False
     self._command_line.fetch_next()
 
   def _external_editor_for_command(self):
@@ -466,11 +567,12 @@ class Editor(object):
     to implement a powerful text editor or using the tkinter text field.
     So press Ctrl+o to open an external editor for assistance.
     """
-    if not self._command_refreshing_timer_started:
-      self._start_timer_for_refreshing_command()
-    with open("/tmp/command", "w") as f:
+    path = self._external_file("command")
+    with open(path, "w") as f:
       f.write(str(self._command_line))
-    os.system(f"open -a 'Sublime Text' /tmp/command")
+    self._syncing_command = True
+    self._file_watcher.watch("command", self._refresh_command)
+    os.system(f"open -a 'Sublime Text' '{path}'")
 
   def _external_editor_for_editing(self):
     """
@@ -478,11 +580,21 @@ class Editor(object):
     to implement a powerful text editor or using the tkinter text field.
     So press Ctrl+o to open an external editor for assistance.
     """
-    if not self._editing_refreshing_timer_started:
-      self._start_timer_for_refreshing_editing()
-    with open("/tmp/editing", "w") as f:
+    path = self._external_file("editing")
+    with open(path, "w") as f:
       f.write(str(self._editing_text))
-    os.system(f"open -a 'Sublime Text' /tmp/editing")
+    self._syncing_editing = True
+    self._file_watcher.watch("editing", self._refresh_editing)
+    os.system(f"open -a 'Sublime Text' '{path}'")
+
+  def _external_file(self, name):
+    """
+    The files for external editors are in a directory of this session,
+    watched for changes, instead of polled
+    """
+    if self._file_watcher is None:
+      self._file_watcher = FileWatcher(self._root)
+    return self._file_watcher.path(name)
 
   def _enter_visual_mode(self):
     x, y = self._pointer.pos()
@@ -535,7 +647,8 @@ class Editor(object):
     new_objects = self._suggest.fix()
     if len(new_objects) == 0:
       raise ErrorMessage("No suggestion is taken.")
-    self._context._picture += new_objects
+    with self._modify_picture(appended=True):
+      self._context._picture += new_objects
 
   def _exit_suggest_mode(self):
     self._suggest.shutdown()
@@ -577,50 +690,41 @@ class Editor(object):
       x, y = self._pointer.pos()
       self._marks.add_coord(x, y)
 
-  def _start_timer_for_refreshing_command(self):
-    self._command_refreshing_timer_started = True
-    self._root.after(100, self._refresh_command)
-
-  def _refresh_command(self):
-    if not self._command_refreshing_timer_started:
-      return
-    if self._command_line is None:
-      self._command_refreshing_timer_started = False
+  def _refresh_command(self, content):
+    """
+    Called by the file watcher when the external editor saved the command
+    """
+    if not self._syncing_command or self._command_line is None:
+      self._syncing_command = False
+      self._file_watcher.unwatch("command")
       return
     try:
-      with open("/tmp/command") as f:
-        self._command_line.set(f.read())
+      self._command_line.set(content)
     except ErrorMessage as e:
       self._error_msg = f"Failed to refresh command: {e}"
     except Exception as e:
       self._error_msg = f"Failed to refresh command: {e}"
-      self._command_refreshing_timer_started = False
+      self._syncing_command = False
+      self._file_watcher.unwatch("command")
       traceback.print_exc()
-    self._root.after(100, self._refresh_command)
-    self._canvas_manager.draw()
+    self._canvas_manager.request_draw()
 
-  def _start_timer_for_refreshing_editing(self):
-    self._editing_refreshing_timer_started = True
-    self._root.after(100, self._refresh_editing)
-
-  def _refresh_editing(self):
-    if not self._editing_refreshing_timer_started:
-      return
-    if self._editing_text is None:
-      self._editing_refreshing_timer_started = False
+  def _refresh_editing(self, content):
+    if not self._syncing_editing or self._editing_text is None:
+      self._syncing_editing = False
+      self._file_watcher.unwatch("editing")
       return
     try:
-      with open("/tmp/editing") as f:
-        self._editing_text.set(f.read())
-        self._editing_text.move_to_end()
+      self._editing_text.set(content)
+      self._editing_text.move_to_end()
     except ErrorMessage as e:
       self._error_msg = f"Failed to refresh editing: {e}"
     except Exception as e:
       self._error_msg = f"Failed to refresh editing: {e}"
-      self._editing_refreshing_timer_started = False
+      self._syncing_editing = False
+      self._file_watcher.unwatch("editing")
       traceback.print_exc()
-    self._root.after(100, self._refresh_editing)
-    self._canvas_manager.draw()
+    self._canvas_manager.request_draw()
 
   def _finding_narrow_down(self, char):
     try:
@@ -737,7 +841,7 @@ class Editor(object):
         "sloped": True,
         "scale": "0.7",
     }
-    with self._modify_picture():
+    with self._modify_picture(touched=[path]):
       annotates.append(annotate)
     self._obj_to_edit_text = annotate
     self._editing_text_pos = self._pointer.pos()
@@ -766,7 +870,9 @@ class Editor(object):
   def _ensure_name_is_id(self, id_):
     obj = self._context.find_object_by_id(id_)
     if obj is not None:
-      obj["name"] = id_
+      if obj.get("name") != id_:
+        with self._modify_picture(touched=[obj]):
+          obj["name"] = id_
     else:
       self._error_msg = f"Cannot find object with id {id_}"
       traceback.print_exc()
@@ -796,15 +902,16 @@ class Editor(object):
     if self._selection.num_selected() > 1:
       round_by = None
     if self._selection.has_id():
-      with self._modify_picture():
+      with self._modify_picture(
+          touched=self._selection.get_selected_id_objects()):
         for id_ in self._selection.ids():
           shift_object(self._context.find_object_by_id(id_), dx, dy, round_by)
     elif self._selection.is_in_path_position_mode():
-      with self._modify_picture():
+      with self._modify_picture(touched=self._selection.paths()):
         shift_path_position(self._selection.get_path_position(), dx, dy,
                             round_by)
     elif self._selection.has_path():
-      with self._modify_picture():
+      with self._modify_picture(touched=self._selection.paths()):
         for path in self._selection.paths():
           shift_object(path, dx, dy)
 
@@ -826,10 +933,11 @@ class Editor(object):
   def _paste(self):
     if len(self._clipboard) == 0:
       return
-    with self._modify_picture():
+    with self._modify_picture(appended=True):
       self._context.paste_data(copy.deepcopy(self._clipboard),
                                *self._pointer.pos(),
-                               False, self._canvas_manager._bounding_boxes)
+                               False, self._canvas_manager._bounding_boxes,
+                               self._canvas_manager._path_boxes)
 
   def _jump_to_select(self):
     id_ = self._selection.id_to_jump()
@@ -853,7 +961,8 @@ class Editor(object):
       x0, y0, x1, y1 = 0, 0, 0, 0
     else:
       x0, y0, x1, y1 = get_bounding_box(self._context._picture,
-                                        self._canvas_manager._bounding_boxes)
+                                        self._canvas_manager._bounding_boxes,
+                                        self._canvas_manager._path_boxes)
     return {
         "picture": self._context._picture,
         "nextid": self._context._state.get("nextid", 0),
@@ -868,8 +977,15 @@ class Editor(object):
     if "nextid" in data:
       self._context._state["nextid"] = data["nextid"]
     self._history = [self._context._picture]
+    self._history_splices = []
+    self._history_index = 0
     self._fix_id_and_names()
-    self._canvas_manager.draw()
+    self._picture_version += 1
+    self._search_index.rebuild(self._context._picture)
+    if self._journal is not None:
+      self._journal.snapshot(self._context._picture,
+                             self._context._state.get("nextid", 0))
+    self._canvas_manager.request_draw()
 
   def _fix_id_and_names(self):
     for item in self._context._picture:
@@ -900,8 +1016,12 @@ class Editor(object):
       self._set_grid(code)
     elif cmd_name == "axes" or cmd_name == "a":
       self._set_axes(code)
+    elif cmd_name == "tiles":
+      self._set_tiles(code)
     elif cmd_name == "mark" or cmd_name == "m":
       self._add_mark(code)
+    elif cmd_name == "compact":
+      self._set_compact(code)
     elif cmd_name == "attr":
       self._show_attributes = not self._show_attributes
     elif cmd_name == "ann" or cmd_name == "annotate":
@@ -921,6 +1041,14 @@ class Editor(object):
     elif cmd_name == "ro":
       self._read_object(code)
     elif cmd_name == "q":
+      """
+      Quitting discards the unsaved changes, so the journal goes with
+      them and is kept only by a session that does not end with :q
+      """
+      if self._journal is not None:
+        self._journal.close(remove=True)
+      if self._file_watcher is not None:
+        self._file_watcher.close()
       self._canvas_manager._end = True
       self._root.after(100, self._root.destroy())
     elif cmd_name == "py":
@@ -932,7 +1060,7 @@ class Editor(object):
     elif cmd_name == "eeg":
       self._edit_describeit_code()
     elif cmd_name == "view":
-      self._view()
+      self._view(code)
     else:
       raise ErrorMessage(f"Unkown command: {cmd_name}")
 
@@ -947,7 +1075,8 @@ class Editor(object):
     parser.require_arg("line.height", 1)
     parser.require_arg("fill", 1)
     args = parser.parse(code)
-    with self._modify_picture():
+    with self._modify_picture(
+        touched=self._selection.get_selected_objects()):
       for key, value in args.items():
         self._set_selected_objects(key, value)
 
@@ -956,7 +1085,8 @@ class Editor(object):
       raise ErrorMessage("No object selected")
     parser = Parser()
     args = parser.parse(code)
-    with self._modify_picture():
+    with self._modify_picture(
+        touched=self._selection.get_selected_objects()):
       for key, _ in args.items():
         self._set_selected_objects(key, False)
 
@@ -1006,7 +1136,9 @@ class Editor(object):
     color = args.get("color", None)
     if color is None:
       raise ErrorMessage("Expected a color name")
-    self._set_selected_objects("fill", color)
+    with self._modify_picture(
+        touched=self._selection.get_selected_objects()):
+      self._set_selected_objects("fill", color)
 
   def _make(self, code):
     parser = Parser()
@@ -1025,15 +1157,15 @@ class Editor(object):
     arrow = args.get("arrow", [None])[0]
 
     if obj == "path":
-      with self._modify_picture():
+      with self._modify_picture(appended=True):
         self._context._picture.append(self._marks.create_path(arrow))
 
     elif obj == "rect":
       if self._visual.active():
-        with self._modify_picture():
+        with self._modify_picture(appended=True):
           self._context._picture.append(self._visual.create_path())
       elif self._marks.size() == 2:
-        with self._modify_picture():
+        with self._modify_picture(appended=True):
           self._context._picture.append(self._marks.create_rectangle())
       else:
         raise ErrorMessage("Please set exactly two marks "
@@ -1201,6 +1333,38 @@ class Editor(object):
     else:
       self._canvas_manager._show_axes = not self._canvas_manager._show_axes
 
+  def _set_tiles(self, code):
+    parser = Parser()
+    parser.flag("off")
+    parser.flag("on")
+    args = parser.parse(code)
+    if "off" in args:
+      tiled = False
+    elif "on" in args:
+      tiled = True
+    else:
+      tiled = not self._canvas_manager._tiled
+    self._canvas_manager.set_tiled(tiled)
+
+  def _set_compact(self, code):
+    parser = Parser()
+    parser.flag("off")
+    parser.flag("on")
+    args = parser.parse(code)
+    if "off" in args:
+      compact = False
+    elif "on" in args:
+      compact = True
+    else:
+      compact = not self._compact
+    if compact == self._compact:
+      return
+    self._compact = compact
+    convert = to_compact if compact else from_compact
+    self._selection.clear()
+    with self._modify_picture():
+      self._context._picture = convert(self._context._picture)
+
   def _add_mark(self, code):
     x, y = self._pointer.pos()
     to_del = None
@@ -1377,12 +1541,18 @@ class Editor(object):
 
   def _read(self, code):
     filename = code
-    with open(filename) as f:
-      data = json.loads(f.read())
+    if picture_file.is_picture_file(filename):
+      with open(filename, "rb") as f:
+        data = picture_file.load(f)
+    else:
+      with open(filename) as f:
+        data = json.loads(f.read())
 
     with self._modify_picture():
       if "picture" in data:
         self._context._picture = data["picture"]
+        if self._compact:
+          self._context._picture = to_compact(self._context._picture)
       if "nextid" in data:
         self._context._state["nextid"] = data["nextid"]
 
@@ -1390,9 +1560,10 @@ class Editor(object):
     object_name = code
     if self._selection.nonempty():
       data = json.dumps([obj for obj in self._context._picture
-                         if self._selection.selected(obj)])
+                         if self._selection.selected(obj)],
+                        default=json_default)
     else:
-      data = json.dumps(self._context._picture)
+      data = json.dumps(self._context._picture, default=json_default)
     with open(self._get_object_path(object_name), "w") as f:
       f.write(data)
 
@@ -1405,20 +1576,84 @@ class Editor(object):
     if len(filename) == 0 and self.filename is not None:
       filename = self.filename
 
-    data = json.dumps(self._save())
+    if len(filename) > 0 and picture_file.is_picture_file(filename):
+      with self._replacing(filename, "wb") as f:
+        picture_file.dump(self._save(), f, self._object_bound_function())
+      self._restart_journal(filename)
+      return
+
+    data = json.dumps(self._save(), default=json_default)
     if len(filename) == 0:
       print(data)
-    else:
-      with open(filename, "w") as f:
-        f.write(data)
+      return
+    with self._replacing(filename, "w") as f:
+      f.write(data)
+    self._restart_journal(filename)
+
+  @contextmanager
+  def _replacing(self, filename, mode):
+    """
+    Write next to the file and rename over it once complete, so that a
+    failure while writing leaves the file as it was
+    """
+    partial_path = filename + ".part"
+    try:
+      with open(partial_path, mode) as f:
+        yield f
+      os.replace(partial_path, filename)
+    except BaseException:
+      if os.path.exists(partial_path):
+        os.remove(partial_path)
+      raise
+
+  def _restart_journal(self, filename):
+    """
+    The file now holds the picture, so the journal of the file starts
+    over from a clean snapshot. When the file is first named, this
+    retires the journal of the untitled session
+    """
+    if self._journal is None or filename != self.filename:
+      return
+    self._journal.close(remove=True)
+    self._journal = Journal(journal_dir_for(self._object_path, filename),
+                            file_stamp(filename))
+    self._journal.start(self._context._picture,
+                        self._context._state.get("nextid", 0))
+
+  def _object_bound_function(self):
+    """
+    Group the bounding boxes by the objects they belong to, so that the
+    bound of every object, including its annotations, is found at once
+    """
+    boxes = {}
+    for bb in self._canvas_manager._bounding_boxes.values():
+      if bb._obj is not None:
+        boxes.setdefault(id(bb._obj), []).append(bb)
+
+    def bound(obj):
+      bbs = list(boxes.get(id(obj), []))
+      for item in obj.get("items", []):
+        for annotate in item.get("annotates", []):
+          bbs += boxes.get(id(annotate), [])
+      x0, y0, x1, y1 = None, None, None, None
+      for bb in bbs:
+        x2, y2, x3, y3 = bb.get_bound()
+        x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
+        x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
+      if x0 is None:
+        return None
+      return x0, y0, x1, y1
+    return bound
 
   def _export(self, code):
     filename = code
     tikzcode = self._context.render()
-    data = json.dumps(self._context._picture)
-    if filename.endswith(".png"):
-      path = tikzimage(tikzcode)
-      os.system(f"cp {path} {filename}")
+    if filename.endswith(".svg"):
+      write_preview(self._context._picture, self._canvas_manager._canvas,
+                    filename)
+    elif filename.endswith(".png"):
+      self._export_service.submit(filename, tikzcode,
+                                  partial(self._export_done, filename))
     else:
       with open(filename, "w") as f:
         f.write(tikzcode)
@@ -1427,7 +1662,7 @@ class Editor(object):
     object_name = code
     with open(self._get_object_path(object_name)) as f:
       data = json.loads(f.read())
-    with self._modify_picture():
+    with self._modify_picture(appended=True):
       self._context.paste_data(data, *self._pointer.pos(), True)
 
   def _get_object_path(self, name):
@@ -1478,6 +1713,29 @@ class Editor(object):
         f.write("### Write the describe it code here ###")
     os.system("open -a 'Sublime Text' /tmp/english2tikz.desc")
 
-  def _view(self):
-    tikzcode = self._context.render()
-    self._canvas_manager.preview(tikzimage(tikzcode))
+  def _export_done(self, filename, path, error):
+    if error is not None:
+      self._error_msg = str(error)
+    else:
+      shutil.copyfile(path, filename)
+    self._canvas_manager.request_draw()
+
+  def _view(self, code):
+    """
+    The picture is shown with the editor's own layout, unless compiled
+    with LaTeX by :view latex
+    """
+    if code.strip() == "latex":
+      tikzcode = self._context.render()
+      self._export_service.submit("view", tikzcode, self._view_done)
+      return
+    self._canvas_manager.preview(preview_image(self._context._picture,
+                                               self._canvas_manager._canvas))
+    self._canvas_manager.request_draw()
+
+  def _view_done(self, path, error):
+    if error is not None:
+      self._error_msg = str(error)
+    else:
+      self._canvas_manager.preview(path)
+    self._canvas_manager.request_draw()
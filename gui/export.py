@@ -0,0 +1,131 @@
+import os
+import re
+import queue
+import threading
+from english2tikz.latex import compile_tikz, tikz_cache_path
+
+
+"""
+Every picture compiled leaves <sha>.png and <sha>.pdf in the cache
+directory. Only the export_cache_max_entries most recently used pictures
+are kept; the snippet rasters, named <sha>@<dpi>.png, are not counted.
+"""
+export_cache_max_entries = 64
+_export_png = re.compile(r"^[0-9a-f]{64}\.png$")
+
+
+class ExportJob(object):
+  def __init__(self, channel, generation, code, callback):
+    self._channel = channel
+    self._generation = generation
+    self._code = code
+    self._callback = callback
+    self._processes = []
+
+
+class ExportService(object):
+  """
+  Compiles whole pictures to png in a background thread. Jobs are
+  submitted on a channel, e.g. "view" or the name of the exported file,
+  and a new job supersedes the pending or running job on the same
+  channel, whose processes are killed. The callback of a job is called
+  in the Tk thread with the path of the png and the error, if any.
+  """
+
+  def __init__(self, root, cache_dir="view", poll_interval=50):
+    self._root = root
+    self._cache_dir = cache_dir
+    self._poll_interval = poll_interval
+    self._jobs = queue.Queue()
+    self._results = queue.Queue()
+    self._latest = {}
+    self._running = None
+    self._lock = threading.Lock()
+    self._worker = None
+    self._outstanding = 0
+
+  def submit(self, channel, code, callback):
+    path = tikz_cache_path(code, self._cache_dir)
+    with self._lock:
+      generation = self._latest.get(channel, 0) + 1
+      self._latest[channel] = generation
+      running = self._running
+      if running is not None and running._channel == channel:
+        for process in running._processes:
+          process.kill()
+    self._outstanding += 1
+    if self._outstanding == 1:
+      self._root.after(self._poll_interval, self._poll)
+    job = ExportJob(channel, generation, code, callback)
+    if self._is_cached(path):
+      self._results.put((job, path, None))
+      return
+    if self._worker is None:
+      self._worker = threading.Thread(target=self._work, daemon=True)
+      self._worker.start()
+    self._jobs.put(job)
+
+  def _is_cached(self, path):
+    try:
+      os.utime(path)
+      return True
+    except OSError:
+      return False
+
+  def _evict(self):
+    try:
+      entries = [entry for entry in os.scandir(self._cache_dir)
+                 if _export_png.match(entry.name)]
+      entries.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+    except OSError:
+      return
+    for entry in entries[export_cache_max_entries:]:
+      for path in [entry.path, entry.path[:-len(".png")] + ".pdf"]:
+        try:
+          os.remove(path)
+        except OSError:
+          pass
+
+  def _superseded(self, job):
+    return self._latest.get(job._channel) != job._generation
+
+  def _on_process(self, job, process):
+    with self._lock:
+      job._processes.append(process)
+      if self._superseded(job):
+        process.kill()
+
+  def _work(self):
+    while True:
+      job = self._jobs.get()
+      with self._lock:
+        if self._superseded(job):
+          self._results.put((job, None, None))
+          continue
+        self._running = job
+      path, error = None, None
+      try:
+        path = compile_tikz(job._code, self._cache_dir,
+                            lambda process: self._on_process(job, process))
+      except Exception as e:
+        error = e
+      with self._lock:
+        self._running = None
+      if error is None:
+        self._evict()
+      self._results.put((job, path, error))
+
+  def _poll(self):
+    while True:
+      try:
+        job, path, error = self._results.get_nowait()
+      except queue.Empty:
+        break
+      self._outstanding -= 1
+      if not self._superseded(job):
+        job._callback(path, error)
+    if self._outstanding > 0:
+      self._root.after(self._poll_interval, self._poll)
+
+  def pending(self):
+    return self._outstanding > 0
@@ -0,0 +1,135 @@
+import os
+import shutil
+import ctypes
+import tempfile
+import tkinter as tk
+
+
+"""
+Files handed to external editors are kept in a directory made for each
+session, so that editors running at the same time do not overwrite each
+other's files, and watched for changes. Where inotify is available the
+directory is watched through a file handler of Tk, so nothing runs until
+the directory changes; elsewhere the files are polled every
+watch_poll_interval milliseconds. Either way, a file is read again, and
+its callback called, only when its modification time, size or inode
+changed, e.g. not when the editor merely touched the directory.
+"""
+watch_poll_interval = 100
+
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+"""
+Editors that save by renaming a new file over the old one are seen by
+IN_MOVED_TO
+"""
+inotify_mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+def open_inotify(directory):
+  """
+  A non-blocking inotify descriptor watching the directory, or None where
+  inotify is not available
+  """
+  try:
+    libc = ctypes.CDLL(None, use_errno=True)
+    init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+  except (OSError, AttributeError):
+    return None
+  fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+  if fd < 0:
+    return None
+  if add_watch(fd, os.fsencode(directory), inotify_mask) < 0:
+    os.close(fd)
+    return None
+  return fd
+
+
+class FileWatcher(object):
+  def __init__(self, root, directory=None, poll_interval=watch_poll_interval,
+               use_inotify=True):
+    self._root = root
+    self._owned = directory is None
+    if directory is None:
+      directory = tempfile.mkdtemp(prefix="english2tikz-")
+    self._directory = directory
+    self._poll_interval = poll_interval
+    self._watched = {}
+    self._polling = False
+    self._closed = False
+    self._fd = open_inotify(directory) if use_inotify else None
+    if self._fd is not None:
+      try:
+        root.createfilehandler(self._fd, tk.READABLE, self._on_events)
+      except (AttributeError, tk.TclError):
+        os.close(self._fd)
+        self._fd = None
+
+  def path(self, name):
+    return os.path.join(self._directory, name)
+
+  def watch(self, name, callback):
+    """
+    Call callback with the content of the file whenever it changes from
+    now on
+    """
+    self._watched[name] = [self._signature(name), callback]
+    if self._fd is None and not self._polling:
+      self._polling = True
+      self._root.after(self._poll_interval, self._poll)
+
+  def unwatch(self, name):
+    self._watched.pop(name, None)
+
+  def watching(self, name):
+    return name in self._watched
+
+  def _signature(self, name):
+    try:
+      st = os.stat(self.path(name))
+    except OSError:
+      return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+  def check(self):
+    for name, entry in list(self._watched.items()):
+      signature = self._signature(name)
+      if signature is None or signature == entry[0]:
+        continue
+      entry[0] = signature
+      try:
+        with open(self.path(name)) as f:
+          content = f.read()
+      except OSError:
+        continue
+      entry[1](content)
+
+  def _on_events(self, fd, mask):
+    try:
+      while len(os.read(fd, 4096)) > 0:
+        pass
+    except BlockingIOError:
+      pass
+    self.check()
+
+  def _poll(self):
+    if self._closed or len(self._watched) == 0:
+      self._polling = False
+      return
+    self.check()
+    self._root.after(self._poll_interval, self._poll)
+
+  def close(self):
+    self._closed = True
+    self._watched.clear()
+    if self._fd is not None:
+      try:
+        self._root.deletefilehandler(self._fd)
+      except (AttributeError, tk.TclError):
+        pass
+      os.close(self._fd)
+      self._fd = None
+    if self._owned:
+      shutil.rmtree(self._directory, ignore_errors=True)
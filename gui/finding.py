@@ -3,30 +3,67 @@ from english2tikz.utils import *
 from english2tikz.errors import *
 
 
+def label_length(n):
+  """
+  The shortest length such that every candidate gets a distinct label of
+  that many letters
+  """
+  length = 1
+  while 26 ** length < n:
+    length += 1
+  return length
+
+
+def make_label(i, length):
+  chars = []
+  for _ in range(length):
+    chars.append(chr(ord('A') + i % 26))
+    i //= 26
+  return "".join(reversed(chars))
+
+
+class _TrieNode(object):
+  __slots__ = ("children", "count", "value")
+
+  def __init__(self):
+    self.children = {}
+    self.count = 0
+    self.value = None
+
+
 class Finding(object):
+  """
+  The labels of the candidates are kept in a trie, so that typing a
+  letter only descends one node, and in maps from the candidates to
+  their labels, so that the drawers look up the label of every drawn
+  object in constant time. Candidates are ids, or paths, which are
+  looked up by identity.
+  """
   def __init__(self, candidates, toggle=False):
-    self._prefix = ""
     self._toggle = toggle
-    self._candidates = {}
-
     if len(candidates) == 0:
       raise ErrorMessage("No object on screen")
-    elif len(candidates) <= 26:
-      for i in range(0, len(candidates)):
-        c = chr(ord('A') + i)
-        self._candidates[c] = candidates[i]
-    elif len(candidates) <= 26 * 26:
-      for i in range(0, len(candidates)):
-        c = chr(ord('A') + i // 26) + chr(ord('A') + i % 26)
-        self._candidates[c] = candidates[i]
-    elif len(candidates) <= 26 * 26 * 26:
-      for i in range(0, len(candidates)):
-        c = chr(ord('A') + i // (26 * 26)) + \
-            chr(ord('A') + (i // 26) % 26) + \
-            chr(ord('A') + i % 26)
-        self._candidates[c] = candidates[i]
-    else:
-      raise ErrorMessage("Too many objects on screen")
+    self._root = _TrieNode()
+    self._id_labels = {}
+    self._path_labels = {}
+    length = label_length(len(candidates))
+    for i, candidate in enumerate(candidates):
+      label = make_label(i, length)
+      self._insert(label, candidate)
+      if isinstance(candidate, str):
+        self._id_labels[candidate] = label
+      else:
+        self._path_labels[id(candidate)] = label
+    self._nodes = [self._root]
+    self._prefix = ""
+
+  def _insert(self, label, candidate):
+    node = self._root
+    node.count += 1
+    for c in label:
+      node = node.children.setdefault(c, _TrieNode())
+      node.count += 1
+    node.value = candidate
 
   def is_toggle(self):
     return self._toggle
@@ -35,35 +72,33 @@ class Finding(object):
     if char not in string.ascii_lowercase:
       return
     self._prefix += char.upper()
-    current_candidates = self._current_candidates()
-    if len(current_candidates) == 0:
+    node = self._nodes[-1].children.get(char.upper())
+    if node is None:
       raise ErrorMessage(f"Cannot find object with code {self._prefix}")
-    elif len(current_candidates) == 1:
-      return current_candidates[0]
-    else:
+    self._nodes.append(node)
+    if node.count > 1:
       return None
-
-  def _current_candidates(self):
-    return [value for key, value in self._candidates.items()
-            if key.startswith(self._prefix)]
+    while node.value is None:
+      node = next(iter(node.children.values()))
+    return node.value
 
   def back(self):
     if len(self._prefix) > 0:
       self._prefix = self._prefix[:-1]
+      self._nodes.pop()
       return True
     else:
       return False
 
   def get_candidate_code(self, obj):
-    for key, value in self._candidates.items():
-      if not key.startswith(self._prefix):
-        continue
-      if isinstance(value, str):
-        if obj.get("id") == value:
-          return key
-      elif obj == value:
-        return key
-    return None
+    id_ = obj.get("id")
+    if id_ is not None and id_ in self._id_labels:
+      key = self._id_labels[id_]
+    else:
+      key = self._path_labels.get(id(obj))
+    if key is None or not key.startswith(self._prefix):
+      return None
+    return key
 
   def get_chopped_code(self, obj):
     code = self.get_candidate_code(obj)
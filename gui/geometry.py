@@ -1,4 +1,5 @@
 import math
+from english2tikz.utils import bound_by
 
 
 def create_arc_curve(x0, y0, start, end, radius):
@@ -13,25 +14,106 @@ def create_arc_curve(x0, y0, start, end, radius):
 
 
 def clip_line(x0, y0, x1, y1, clip):
+  """
+  The point where the segment from (x0, y0), inside the rectangle, to
+  (x1, y1) leaves the rectangle, computed as in Liang-Barsky.
+  """
   x, y, w, h = clip
-  assert x0 >= x and x0 <= x+w and y0 >= y and y0 <= y+w
+  assert x0 >= x and x0 <= x+w and y0 >= y and y0 <= y+h
   if x1 >= x and x1 <= x+w and y1 >= y and y1 <= y+h:
     return None
-  while (x1 - x0) * (x1 - x0) + (y1 - y0) * (y1 - y0) > 0.001:
-    xm, ym = (x0 + x1) / 2, (y0 + y1) / 2
-    if xm >= x and xm <= x+w and ym >= y and ym <= y+h:
-      x0, y0 = xm, ym
-    else:
-      x1, y1 = xm, ym
-  return x1, y1
+  return _exit_rect(x0, y0, x1, y1, clip)
+
+
+def _exit_rect(x0, y0, x1, y1, clip):
+  x, y, w, h = clip
+  dx, dy = x1 - x0, y1 - y0
+  t = 1
+  if dx > 0:
+    t = min(t, (x + w - x0) / dx)
+  elif dx < 0:
+    t = min(t, (x - x0) / dx)
+  if dy > 0:
+    t = min(t, (y + h - y0) / dy)
+  elif dy < 0:
+    t = min(t, (y - y0) / dy)
+  t = max(t, 0)
+  return x0 + dx * t, y0 + dy * t
+
+
+def clip_line_rounded_rect(x0, y0, x1, y1, clip, radius):
+  """
+  Same as clip_line, but the corners of the rectangle are rounded by
+  the radius, in which case the segment leaves through a corner circle.
+  """
+  x, y, w, h = clip
+  radius = min(radius, w / 2, h / 2)
+  ret = clip_line(x0, y0, x1, y1, clip)
+  if ret is None or radius <= 0:
+    return ret
+  px, py = ret
+  cx = bound_by(px, x + radius, x + w - radius)
+  cy = bound_by(py, y + radius, y + h - radius)
+  if cx == px or cy == py:
+    return ret
+  t = ray_circle_exit(x0, y0, x1 - x0, y1 - y0, cx, cy, radius)
+  if t is None:
+    return ret
+  return x0 + (x1 - x0) * t, y0 + (y1 - y0) * t
+
+
+def ray_circle_exit(x0, y0, dx, dy, cx, cy, radius):
+  """
+  The largest t such that (x0 + t * dx, y0 + t * dy) is on the circle.
+  """
+  fx, fy = x0 - cx, y0 - cy
+  a = dx * dx + dy * dy
+  b = 2 * (fx * dx + fy * dy)
+  c = fx * fx + fy * fy - radius * radius
+  disc = b * b - 4 * a * c
+  if a == 0 or disc < 0:
+    return None
+  return (-b + math.sqrt(disc)) / (2 * a)
+
+
+def ray_ellipse_point(cx, cy, a, b, x1, y1):
+  """
+  The point on the axis-aligned ellipse centered at (cx, cy) in the
+  direction of (x1, y1).
+  """
+  dx, dy = x1 - cx, y1 - cy
+  norm = math.sqrt(dx * dx / (a * a) + dy * dy / (b * b))
+  if norm == 0:
+    return None
+  return cx + dx / norm, cy + dy / norm
+
+
+def last_exit_index(curve, inside):
+  """
+  The index of the point at which the curve last leaves the shape, 0 if
+  it starts outside and does not leave the shape afterwards, or None if
+  it is all inside. The curve may cross the shape any number of times
+  and end inside it, as loops from a node back to itself do, so every
+  point is checked.
+  """
+  ret = None
+  was_inside = None
+  for i, point in enumerate(curve):
+    now_inside = inside(*point)
+    if not now_inside and (was_inside is None or was_inside):
+      ret = i
+    was_inside = now_inside
+  return ret
 
 
 def clip_curve(curve, clip):
   x, y, w, h = clip
-  for i in range(len(curve)):
-    if not point_in_rect(*curve[i], (x, y, x+w, y+h), strict=True):
-      return curve[i:]
-  return None
+  rect = (x, y, x+w, y+h)
+  i = last_exit_index(
+      curve, lambda px, py: point_in_rect(px, py, rect, strict=True))
+  if i is None:
+    return None
+  return curve[i:]
 
 
 def rotate(x, y, x0, y0, angle):
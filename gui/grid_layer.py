@@ -0,0 +1,112 @@
+import math
+from english2tikz.utils import *
+
+
+"""
+The grid and the axes are kept on the canvas between redraws, as items
+tagged "grid", and moved with the coordinate system when scrolling. They
+are built for one view size of margin around the view, and rebuilt only
+when the view is scrolled past the margin or the grid size, zoom or
+visibility changes. Lines closer than min_grid_spacing pixels are
+thinned out, and labels closer than min_label_spacing, so the number of
+items does not depend on the grid size.
+"""
+min_grid_spacing = 8
+min_label_spacing = 40
+
+
+class GridLayer(object):
+  def __init__(self, canvas):
+    self._canvas = canvas
+    self._key = None
+    self._built_center = None
+    self._center = None
+
+  def remove(self):
+    if self._key is not None:
+      self._canvas.delete("grid")
+    self._key = None
+
+  def _thinning(self, grid_size, scale):
+    every = 1
+    while grid_size * scale * every < min_grid_spacing:
+      every *= 2
+    label_every = max(round(1 / grid_size), 1)
+    label_every = label_every * every // math.gcd(label_every, every)
+    while grid_size * scale * label_every < min_label_spacing:
+      label_every *= 2
+    return every, label_every
+
+  def _build(self, cs, grid_size, show_grid, show_axes):
+    c = self._canvas
+    w, h = cs._view_width, cs._view_height
+    if show_grid:
+      every, label_every = self._thinning(grid_size, cs._scale)
+      x0, y0 = cs.reverse_map_point(-w, -h)
+      x1, y1 = cs.reverse_map_point(2 * w, 2 * h)
+      step = grid_size * every
+      for i in range(math.ceil(y1 / step), math.floor(y0 / step) + 1):
+        index = i * every
+        _, y = cs.map_point(0, grid_size * index)
+        c.create_line(-w, y, 2 * w, y, fill="gray", dash=2,
+                      tags=("grid", "grid.line"))
+        if index % label_every == 0:
+          text = "%g" % (index * grid_size)
+          c.create_text(5, y, text=text, anchor="sw", fill="gray",
+                        tags=("grid", "grid.row"))
+          c.create_text(cs.right_boundary()-3, y, text=text, anchor="se",
+                        fill="gray", tags=("grid", "grid.row"))
+      for i in range(math.ceil(x0 / step), math.floor(x1 / step) + 1):
+        index = i * every
+        x, _ = cs.map_point(grid_size * index, 0)
+        c.create_line(x, -h, x, 2 * h, fill="gray", dash=2,
+                      tags=("grid", "grid.line"))
+        if index % label_every == 0:
+          text = "%g" % (index * grid_size)
+          c.create_text(x, 0, text=text, anchor="nw", fill="gray",
+                        tags=("grid", "grid.col"))
+          c.create_text(x, cs.bottom_boundary(), text=text, anchor="sw",
+                        fill="gray", tags=("grid", "grid.col"))
+    if show_axes:
+      c.create_line(-w, cs._centery, 2 * w, cs._centery,
+                    fill="#888888", width=1.5, tags=("grid", "grid.axes"))
+      c.create_line(cs._centerx, -h, cs._centerx, 2 * h,
+                    fill="#888888", width=1.5, tags=("grid", "grid.axes"))
+
+  def draw(self, cs, grid_size, show_grid, show_axes):
+    c = self._canvas
+    key = (grid_size, cs._scale, show_grid, show_axes,
+           cs._view_width, cs._view_height)
+    center = (cs._centerx, cs._centery)
+    if (key != self._key or
+        abs(center[0] - self._built_center[0]) > cs._view_width or
+        abs(center[1] - self._built_center[1]) > cs._view_height):
+      self.remove()
+      self._build(cs, grid_size, show_grid, show_axes)
+      """
+      New items go on top, so the layer is lowered below the items kept
+      from the previous frames
+      """
+      c.tag_lower("grid")
+      self._key = key
+      self._built_center = center
+    elif center != self._center:
+      dx, dy = center[0] - self._center[0], center[1] - self._center[1]
+      c.move("grid.line", dx, dy)
+      c.move("grid.axes", dx, dy)
+      c.move("grid.row", 0, dy)
+      c.move("grid.col", dx, 0)
+    self._center = center
+
+  def draw_pointer_labels(self, c, cs, grid_size, ix, iy):
+    """
+    The labels of the row and column of the pointer are drawn with every
+    frame, over the layer
+    """
+    x, y = cs.map_point(grid_size * ix, grid_size * iy)
+    text = "%g" % (iy * grid_size)
+    c.create_text(5, y, text=text, anchor="sw", fill="red")
+    c.create_text(cs.right_boundary()-3, y, text=text, anchor="se", fill="red")
+    text = "%g" % (ix * grid_size)
+    c.create_text(x, 0, text=text, anchor="nw", fill="red")
+    c.create_text(x, cs.bottom_boundary(), text=text, anchor="sw", fill="red")
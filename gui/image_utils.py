@@ -1,38 +1,215 @@
+import os
+from collections import OrderedDict
 from PIL import Image
 from PIL import ImageTk
 from english2tikz.utils import *
 
 
 """
-Used to keep a reference to the images to prevent the garbage
+Decoded images are kept in an LRU cache bounded by their size in bytes.
+Each file is decoded once into a base image, from which a pyramid of
+levels, each half the size of the previous one, is derived on demand.
+The photo images handed to Tk are resized and rotated from the smallest
+level that is still at least as large as the requested size, so zooming
+does not decode the file again. Entries are keyed by the modification
+time of the file as well, so an edited file is decoded again. Within a
+frame the modification time of each file is read once, so a frame
+showing an image in many items does not stat the file for each of them.
+The sizes of the files are kept as long as some of their images are.
+
+Tk shows a photo image only as long as Python holds a reference to it,
+so the images handed out during the last complete frame and the current
+one are also held outside of the cache, and evicting them from the cache
+does not blank the items still showing them.
+"""
+image_cache_max_bytes = 256 << 20
+image_pyramid_levels = 4
+
+
+def _image_bytes(img):
+  w, h = img.size
+  return w * h * len(img.getbands())
+
+
+class ImageCache(object):
+  def __init__(self, max_bytes=image_cache_max_bytes,
+               max_levels=image_pyramid_levels,
+               photo_image=ImageTk.PhotoImage):
+    self._entries = OrderedDict()
+    self._sizes = {}
+    self._counts = {}
+    self._versions = None
+    self._max_bytes = max_bytes
+    self._max_levels = max_levels
+    self._photo_image = photo_image
+    self._bytes = 0
+    self._hits = 0
+    self._misses = 0
+    self._sources = {}
+    self._shown = {}
+    self._pending = {}
+
+  def begin_frame(self):
+    self._pending = {}
+    self._versions = {}
+
+  def end_frame(self):
+    self._shown = self._pending
+    self._pending = {}
+    self._versions = None
+
+  def cancel_frame(self):
+    """
+    End a frame that did not draw every image, so that the images of the
+    previous frames may still be shown
+    """
+    self._shown.update(self._pending)
+    self._pending = {}
+    self._versions = None
+
+  def _get(self, key):
+    entry = self._entries.get(key)
+    if entry is None:
+      return None
+    self._entries.move_to_end(key)
+    return entry[0]
+
+  def _drop(self, key, entry):
+    value, nbytes = entry
+    self._bytes -= nbytes
+    self._sources.pop(id(value), None)
+    version = key[1:3]
+    self._counts[version] -= 1
+    if self._counts[version] == 0:
+      del self._counts[version]
+      self._sizes.pop(version, None)
+
+  def _put(self, key, value, nbytes):
+    old = self._entries.pop(key, None)
+    if old is not None:
+      self._drop(key, old)
+    self._entries[key] = (value, nbytes)
+    self._bytes += nbytes
+    version = key[1:3]
+    self._counts[version] = self._counts.get(version, 0) + 1
+    """
+    The entry just inserted is never evicted, even if it alone
+    exceeds the limit, because the caller is about to use it
+    """
+    while self._bytes > self._max_bytes and len(self._entries) > 1:
+      self._drop(*self._entries.popitem(last=False))
+
+  def _version(self, path):
+    if self._versions is None:
+      return os.stat(path).st_mtime_ns
+    version = self._versions.get(path)
+    if version is None:
+      version = os.stat(path).st_mtime_ns
+      self._versions[path] = version
+    return version
+
+  def size(self, path, version=None):
+    if version is None:
+      version = self._version(path)
+    size = self._sizes.get((path, version))
+    if size is None:
+      with Image.open(path) as img:
+        size = img.size
+      self._sizes[(path, version)] = size
+    return size
+
+  def _level(self, path, version, level):
+    key = ("level", path, version, level)
+    img = self._get(key)
+    if img is not None:
+      return img
+    if level == 0:
+      img = Image.open(path)
+      img = img.convert("RGBA")
+      self._sizes[(path, version)] = img.size
+    else:
+      img = self._level(path, version, level - 1).reduce(2)
+    self._put(key, img, _image_bytes(img))
+    return img
+
+  def _nearest_level(self, path, version, size):
+    w, h = self.size(path, version)
+    level = 0
+    while (level < self._max_levels and
+           w >> (level + 1) >= size[0] and h >> (level + 1) >= size[1]):
+      level += 1
+    return level
+
+  def get(self, path, scale=1, angle=0, size=None, recreate=False):
+    angle = angle % 360
+    version = self._version(path)
+    if size is None:
+      w, h = self.size(path, version)
+      size = (int(w * scale), int(h * scale))
+    size = (max(size[0], 1), max(size[1], 1))
+    key = ("image", path, version, size, angle)
+    if not recreate:
+      image = self._get(key)
+      if image is not None:
+        self._hits += 1
+        self._pending[id(image)] = (image, self._sources.get(id(image)))
+        return image
+    self._misses += 1
+    img = self._level(path, version,
+                      self._nearest_level(path, version, size))
+    if img.size != size:
+      img = img.resize(size)
+    if angle != 0:
+      img = img.rotate(angle, expand=True)
+    image = self._photo_image(img)
+    self._put(key, image, _image_bytes(img))
+    self._sources[id(image)] = img
+    self._pending[id(image)] = (image, img)
+    return image
+
+  def source(self, image):
+    """
+    The PIL image a photo image was made from, for drawing it somewhere
+    other than on the canvas
+    """
+    ret = self._sources.get(id(image))
+    if ret is None:
+      _, ret = self._pending.get(id(image),
+                                 self._shown.get(id(image), (None, None)))
+    return ret
+
+  def clear(self):
+    self._entries.clear()
+    self._sources.clear()
+    self._sizes.clear()
+    self._counts.clear()
+    self._shown = {}
+    self._pending = {}
+    self._bytes = 0
+
+  def stats(self):
+    return {
+        "hits": self._hits,
+        "misses": self._misses,
+        "bytes": self._bytes,
+        "entries": len(self._entries),
+    }
+
+
+"""
+Also used to keep a reference to the images to prevent the garbage
 collector from collecting the images
 """
-image_references = {}
+image_cache = ImageCache()
 
 
-def get_image_from_path(path, scale, id_, angle=0, recreate=False,
+def get_image_from_path(path, scale, angle=0, recreate=False,
                         reset_size=None):
-  global image_references
   """
-  The id_ here is used to force creating a new image, because
-  each image can appear in at most one place
+  The same image is shared by every object showing the file at the same
+  size and angle, since Tk can show a photo image in any number of items
   """
-  if not recreate:
-    image = image_references.get((path, scale, id_, angle))
-    if image is not None:
-      return image
-  img = Image.open(path)
-  img = img.convert("RGBA")
-  w, h = img.size
-  if reset_size is None:
-    img = img.resize((int(w * scale), int(h * scale)))
-  else:
-    img = img.resize(reset_size)
-  if angle != 0:
-    img = img.rotate(angle % 360, expand=True)
-  image = ImageTk.PhotoImage(img)
-  image_references[(path, scale, id_, angle)] = image
-  return image
+  return image_cache.get(path, scale, angle, reset_size, recreate)
 
 
 def extract_image_path(text):
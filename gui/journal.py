@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import shutil
+import queue
+import threading
+from hashlib import sha256
+from english2tikz.compact import json_default, is_mapping
+
+
+"""
+An append-only journal of the changes to the picture, so that unsaved
+work survives a crash. Every change is recorded as a splice: the objects
+between start and start+delete are replaced by the inserted ones. The
+records are serialized in the Tk thread, as the objects may be modified
+in place afterwards, and written by a background thread, which fsyncs
+once for all the records queued meanwhile. After journal_compact_records
+records, the whole picture is written as a snapshot and the log starts
+over, so that replaying stays cheap.
+"""
+journal_compact_records = 1000
+journal_compact_bytes = 4 << 20
+
+
+def picture_splice(before, after):
+  """
+  The smallest single splice turning before into after, found by
+  skipping the common prefix and suffix
+  """
+  n, m = len(before), len(after)
+  start = 0
+  while start < n and start < m and before[start] == after[start]:
+    start += 1
+  end = 0
+  while (end < n - start and end < m - start and
+         before[n-1-end] == after[m-1-end]):
+    end += 1
+  return start, n - start - end, after[start:m-end]
+
+
+def appended_splice(before_length, after):
+  return before_length, 0, after[before_length:]
+
+
+def _contains(obj, ids):
+  if id(obj) in ids:
+    return True
+  for item in obj.get("items", []):
+    if not is_mapping(item):
+      continue
+    if id(item) in ids:
+      return True
+    for annotate in item.get("annotates", []):
+      if id(annotate) in ids:
+        return True
+  return False
+
+
+def touched_splice(picture, touched):
+  """
+  The splice replacing the span of the objects an edit changed in place,
+  found by identity instead of by comparing the objects. Path items and
+  annotations count as their path
+  """
+  ids = {id(obj) for obj in touched}
+  start, end = None, None
+  for i, obj in enumerate(picture):
+    if _contains(obj, ids):
+      if start is None:
+        start = i
+      end = i + 1
+  if start is None:
+    return 0, 0, []
+  return start, end - start, picture[start:end]
+
+
+def apply_splice(picture, start, delete, insert):
+  picture[start:start+delete] = insert
+
+
+"""
+The journal of a file is kept under a directory named after its path.
+Untitled sessions journal under a directory named after their process,
+so that concurrent sessions do not write over each other, and a later
+untitled session recovers the journals left by the sessions that are no
+longer running
+"""
+def journal_dir_for(base, filename=None, pid=None):
+  if filename is None:
+    pid = os.getpid() if pid is None else pid
+    return os.path.join(base, "journal", "untitled", str(pid))
+  name = sha256(bytes(os.path.abspath(filename), "utf8")).hexdigest()
+  return os.path.join(base, "journal", name)
+
+
+def _running(pid):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    return True
+  return True
+
+
+def leftover_untitled_journals(base):
+  """
+  The directories of the journals of the untitled sessions that are no
+  longer running, newest first. The journal of this process is among
+  them, as it can only be left by a session whose process id was reused
+  """
+  directory = os.path.join(base, "journal", "untitled")
+  if not os.path.isdir(directory):
+    return []
+  ret = []
+  for name in os.listdir(directory):
+    if not name.isdigit():
+      continue
+    pid = int(name)
+    if pid == os.getpid() or not _running(pid):
+      ret.append(os.path.join(directory, name))
+  ret.sort(key=os.path.getmtime, reverse=True)
+  return ret
+
+
+def remove_journal(directory):
+  shutil.rmtree(directory, ignore_errors=True)
+
+
+def keep_journal(directory):
+  """
+  Move a journal that cannot be recovered out of the way, where it can
+  still be recovered by hand, and return where it went
+  """
+  kept = f"{directory}.{time.time_ns()}"
+  os.replace(directory, kept)
+  return kept
+
+
+"""
+The snapshots of the journal of a file record the modification time and
+size of the file it was journaled over, so that the journal is not
+recovered over a file saved or edited after it
+"""
+def file_stamp(filename):
+  if filename is None:
+    return None
+  try:
+    st = os.stat(filename)
+  except OSError:
+    return None
+  return [st.st_mtime_ns, st.st_size]
+
+
+def _fsync_write(path, data):
+  with open(path + ".tmp", "w") as f:
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(path + ".tmp", path)
+
+
+class Journal(object):
+  def __init__(self, directory, stamp=None):
+    self._directory = directory
+    self._stamp = stamp
+    self._recovered_stamp = None
+    self._snapshot_path = os.path.join(directory, "snapshot.json")
+    self._log_path = os.path.join(directory, "journal.log")
+    self._queue = queue.Queue()
+    self._seq = 0
+    self._nextid = None
+    self._dirty = False
+    self._records = 0
+    self._bytes = 0
+    self._thread = None
+
+  def recover(self):
+    """
+    The state (picture and nextid) left by a session that did not save
+    before it ended, or None
+    """
+    if not os.path.exists(self._snapshot_path):
+      return None
+    with open(self._snapshot_path) as f:
+      snapshot = json.loads(f.read())
+    picture, nextid = snapshot["picture"], snapshot["nextid"]
+    self._recovered_stamp = snapshot.get("file")
+    dirty = not snapshot.get("clean", False)
+    self._seq = snapshot["seq"]
+    if os.path.exists(self._log_path):
+      with open(self._log_path) as f:
+        for line in f:
+          try:
+            record = json.loads(line)
+          except ValueError:
+            """
+            The last record may be partially written
+            """
+            break
+          if record["seq"] <= self._seq:
+            continue
+          apply_splice(picture, record["start"], record["delete"],
+                       record["insert"])
+          if "nextid" in record:
+            nextid = record["nextid"]
+          self._seq = record["seq"]
+          dirty = True
+    if not dirty:
+      return None
+    return {"picture": picture, "nextid": nextid}
+
+  def recovered_stamp(self):
+    """
+    The stamp of the file the recovered journal was kept over
+    """
+    return self._recovered_stamp
+
+  def dirty(self):
+    return self._dirty
+
+  def start(self, picture, nextid, clean=True):
+    os.makedirs(self._directory, exist_ok=True)
+    self._thread = threading.Thread(target=self._work, daemon=True)
+    self._thread.start()
+    self.snapshot(picture, nextid, clean)
+
+  def record(self, before, after, nextid, splice=None):
+    if self._thread is None:
+      return
+    if splice is None:
+      splice = picture_splice(before, after)
+    start, delete, insert = splice
+    if delete == 0 and len(insert) == 0 and nextid == self._nextid:
+      return
+    self._seq += 1
+    self._dirty = True
+    record = {"seq": self._seq, "start": start, "delete": delete,
+              "insert": insert}
+    if nextid != self._nextid:
+      record["nextid"] = nextid
+      self._nextid = nextid
+    line = json.dumps(record, default=json_default) + "\n"
+    self._records += 1
+    self._bytes += len(line)
+    self._queue.put(("record", line))
+    if (self._records >= journal_compact_records or
+        self._bytes >= journal_compact_bytes):
+      self.snapshot(after, nextid, False)
+
+  def snapshot(self, picture, nextid, clean=False):
+    if self._thread is None:
+      return
+    self._nextid = nextid
+    self._dirty = not clean
+    data = json.dumps({"seq": self._seq, "clean": clean,
+                       "nextid": nextid, "file": self._stamp,
+                       "picture": picture},
+                      default=json_default)
+    self._records = 0
+    self._bytes = 0
+    self._queue.put(("snapshot", data))
+
+  def close(self, remove=False):
+    if self._thread is None:
+      return
+    self._queue.put(("close", remove))
+    self._thread.join()
+    self._thread = None
+
+  def flush(self):
+    done = threading.Event()
+    self._queue.put(("flush", done))
+    done.wait()
+
+  def _work(self):
+    log = open(self._log_path, "a")
+    while True:
+      batch = [self._queue.get()]
+      while True:
+        try:
+          batch.append(self._queue.get_nowait())
+        except queue.Empty:
+          break
+      written = False
+      for kind, value in batch:
+        if kind == "record":
+          log.write(value)
+          written = True
+        elif kind == "snapshot":
+          if written:
+            log.flush()
+            os.fsync(log.fileno())
+            written = False
+          _fsync_write(self._snapshot_path, value)
+          log.close()
+          log = open(self._log_path, "w")
+        elif kind == "flush":
+          if written:
+            log.flush()
+            os.fsync(log.fileno())
+            written = False
+          value.set()
+        elif kind == "close":
+          if written:
+            log.flush()
+            os.fsync(log.fileno())
+          log.close()
+          if value:
+            for path in [self._log_path, self._snapshot_path]:
+              if os.path.exists(path):
+                os.remove(path)
+            try:
+              os.rmdir(self._directory)
+            except OSError:
+              pass
+          return
+      if written:
+        log.flush()
+        os.fsync(log.fileno())
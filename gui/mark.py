@@ -39,7 +39,7 @@ class MarkManager(object):
   def append(self, mark):
     self._marks.append(mark)
 
-  def _get_pos(self, i, bounding_boxes, buffer={}):
+  def _get_pos(self, i, bounding_boxes, buffer):
     if i in buffer:
       return buffer[i]
 
@@ -58,8 +58,8 @@ class MarkManager(object):
         It's useless in tikz to shift a node name coordinate without specifying
         the anchor.
         """
-        x += dist_to_num(mark.get("xshift", 0))
-        y += dist_to_num(mark.get("yshift", 0))
+        dx, dy = get_xy(mark, "xshift", "yshift")
+        x, y = x + dx, y + dy
       buffer[i] = (x, y)
       return x, y
     elif is_type(mark, "intersection"):
@@ -75,33 +75,33 @@ class MarkManager(object):
       if mark.get("relative", False):
         if i == 0:
           return None
-        previous = self._get_pos(i-1, buffer)
+        previous = self._get_pos(i-1, bounding_boxes, buffer)
         if previous is None:
           return None
         x0, y0 = previous
-        x = x0 + dist_to_num(mark["x"])
-        y = y0 + dist_to_num(mark["y"])
+        dx, dy = get_xy(mark)
+        x, y = x0 + dx, y0 + dy
       else:
-        x, y = dist_to_num(mark["x"], mark["y"])
+        x, y = get_xy(mark)
       buffer[i] = (x, y)
       return x, y
     elif is_type(mark, "arc"):
       if i == 0:
         return None
-      previous = self._get_pos(i-1, buffer)
+      previous = self._get_pos(i-1, bounding_boxes, buffer)
       if previous is None:
         return None
       x0, y0 = previous
       start = int(mark["start"])
       end = int(mark["end"])
-      radius = dist_to_num(mark["radius"])
+      radius = get_dist(mark, "radius")
       dx1, dy1 = math.cos(start*math.pi/180), math.sin(start*math.pi/180)
       dx2, dy2 = math.cos(end*math.pi/180), math.sin(end*math.pi/180)
       x, y = x0+(dx2-dx1)*radius, y0+(dy2-dy1)*radius
       buffer[i] = (x, y)
       return x, y
     elif is_type(mark, "cycle"):
-      buffer[i] = self._get_pos(0, buffer)
+      buffer[i] = self._get_pos(0, bounding_boxes, buffer)
       return buffer[i]
     else:
       raise ValueError(f"Unknown mark type {mark['type']}")
@@ -112,7 +112,7 @@ class MarkManager(object):
   def get_last_pos(self, bounding_boxes):
     if self.empty():
       raise IndexError("Empty marks")
-    return self._get_pos(len(self._marks)-1, bounding_boxes)
+    return self._get_pos(len(self._marks)-1, bounding_boxes, buffer={})
 
   def create_path(self, arrow):
     if self.size() < 2:
@@ -52,7 +52,7 @@ def get_original_pos(obj, bounding_boxes, position=None):
     return at_bounding_box.get_anchor_pos(
         obj.get("at.anchor", "center"))
   elif at["type"] == "coordinate":
-    return dist_to_num(at.get("x", 0), at.get("y", 0))
+    return get_xy(at)
   elif at["type"] == "intersection":
     x, _ = bounding_boxes[at["name1"]].get_anchor_pos(
         at.get("anchor1", "center"))
@@ -68,7 +68,7 @@ def get_rounded_corners(obj, default):
   if rounded_corners is True:
     return default
   if rounded_corners is not None:
-    return dist_to_num(rounded_corners)
+    return get_dist(obj, "rounded.corners")
   return None
 
 
@@ -206,19 +206,19 @@ def get_first_absolute_coordinate(data):
     if is_type(at, "coordinate"):
       if at.get("relative", False):
         raise ValueError("An object cannot have relative coordinate")
-      return dist_to_num(at.get("x", 0), at.get("y", 0))
+      return get_xy(at)
     if "id" in obj and at is None:
       return 0, 0
     items = obj.get("items")
     if items is not None:
       for item in items:
         if is_type(item, "coordinate") and not item.get("relative", False):
-          return dist_to_num(item.get("x", 0), item.get("y", 0))
+          return get_xy(item)
   return None
 
 
-def get_top_left_corner(data, bounding_boxes):
-  x0, y0, x1, y1 = get_bounding_box(data, bounding_boxes)
+def get_top_left_corner(data, bounding_boxes, path_boxes=None):
+  x0, y0, x1, y1 = get_bounding_box(data, bounding_boxes, path_boxes)
   return x0, y0
 
 
@@ -342,8 +342,7 @@ def generate_path_positions_and_draws(path, bounding_boxes):
         xshift, yshift = 0, 0
         new_pos_clip = bounding_boxes[name]
       else:
-        xshift = dist_to_num(item.get("xshift", 0))
-        yshift = dist_to_num(item.get("yshift", 0))
+        xshift, yshift = get_xy(item, "xshift", "yshift")
         new_pos_clip = None
       x, y = bounding_boxes[name].get_anchor_pos(anchor)
       positions.append(((x + xshift, y + yshift), new_pos_clip, item, index))
@@ -351,8 +350,7 @@ def generate_path_positions_and_draws(path, bounding_boxes):
     elif is_type(item, "point"):
       bounding_boxes[item["id"]] = BoundingBox(*current_pos, 0, 0)
     elif is_type(item, "coordinate"):
-      dx = dist_to_num(item.get("x", 0))
-      dy = dist_to_num(item.get("y", 0))
+      dx, dy = get_xy(item)
       if item.get("relative", False):
         assert current_pos is not None, "Relative position without current position"
         x, y = current_pos
@@ -381,7 +379,7 @@ def generate_path_positions_and_draws(path, bounding_boxes):
       draws.append((len(positions)-1, len(positions), item, index))
       start = int(item["start"])
       end = int(item["end"])
-      radius = dist_to_num(item["radius"])
+      radius = get_dist(item, "radius")
       assert current_pos is not None, "Starting position not set yet"
       x0, y0 = current_pos
       dx1, dy1 = math.cos(start*math.pi/180), math.sin(start*math.pi/180)
@@ -0,0 +1,57 @@
+import math
+from english2tikz.utils import *
+from english2tikz.gui.object_utils import *
+
+
+class PointCollection(object):
+  """
+  The points the pointer snaps to: the anchors of the nodes and the
+  positions of the paths. Only the bounding boxes and the position lists
+  computed for drawing are kept, in drawing order. The anchors of a box
+  are only computed when the pointer may be closer to it than to the
+  closest point found so far, and the nodename is only created for the
+  point finally chosen.
+  """
+  def __init__(self):
+    self._entries = []
+
+  def __len__(self):
+    return len(self._entries)
+
+  def add_box(self, id_, bb):
+    self._entries.append((id_, bb, None))
+
+  def add_path(self, obj, positions):
+    if len(positions) > 0:
+      self._entries.append((None, obj, positions))
+
+  def closest(self, x, y):
+    """
+    In the format of Pointer.closest: (item, pos, path, index), where the
+    path and index are None for the anchor of a node
+    """
+    mindist, target = None, None
+    for id_, obj, positions in self._entries:
+      if positions is None:
+        bb = obj
+        cx, cy = bb.rotated_geometry_center()
+        bound = (math.hypot(cx - x, cy - y) -
+                 math.hypot(bb._width, bb._height) / 2 - 1e-9)
+        if mindist is not None and bound >= mindist:
+          continue
+        for a in anchor_list:
+          ax, ay = bb.get_anchor_pos(a)
+          dist = math.hypot(ax - x, ay - y)
+          if mindist is None or dist < mindist:
+            mindist, target = dist, (id_, a, (ax, ay), None, None)
+      else:
+        for pos, _, item, index in positions:
+          dist = math.hypot(pos[0] - x, pos[1] - y)
+          if mindist is None or dist < mindist:
+            mindist, target = dist, (None, item, pos, obj, index)
+    if target is None:
+      return None
+    id_, item, pos, obj, index = target
+    if id_ is not None:
+      item = create_nodename(id_, item)
+    return item, pos, obj, index
@@ -90,15 +90,8 @@ class Pointer(object):
           *self._cs.closest_in_view(*self.vpos()))))
 
   def find_closest(self, point_collection):
-    target_item, mindist, target_pos, target_obj, target_index = None, None, None, None, None
-    for item, pos, obj, index in point_collection:
-      if mindist is None or euclidean_dist(pos, self.pos()) < mindist:
-        target_item, mindist, target_pos, target_obj, target_index = item, euclidean_dist(pos, self.pos()), pos, obj, index
-    if target_item is not None:
-      self._closest = (target_item, target_pos, target_obj, target_index)
-    else:
-      self._closest = None
-  
+    self._closest = point_collection.closest(*self.pos())
+
   def has_closest(self):
     return self._closest is not None
   
@@ -0,0 +1,85 @@
+from english2tikz.utils import *
+from english2tikz.errors import *
+from english2tikz.gui.display_list import DisplayList
+from english2tikz.gui.backends import render_pil, render_svg
+from english2tikz.gui.coordinate_system import CoordinateSystem
+from english2tikz.gui.selection import Selection
+from english2tikz.gui.point_collection import PointCollection
+from english2tikz.gui.bounding_box import enlarge_bound_box
+from english2tikz.gui.drawers import BoxDrawer, PathDrawer
+
+
+"""
+Previews of a picture drawn with the editor's own layout instead of
+LaTeX, taking milliseconds instead of seconds. The picture is drawn into
+a display list at preview_scale pixels per unit, and cropped to its
+bound with preview_margin pixels around it. Formulas are shown with the
+rasters already in the snippet cache, and compiled on the spot otherwise,
+as a preview is written once and not redrawn when a background
+compilation finishes. A formula that cannot be compiled is left out
+rather than shown as its source. The pdflatex export is still the one to
+use for the final picture.
+"""
+preview_scale = 100
+preview_margin = 10
+preview_background = (255, 255, 255, 255)
+
+
+def layout_picture(picture, measure, scale=preview_scale,
+                   margin=preview_margin):
+  """
+  Returns the display list of the picture, moved so that its bound starts
+  at (margin, margin), and the size of the preview
+  """
+  cs = CoordinateSystem(0, 0, scale)
+  cs._scale = scale
+  env = {
+      "bounding box": {},
+      "path boxes": {},
+      "point collection": PointCollection(),
+      "coordinate system": cs,
+      "selection": Selection(None),
+      "image references": {},
+      "finding": None,
+      "preview": True,
+  }
+  drawers = [BoxDrawer(), PathDrawer()]
+  drawn = DisplayList(measure)
+  for obj in picture:
+    drawer = next((d for d in drawers if d.match(obj)), None)
+    if drawer is None:
+      raise ConfigurationError(f"Cannot find drawer for obj {obj}")
+    drawn.source = obj.get("id") or id(obj)
+    drawer.draw(drawn, obj, env)
+  drawn.source = None
+  x0, y0, x1, y1 = None, None, None, None
+  for _, _, _, (x2, y2, x3, y3), _ in drawn.items():
+    x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x2, y2)
+    x0, y0, x1, y1 = enlarge_bound_box(x0, y0, x1, y1, x3, y3)
+  if x0 is None:
+    return drawn, 2 * margin, 2 * margin
+  moved = DisplayList(measure)
+  drawn.replay(moved, margin - x0, margin - y0)
+  return (moved, int(math.ceil(x1 - x0)) + 2 * margin,
+          int(math.ceil(y1 - y0)) + 2 * margin)
+
+
+def preview_image(picture, measure, scale=preview_scale):
+  display_list, width, height = layout_picture(picture, measure, scale)
+  return render_pil(display_list, width, height,
+                    background=preview_background)
+
+
+def preview_svg(picture, measure, scale=preview_scale):
+  display_list, width, height = layout_picture(picture, measure, scale)
+  return render_svg(display_list, width, height)
+
+
+def write_preview(picture, measure, filename, scale=preview_scale):
+  if filename.endswith(".svg"):
+    with open(filename, "w") as f:
+      f.write(preview_svg(picture, measure, scale))
+  elif filename.endswith(".png"):
+    preview_image(picture, measure, scale).save(filename)
+  else:
+    raise ErrorMessage(f"Preview must be .svg or .png: {filename}")
@@ -0,0 +1,187 @@
+from english2tikz.utils import *
+from english2tikz.gui.object_utils import *
+
+
+"""
+Postings from every substring of up to this length, of the keys and of
+the string values of the searchable objects, to the objects
+"""
+search_gram_length = 3
+
+
+def _grams(s):
+  ret = set()
+  for k in range(1, search_gram_length + 1):
+    for i in range(len(s) - k + 1):
+      ret.add(s[i:i+k])
+  return ret
+
+
+def _query_grams(s):
+  if len(s) <= search_gram_length:
+    return {s}
+  return {s[i:i+search_gram_length]
+          for i in range(len(s) - search_gram_length + 1)}
+
+
+class _Entry(object):
+  """
+  The objects searchable from one object of the picture: the object
+  itself and its annotations. The label orders the entries as the
+  picture does, and is kept between the labels of the neighbours when
+  entries are inserted, so that results are sorted without looking up
+  their positions in the picture.
+  """
+  __slots__ = ("obj", "label", "units")
+
+  def __init__(self, obj, label):
+    self.obj = obj
+    self.label = label
+    self.units = []
+
+
+class SearchIndex(object):
+  def __init__(self):
+    self.rebuild([])
+
+  def rebuild(self, picture):
+    self._entries = []
+    self._units = {}
+    self._value_postings = {}
+    self._key_postings = {}
+    self._next_uid = 0
+    for i, obj in enumerate(picture):
+      self._entries.append(self._add_entry(obj, float(i)))
+
+  def _units_of(self, obj):
+    units = [obj]
+    for item in obj.get("items", []):
+      if is_mapping(item):
+        units += [annotate for annotate in item.get("annotates", [])]
+    return units
+
+  def _add_entry(self, obj, label):
+    entry = _Entry(obj, label)
+    for sub, unit in enumerate(self._units_of(obj)):
+      uid = self._next_uid
+      self._next_uid += 1
+      keys, values = set(), set()
+      for k, v in unit.items():
+        keys |= _grams(k)
+        if isinstance(v, str):
+          values |= _grams(v)
+      for gram in keys:
+        self._key_postings.setdefault(gram, set()).add(uid)
+      for gram in values:
+        self._value_postings.setdefault(gram, set()).add(uid)
+      self._units[uid] = (entry, sub, unit, keys, values)
+      entry.units.append(uid)
+    return entry
+
+  def _remove_entry(self, entry):
+    for uid in entry.units:
+      _, _, _, keys, values = self._units.pop(uid)
+      for gram in keys:
+        self._discard(self._key_postings, gram, uid)
+      for gram in values:
+        self._discard(self._value_postings, gram, uid)
+
+  def _discard(self, postings, gram, uid):
+    uids = postings[gram]
+    uids.discard(uid)
+    if len(uids) == 0:
+      del postings[gram]
+
+  def apply(self, picture, start, delete, insert):
+    """
+    Update the index for the splice of the picture, in time
+    proportional to the size of the splice, apart from a check that the
+    other objects are still the indexed ones
+    """
+    for entry in self._entries[start:start+delete]:
+      self._remove_entry(entry)
+    lo = self._entries[start-1].label if start > 0 else -1.0
+    hi = (self._entries[start+delete].label
+          if start + delete < len(self._entries) else lo + len(insert) + 1)
+    step = (hi - lo) / (len(insert) + 1)
+    self._entries[start:start+delete] = [
+        self._add_entry(obj, lo + step * (i + 1))
+        for i, obj in enumerate(insert)]
+    if len(insert) > 0 and step <= abs(hi) * 1e-9:
+      for i, entry in enumerate(self._entries):
+        entry.label = float(i)
+    if len(self._entries) != len(picture):
+      self.rebuild(picture)
+      return
+    for i, entry in enumerate(self._entries):
+      if entry.obj is not picture[i]:
+        self._remove_entry(entry)
+        self._entries[i] = self._add_entry(picture[i], entry.label)
+
+  def _repoint_entry(self, entry, obj):
+    """
+    Point the entry to an equal copy of its object, keeping its grams
+    """
+    units = self._units_of(obj)
+    if len(units) != len(entry.units):
+      return False
+    entry.obj = obj
+    for uid, unit in zip(entry.units, units):
+      owner, sub, _, keys, values = self._units[uid]
+      self._units[uid] = (owner, sub, unit, keys, values)
+    return True
+
+  def repoint(self, picture, start, delete, insert):
+    """
+    Update the index for a picture replaced by copies of the indexed
+    objects apart from the splice, as undo and redo do. The entries out
+    of the splice are pointed to the copies without indexing them again
+    """
+    shift = len(insert) - delete
+    for i, entry in enumerate(self._entries):
+      if start <= i < start + delete:
+        continue
+      j = i if i < start else i + shift
+      if j >= len(picture) or not self._repoint_entry(entry, picture[j]):
+        self.rebuild(picture)
+        return
+    self.apply(picture, start, delete, insert)
+
+  def _candidates(self, postings, s):
+    if len(s) == 0:
+      return None
+    ret = None
+    for gram in sorted(_query_grams(s),
+                       key=lambda g: len(postings.get(g, ()))):
+      uids = postings.get(gram)
+      if uids is None:
+        return set()
+      ret = set(uids) if ret is None else ret & uids
+      if len(ret) == 0:
+        break
+    return ret
+
+  def search(self, filters):
+    """
+    The objects satisfying the filters, in the order of the picture, as
+    satisfy_filters would find them
+    """
+    candidates = None
+    for key, value in filters:
+      for postings, s in [(self._key_postings, key),
+                          (self._value_postings, value)]:
+        if s is None:
+          continue
+        uids = self._candidates(postings, s)
+        if uids is None:
+          continue
+        candidates = uids if candidates is None else candidates & uids
+    if candidates is None:
+      candidates = self._units.keys()
+    matches = []
+    for uid in candidates:
+      entry, sub, unit, _, _ = self._units[uid]
+      if satisfy_filters(unit, filters):
+        matches.append((entry.label, sub, unit))
+    matches.sort(key=lambda match: match[:2])
+    return [unit for _, _, unit in matches]
@@ -4,13 +4,22 @@ from english2tikz.gui.object_utils import *
 
 
 class Selection(object):
-  def __init__(self, context):
+  def __init__(self, context, index=None):
     self._context = context
+    self._index = index
     self.clear()
 
   def clear(self):
+    """
+    The ids and paths are kept in the order they were selected, for
+    jumping between them, and in a set and a dict keyed by the identity
+    of the paths, for the membership tests done by the drawers on every
+    object in every frame
+    """
     self._selected_ids = []
+    self._selected_id_set = set()
     self._selected_paths = []
+    self._selected_path_dict = {}
     self._selected_path_position_index = 0
     self._selected_path_position = None
     self._jump_to_select_index = 0
@@ -191,10 +200,60 @@ class Selection(object):
             self._selected_path_position == index)
 
   def selected_id(self, id_):
-    return id_ in self._selected_ids
+    return id_ in self._selected_id_set
 
   def selected_path(self, path):
-    return path in self._selected_paths
+    return id(path) in self._selected_path_dict
+
+  def _set_ids(self, ids):
+    self._selected_ids = ids
+    self._selected_id_set = set(ids)
+
+  def _set_paths(self, paths):
+    self._selected_paths = paths
+    self._selected_path_dict = {id(path): path for path in paths}
+
+  def _add_id(self, id_):
+    if id_ not in self._selected_id_set:
+      self._selected_id_set.add(id_)
+      self._selected_ids.append(id_)
+
+  def _add_path(self, path):
+    if id(path) not in self._selected_path_dict:
+      self._selected_path_dict[id(path)] = path
+      self._selected_paths.append(path)
+
+  def _split_items(self, items):
+    ids, paths = {}, {}
+    for item in items:
+      if isinstance(item, str):
+        ids[item] = True
+      elif is_type(item, "box") or is_type(item, "text"):
+        ids[item["id"]] = True
+      elif is_type(item, "path"):
+        paths[id(item)] = item
+      else:
+        raise ValueError(f"Invalid item {item}")
+    return ids, paths
+
+  def refresh(self):
+    """
+    Undo and redo replace the objects of the picture by equal copies, so
+    the selected paths are looked up again among the current objects
+    """
+    current = {id(obj): obj for obj in self._context._picture}
+    paths = []
+    for path in self._selected_paths:
+      if id(path) in current:
+        paths.append(path)
+        continue
+      for obj in self._context._picture:
+        if is_type(obj, "path") and obj == path:
+          paths.append(obj)
+          break
+    if len(paths) != len(self._selected_paths):
+      self._selected_path_position = None
+    self._set_paths(paths)
 
   def update(self, mode, *items):
     if mode == "clear":
@@ -215,58 +274,51 @@ class Selection(object):
     self.include(*items)
 
   def toggle(self, *items):
-    for item in items:
-      if isinstance(item, str):
-        self._selected_ids = toggle_element(self._selected_ids, item)
-        self._selected_path_position = None
-      elif is_type(item, "box") or is_type(item, "text"):
-        self._selected_ids = toggle_element(self._selected_ids, item["id"])
-        self._selected_path_position = None
-      elif is_type(item, "path"):
-        self._selected_paths = toggle_element(self._selected_paths, item)
-        self._selected_path_position = None
-      else:
-        raise ValueError(f"Invalid item {item}")
+    ids, paths = self._split_items(items)
+    if len(items) > 0:
+      self._selected_path_position = None
+    selected_ids = [id_ for id_ in self._selected_ids if id_ not in ids]
+    selected_paths = [path for path in self._selected_paths
+                      if id(path) not in paths]
+    selected_ids += [id_ for id_ in ids if id_ not in self._selected_id_set]
+    selected_paths += [path for key, path in paths.items()
+                       if key not in self._selected_path_dict]
+    self._set_ids(selected_ids)
+    self._set_paths(selected_paths)
 
   def include(self, *items):
     self._selected_anchor = None
     for item in items:
       if isinstance(item, str):
-        append_if_not_in(self._selected_ids, item)
+        self._add_id(item)
         self._selected_path_position = None
       elif is_type(item, "box") or is_type(item, "text"):
-        append_if_not_in(self._selected_ids, item["id"])
+        self._add_id(item["id"])
         self._selected_path_position = None
       elif is_type(item, "path"):
-        append_if_not_in(self._selected_paths, item)
+        self._add_path(item)
         self._selected_path_position = None
       else:
         raise ValueError(f"Invalid item {item}")
 
   def exclude(self, *items):
-    for item in items:
-      if isinstance(item, str):
-        self._selected_ids = remove_if_in(self._selected_ids, item)
-        self._selected_path_position = None
-      elif is_type(item, "box") or is_type(item, "text"):
-        self._selected_ids = remove_if_in(self._selected_ids, item["id"])
-        self._selected_path_position = None
-      elif is_type(item, "path"):
-        self._selected_paths = remove_if_in(self._selected_paths, item)
-        self._selected_path_position = None
-      else:
-        raise ValueError(f"Invalid item {item}")
+    ids, paths = self._split_items(items)
+    if len(items) > 0:
+      self._selected_path_position = None
+    self._set_ids([id_ for id_ in self._selected_ids if id_ not in ids])
+    self._set_paths([path for path in self._selected_paths
+                     if id(path) not in paths])
 
   def intersect(self, *items):
     items = [item for item in items if self.selected(item)]
     self.clear()
     for item in items:
       if isinstance(item, str):
-        self._selected_ids.append(item)
+        self._add_id(item)
       elif is_type(item, "box") or is_type(item, "text"):
-        self._selected_ids.append(item["id"])
+        self._add_id(item["id"])
       elif is_type(item, "path"):
-        self._selected_paths.append(item)
+        self._add_path(item)
       else:
         raise ValueError(f"Invalid item {item}")
 
@@ -337,28 +389,37 @@ class Selection(object):
     if len(filters) == 0:
       raise ErrorMessage("No filter given")
 
+    if self._index is not None:
+      objs = self._index.search(filters)
+    else:
+      objs = self._search_objects(filters)
+    for obj in objs:
+      if "id" in obj:
+        self._add_id(obj["id"])
+      elif is_type(obj, "path"):
+        self._add_path(obj)
+        self._selected_path_position = None
+
+  def _search_objects(self, filters):
+    ret = []
     for obj in self._context._picture:
       if satisfy_filters(obj, filters):
-        if "id" in obj:
-          self._selected_ids.append(obj["id"])
-        elif "type" in obj and obj["type"] == "path":
-          self._selected_paths.append(obj)
-          self._selected_path_position = None
+        ret.append(obj)
       if "items" in obj:
         for item in obj["items"]:
           if "annotates" in item:
             for annotate in item["annotates"]:
               if satisfy_filters(annotate, filters):
-                if "id" in annotate:
-                  self._selected_ids.append(annotate["id"])
+                ret.append(annotate)
+    return ret
 
   def select_path(self, path):
     self.clear()
-    self._selected_paths = [path]
+    self._set_paths([path])
   
   def select_path_and_index(self, path, index):
     self.clear()
-    self._selected_paths = [path]
+    self._set_paths([path])
     self._selected_path_position = index
     position_items = get_path_position_items(self.get_single_path())
     for i, item in enumerate(position_items):
@@ -368,5 +429,5 @@ class Selection(object):
   
   def select_node_and_anchor(self, nodename):
     self.clear()
-    self._selected_ids = [nodename["name"]]
+    self._set_ids([nodename["name"]])
     self._selected_anchor = nodename.get("anchor", "center")
\ No newline at end of file
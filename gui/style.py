@@ -0,0 +1,120 @@
+import tkinter as tk
+from english2tikz.utils import *
+from english2tikz.gui.object_utils import *
+
+
+"""
+The styles the drawers derive from the attributes of an object, e.g.
+the Tk colors parsed from xcolor mixes, the dash and line width scaled
+for the screen, and the font, are resolved once into a style record.
+Records are cached by the values of the attributes they depend on, so
+an object keeps its record until one of these attributes changes, and
+objects styled alike share one record. Tk colors and fonts are interned,
+so that equal styles also compare fast in the display list.
+"""
+line_width_ratio = 2.5
+font_size = 40
+text_font_family = "Times New Roman"
+style_cache_max_entries = 4096
+
+_missing = object()
+_box_styles = {}
+_path_styles = {}
+_fonts = {}
+
+
+def text_font(scale):
+  size = int(font_size * scale)
+  font = _fonts.get(size)
+  if font is None:
+    font = (text_font_family, size, "normal")
+    _fonts[size] = font
+  return font
+
+
+def _line_width_and_dash(obj):
+  line_width = get_dist_or_none(obj, "line.width")
+  if line_width is not None:
+    line_width *= line_width_ratio
+  dash = 2 if "dashed" in obj else None
+  if line_width is not None and dash is not None:
+    dash = int(dash * line_width)
+  return line_width, dash
+
+
+class BoxStyle(object):
+  __slots__ = ["scale", "fill", "fill_tk", "draw", "outline_tk",
+               "line_width", "dash", "rounded_corners", "shape",
+               "text_color", "text_color_tk", "font", "hidden"]
+
+  def __init__(self, obj):
+    self.scale = get_num(obj, "scale", 1)
+    self.fill = obj.get("fill", "")
+    self.fill_tk = color_to_tk(self.fill)
+    self.draw = draw_border(obj)
+    self.outline_tk = color_to_tk(get_draw_color(obj))
+    self.line_width, self.dash = _line_width_and_dash(obj)
+    self.rounded_corners = get_rounded_corners(obj, 0.2)
+    self.shape = get_shape(obj)
+    self.text_color = get_text_color(obj)
+    self.text_color_tk = color_to_tk(self.text_color)
+    self.font = text_font(self.scale)
+    self.hidden = "hidden" in obj
+
+
+class PathStyle(object):
+  __slots__ = ["draw", "fill", "fill_tk", "color_tk", "line_width", "dash",
+               "arrow"]
+
+  def __init__(self, obj):
+    self.draw = "draw" in obj and "hidden" not in obj
+    self.fill = obj.get("fill", "")
+    self.fill_tk = color_to_tk(self.fill)
+    self.color_tk = color_to_tk(obj.get("color", "black"))
+    self.line_width, self.dash = _line_width_and_dash(obj)
+    if "stealth" in obj or "arrow" in obj:
+      self.arrow = tk.LAST
+    elif "reversed.stealth" in obj or "reversed.arrow" in obj:
+      self.arrow = tk.FIRST
+    elif "double.stealth" in obj or "double.arrow" in obj:
+      self.arrow = tk.BOTH
+    else:
+      self.arrow = None
+
+
+_box_style_keys = ["type", "draw", "fill", "color", "text.color",
+                   "line.width", "dashed", "rounded.corners", "circle",
+                   "ellipse", "scale", "hidden"]
+_path_style_keys = ["draw", "fill", "color", "line.width", "dashed",
+                    "hidden", "stealth", "arrow", "reversed.stealth",
+                    "reversed.arrow", "double.stealth", "double.arrow"]
+
+
+def _resolve(cache, keys, make, obj):
+  key = tuple(obj.get(k, _missing) for k in keys)
+  try:
+    style = cache.get(key)
+  except TypeError:
+    """
+    Attributes that are not hashable are not cached
+    """
+    return make(obj)
+  if style is None:
+    if len(cache) >= style_cache_max_entries:
+      cache.clear()
+    style = make(obj)
+    cache[key] = style
+  return style
+
+
+def box_style(obj):
+  return _resolve(_box_styles, _box_style_keys, BoxStyle, obj)
+
+
+def path_style(obj):
+  return _resolve(_path_styles, _path_style_keys, PathStyle, obj)
+
+
+def clear_style_cache():
+  _box_styles.clear()
+  _path_styles.clear()
@@ -1,11 +1,20 @@
 import string
 import copy
+from functools import partial
 from english2tikz.utils import *
 from english2tikz.gui.object_utils import *
 from english2tikz.gui.bezier import *
 from english2tikz.gui.geometry import *
 
 
+"""
+Milliseconds of suggestors run per frame. The suggestors left over are
+run from the Tk loop afterwards, redrawing as their suggestions arrive.
+"""
+suggest_frame_budget = 10
+max_suggestions = 26
+
+
 class Suggestion(object):
   def __init__(self):
     self._content = []
@@ -82,6 +91,9 @@ class Suggest(object):
     self._suggestion_history_index = 0
     self._register_suggestors()
     self._hint = {}
+    self._state_key = None
+    self._pending = None
+    self._generation = 0
 
   def _register_suggestor(self, suggestor):
     self._suggestors.append(suggestor)
@@ -119,19 +131,67 @@ class Suggest(object):
     self._suggestion_history = []
     self._suggestion_history_index = 0
     self._hint = {}
+    self._state_key = None
+    self._pending = None
+
+  def _get_state_key(self):
+    """
+    Everything the suggestors look at, so that the suggestions are only
+    proposed again when one of these changes
+    """
+    editor = self._editor
+    selection = editor._selection
+    closest = editor._pointer.closest()
+    return (editor._pointer.pos(),
+            id(self._current_suggestion),
+            self._suggestion_history_index,
+            tuple(selection.ids()),
+            tuple(id(path) for path in selection.paths()),
+            selection._selected_anchor,
+            editor._picture_version,
+            None if closest is None else repr(closest[:2]),
+            repr(self._hint))
 
   def _propose_suggestions(self):
+    key = self._get_state_key()
+    if key == self._state_key:
+      return
+    self._state_key = key
+    self._generation += 1
     self._new_suggestions = []
-    for suggestor in self._suggestors:
+    self._pending = iter(self._suggestors)
+    self._run_suggestors()
+
+  def _run_suggestors(self):
+    """
+    Run the pending suggestors until the budget of the frame is spent,
+    always running at least one, and continue with the rest later
+    """
+    start = now()
+    for suggestor in self._pending:
       self._new_suggestions += suggestor.suggest(
           self._editor, self._current_suggestion,
           len(self._new_suggestions),
           self._hint)
-    if len(self._new_suggestions) > 26:
-      self._editor._error_msg = ("Too many suggestions "
-                                 f"{len(self._new_suggestions)}, only"
-                                 f"take the first 26")
-      self._new_suggestions = self._new_suggestions[:26]
+      if len(self._new_suggestions) > max_suggestions:
+        self._editor._error_msg = ("Too many suggestions "
+                                   f"{len(self._new_suggestions)}, only"
+                                   f"take the first {max_suggestions}")
+        self._new_suggestions = self._new_suggestions[:max_suggestions]
+        break
+      if now() - start >= suggest_frame_budget:
+        self._editor._root.after(1, partial(self._stream, self._generation))
+        return
+    self._pending = None
+
+  def _stream(self, generation):
+    if generation != self._generation or self._pending is None:
+      return
+    self._run_suggestors()
+    self._editor._canvas_manager.request_draw()
+
+  def pending(self):
+    return self._pending is not None
 
   def take_suggestion(self, code):
     if code in string.ascii_lowercase:
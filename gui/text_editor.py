@@ -1,128 +1,166 @@
+"""
+The text is kept in a gap buffer, a list of characters with a gap at the
+cursor, so that typing and deleting at the cursor take amortized
+constant time, and moving the cursor takes time proportional to the
+distance moved. The positions of the newlines are kept in two sorted
+lists: those before the gap by their position, and those after the gap
+by their distance from the end of the text, so neither list changes when
+text is inserted or deleted at the gap, and the start of any line is
+found without scanning the text.
+"""
+initial_gap = 16
+
+
 class TextEditor(object):
   def __init__(self, s=""):
-    self._content = s
-    self._position = len(s)
+    self._load(s, len(s))
+
+  def _load(self, s, position):
+    position = max(0, min(position, len(s)))
+    self._length = len(s)
+    self._buffer = (list(s[:position]) + [""] * initial_gap +
+                    list(s[position:]))
+    self._gap_start = position
+    self._gap_end = position + initial_gap
+    self._before = [i for i in range(position) if s[i] == "\n"]
+    self._after = [len(s) - i for i in range(len(s) - 1, position - 1, -1)
+                   if s[i] == "\n"]
+
+  def _move_gap(self, position):
+    position = max(0, min(position, self._length))
+    start, end = self._gap_start, self._gap_end
+    if position < start:
+      k = start - position
+      self._buffer[end-k:end] = self._buffer[position:start]
+      self._gap_start, self._gap_end = position, end - k
+      while len(self._before) > 0 and self._before[-1] >= position:
+        self._after.append(self._length - self._before.pop())
+    elif position > start:
+      k = position - start
+      self._buffer[start:position] = self._buffer[end:end+k]
+      self._gap_start, self._gap_end = position, end + k
+      while (len(self._after) > 0 and
+             self._length - self._after[-1] < position):
+        self._before.append(self._length - self._after.pop())
+
+  def _grow(self, n):
+    size = max(n, len(self._buffer), initial_gap)
+    self._buffer[self._gap_end:self._gap_end] = [""] * size
+    self._gap_end += size
+
+  def _newline(self, k):
+    """
+    The position of the k-th newline
+    """
+    if k < len(self._before):
+      return self._before[k]
+    return self._length - self._after[len(self._after) - 1 -
+                                      (k - len(self._before))]
+
+  def _line_count(self):
+    return len(self._before) + len(self._after) + 1
 
   def insert(self, c):
-    self._fix_position()
-    self._content = (self._content[:self._position] +
-                     c + self._content[self._position:])
-    self._position += len(c)
+    if len(c) > self._gap_end - self._gap_start:
+      self._grow(len(c))
+    start = self._gap_start
+    self._buffer[start:start+len(c)] = c
+    for i, ch in enumerate(c):
+      if ch == "\n":
+        self._before.append(start + i)
+    self._gap_start += len(c)
+    self._length += len(c)
 
   def delete(self):
-    self._fix_position()
-    if self._position > 0:
-      self._content = (self._content[:self._position-1] +
-                       self._content[self._position:])
-    self._position -= 1
+    if self._gap_start > 0:
+      self._gap_start -= 1
+      self._length -= 1
+      if len(self._before) > 0 and self._before[-1] == self._gap_start:
+        self._before.pop()
 
   def move_cursor(self, offset):
-    self._position += offset
-    self._fix_position()
+    self._move_gap(self._gap_start + offset)
 
   def move_to_start(self):
-    self._position = 0
+    self._move_gap(0)
 
   def move_to_end(self):
-    self._position = len(self._content)
+    self._move_gap(self._length)
 
   def char_under_cursor(self):
-    self._fix_position()
     if self.at_start():
       return None
-    return self._content[self._position-1]
+    return self._buffer[self._gap_start-1]
 
   def char_next_cursor(self):
-    self._fix_position()
     if self.at_end():
       return None
-    return self._content[self._position]
+    return self._buffer[self._gap_end]
 
   def move_to_eol(self):
-    self._fix_position()
-    while self.char_next_cursor() != '\n' and not self.at_end():
-      self._position += 1
+    x, y = self.get_coordinate()
+    self.set_coordinate(self._length, y)
 
   def move_to_sol(self):
-    self._fix_position()
-    while self.char_under_cursor() != '\n' and not self.at_start():
-      self._position -= 1
+    x, y = self.get_coordinate()
+    self.set_coordinate(0, y)
 
   def move_up(self):
-    self._fix_position()
     x, y = self.get_coordinate()
     self.set_coordinate(x, y-1)
 
   def move_down(self):
-    self._fix_position()
     x, y = self.get_coordinate()
     self.set_coordinate(x, y+1)
 
   def move_left(self):
-    self._fix_position()
     x, y = self.get_coordinate()
     self.set_coordinate(x-1, y)
 
   def move_right(self):
-    self._fix_position()
     x, y = self.get_coordinate()
     self.set_coordinate(x+1, y)
 
   def get_coordinate(self):
-    self._fix_position()
-    x, y = 0, 0
-    for i in range(self._position):
-      if self._content[i] == '\n':
-        x, y = 0, y+1
-      else:
-        x, y = x+1, y
-    return x, y
+    y = len(self._before)
+    start = self._before[-1] + 1 if y > 0 else 0
+    return self._gap_start - start, y
 
   def get_position_by_coordinate(self, x, y):
-    lines = self.get_lines()
-    if y >= len(lines) or y < 0:
+    lines = self._line_count()
+    if y >= lines or y < 0:
       return None
-    x = max(0, min(x, len(lines[y])))
-    return sum([len(line)+1 for line in lines[:y]]) + x
+    start = self._newline(y - 1) + 1 if y > 0 else 0
+    end = self._newline(y) if y < lines - 1 else self._length
+    return start + max(0, min(x, end - start))
 
   def set_coordinate(self, x, y):
     new_pos = self.get_position_by_coordinate(x, y)
     if new_pos is not None:
-      self._position = new_pos
-    self._fix_position()
+      self._move_gap(new_pos)
 
   def get_lines(self):
-    return self._content.split("\n")
+    return str(self).split("\n")
 
   def at_end(self):
-    self._fix_position()
-    return self._position == len(self._content)
+    return self._gap_start == self._length
 
   def at_start(self):
-    self._fix_position()
-    return self._position == 0
+    return self._gap_start == 0
 
   def clear(self):
-    self._content = ""
-    self._position = 0
+    self._load("", 0)
 
   def set(self, s):
-    self._content = s
-    self._fix_position()
+    self._load(s, self._gap_start)
 
   def __str__(self):
-    return self._content
+    return "".join(self._buffer[:self._gap_start] +
+                   self._buffer[self._gap_end:])
 
   def view(self):
-    self._fix_position()
-    return (self._content[:self._position] +
-            '\u2588' + self._content[self._position:])
+    return "".join(self._buffer[:self._gap_start] + ['\u2588'] +
+                   self._buffer[self._gap_end:])
 
   def __len__(self):
-    return len(self._content)
-
-  def _fix_position(self):
-    if self._position > len(self._content):
-      self._position = len(self._content)
-    if self._position < 0:
-      self._position = 0
+    return self._length
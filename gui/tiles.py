@@ -0,0 +1,118 @@
+import math
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+from PIL import ImageTk
+from english2tikz.utils import *
+from english2tikz.gui.display_list import *
+from english2tikz.gui.backends import draw_item
+
+
+"""
+An optional way of drawing the picture, for pictures with more objects
+than the Tk canvas handles smoothly. The unselected objects are drawn
+into a display list, and rasterized into tiles of tile_size pixels,
+which are shown as a few image items. The selected objects are drawn
+into another display list, replayed on top of the tiles.
+
+Coordinates are recorded relative to the center of the coordinate
+system, so scrolling only moves the tiles. When the picture changes,
+the drawing is recorded again, and only the tiles whose primitives
+changed are rasterized again.
+"""
+tile_size = 256
+max_tiles = 512
+
+
+class TileCache(object):
+  def __init__(self, photo_image=ImageTk.PhotoImage,
+               size=tile_size, max_tiles=max_tiles):
+    self._photo_image = photo_image
+    self._size = size
+    self._max_tiles = max_tiles
+    self._key = None
+    self._scale = None
+    self._static = []
+    self._live = None
+    self._buckets = {}
+    self._signatures = {}
+    self._tiles = OrderedDict()
+    self.rendered = 0
+
+  def key(self):
+    return self._key
+
+  def clear(self):
+    self._key = None
+    self._signatures = {}
+    self._tiles.clear()
+
+  def record(self, key, scale, origin, static, live):
+    """
+    Take the items recorded with the center of the coordinate system at
+    origin, and drop the tiles whose items changed
+    """
+    ox, oy = origin
+    self._key = key
+    self._live = (live, ox, oy)
+    self._static = []
+    buckets = {}
+    n = self._size
+    for kind, coords, style, bound, source in static.items():
+      coords = [v - (ox if i % 2 == 0 else oy) for i, v in enumerate(coords)]
+      x0, y0, x1, y1 = bound
+      bound = (x0 - ox, y0 - oy, x1 - ox, y1 - oy)
+      index = len(self._static)
+      item = (kind, coords, style, bound, source)
+      self._static.append(item)
+      sig = signature(item)
+      for tx in range(math.floor(bound[0] / n), math.floor(bound[2] / n) + 1):
+        for ty in range(math.floor(bound[1] / n),
+                        math.floor(bound[3] / n) + 1):
+          buckets.setdefault((tx, ty), []).append((index, sig))
+    signatures = {tile: hash(tuple(s for _, s in entries))
+                  for tile, entries in buckets.items()}
+    if scale != self._scale:
+      self._tiles.clear()
+    else:
+      for tile in set(self._signatures) | set(signatures):
+        if self._signatures.get(tile) != signatures.get(tile):
+          self._tiles.pop(tile, None)
+    self._scale = scale
+    self._buckets = {tile: [index for index, _ in entries]
+                     for tile, entries in buckets.items()}
+    self._signatures = signatures
+
+  def _tile(self, tile):
+    photo = self._tiles.get(tile)
+    if photo is not None:
+      self._tiles.move_to_end(tile)
+      return photo
+    n = self._size
+    img = Image.new("RGBA", (n, n), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    tx, ty = tile
+    for index in self._buckets[tile]:
+      kind, coords, style, bound, _ = self._static[index]
+      draw_item(img, draw, kind, coords, style, bound, -tx * n, -ty * n)
+    photo = self._photo_image(img)
+    self._tiles[tile] = photo
+    self.rendered += 1
+    while len(self._tiles) > self._max_tiles:
+      self._tiles.popitem(last=False)
+    return photo
+
+  def draw(self, canvas, cx, cy, width, height):
+    """
+    Show the tiles in the view, with the center of the coordinate system
+    at (cx, cy), and replay the live items on top of them
+    """
+    n = self._size
+    for tx in range(math.floor(-cx / n), math.floor((width - cx) / n) + 1):
+      for ty in range(math.floor(-cy / n), math.floor((height - cy) / n) + 1):
+        if (tx, ty) not in self._buckets:
+          continue
+        canvas.create_image(cx + tx * n, cy + ty * n, anchor="nw",
+                            image=self._tile((tx, ty)))
+    if self._live is not None:
+      live, ox, oy = self._live
+      live.replay(canvas, cx - ox, cy - oy)
@@ -1,14 +1,496 @@
 import os
+import math
+import time
+import heapq
+import shutil
+import tempfile
+import threading
+import subprocess
 from hashlib import sha256
+from functools import partial
 from english2tikz.errors import *
 
 
+r"""
+The preambles never change between compilations, so each of them is
+compiled once into a format file (pdflatex -ini ... \dump), which is then
+loaded by every compilation instead of reading the packages again.
+Formats are cached under ~/.english2tikz/formats, named by the hash of
+the engine version and the preamble, as a format only loads in the
+engine that dumped it. If a compilation with a format fails, the format
+is rebuilt once, in case it is stale or damaged, and if it cannot be
+built, the documents are compiled with the full preamble as before.
+"""
+format_dir = os.path.join(os.getenv("HOME", tempfile.gettempdir()),
+                          ".english2tikz", "formats")
+_formats = {}
+_rebuilt_formats = set()
+_formats_lock = threading.Lock()
+_engine_version = None
+
+"""
+Number of compilations and seconds spent, with and without a format
+"""
+compile_stats = {
+    "format": [0, 0.0],
+    "plain": [0, 0.0],
+    "format build": [0, 0.0],
+}
+_stats_lock = threading.Lock()
+
+
+snippet_preamble = r"""
+\documentclass[varwidth]{standalone}
+\usepackage{amsmath}
+\usepackage{amsfonts}
+\usepackage{amssymb}
+\usepackage{xcolor}
+"""
+
+tikz_preamble = r"""
+\documentclass[varwidth=\maxdimen]{standalone}
+\usepackage{amsmath}
+\usepackage{amsfonts}
+\usepackage{amssymb}
+\usepackage{xcolor}
+\usepackage{tikz}
+\usetikzlibrary{positioning}
+"""
+
+
 def escape_for_latex(text):
     text = text.replace("\n", "\\\\")
     return text
 
 
-def text_to_latex_image_path(text, color="black", text_width=None):
+def _record(kind, seconds):
+    with _stats_lock:
+        compile_stats[kind][0] += 1
+        compile_stats[kind][1] += seconds
+
+
+def compile_statistics():
+    """
+    The average number of seconds of a compilation, with and without a
+    format, and of building a format
+    """
+    with _stats_lock:
+        return {kind: (count, total / count if count > 0 else None)
+                for kind, (count, total) in compile_stats.items()}
+
+
+def _run(args, cwd, on_process=None):
+    try:
+        process = subprocess.Popen(args, cwd=cwd,
+                                   stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        raise SystemError(f"Command not found: {args[0]}")
+    if on_process is not None:
+        on_process(process)
+    return process.wait()
+
+
+def _publish(src, path):
+    """
+    The file is first copied next to its final name, as the temporary
+    directory may be on another file system, and then renamed, so that
+    readers never see a partially written file
+    """
+    directory = os.path.dirname(path) or "."
+    fd, partial = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+    shutil.copyfile(src, partial)
+    os.replace(partial, path)
+
+
+def _build_format(preamble, path):
+    workdir = tempfile.mkdtemp(prefix="english2tikz-")
+    try:
+        with open(os.path.join(workdir, "fmt.tex"), "w") as f:
+            f.write(preamble + "\\dump\n")
+        start = time.time()
+        ret = _run(["pdflatex", "-ini", "-interaction=batchmode",
+                    "-jobname=fmt", "&pdflatex", "fmt.tex"], workdir)
+        _record("format build", time.time() - start)
+        if ret != 0:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _publish(os.path.join(workdir, "fmt.fmt"), path)
+        return True
+    except (OSError, SystemError):
+        return False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def engine_version():
+    """
+    The first line of pdflatex --version, or an empty string if pdflatex
+    cannot be run
+    """
+    global _engine_version
+    if _engine_version is None:
+        try:
+            output = subprocess.run(["pdflatex", "--version"],
+                                    stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL,
+                                    text=True).stdout
+        except OSError:
+            output = ""
+        lines = output.splitlines()
+        _engine_version = lines[0] if len(lines) > 0 else ""
+    return _engine_version
+
+
+def _format_key(preamble):
+    return sha256(bytes(engine_version() + "\n" + preamble,
+                        "utf8")).hexdigest()
+
+
+def get_format(preamble):
+    """
+    The path of the format file for the preamble, built on first use, or
+    None if it cannot be built
+    """
+    key = _format_key(preamble)
+    with _formats_lock:
+        if key not in _formats:
+            path = os.path.join(format_dir, f"{key}.fmt")
+            if not os.path.exists(path) and not _build_format(preamble, path):
+                path = None
+            _formats[key] = path
+        return _formats[key]
+
+
+def _format_failed(workdir, jobname="tmp"):
+    """
+    Whether a compilation failed to load its format rather than on the
+    document. TeX opens the log only once the format is loaded, so a
+    missing log also means the format could not be loaded
+    """
+    try:
+        with open(os.path.join(workdir, f"{jobname}.log"),
+                  errors="replace") as f:
+            log = f.read()
+    except OSError:
+        return True
+    return ("Fatal format file error" in log or
+            "format file" in log and "---!" in log)
+
+
+def rebuild_format(preamble):
+    """
+    Build the format of the preamble again after it failed to load, only
+    once per session. The format is built outside of the lock, and
+    replaces the old one once complete, so that the other compilations
+    go on meanwhile. Returns the path of the new format, or None if it was
+    already rebuilt or cannot be built
+    """
+    key = _format_key(preamble)
+    with _formats_lock:
+        if key in _rebuilt_formats:
+            return None
+        _rebuilt_formats.add(key)
+    path = os.path.join(format_dir, f"{key}.fmt")
+    if not _build_format(preamble, path):
+        path = None
+    with _formats_lock:
+        _formats[key] = path
+    return path
+
+
+"""
+The pdf is rasterized by the first of these programs that is installed.
+Ghostscript comes first because its pngalpha device keeps the background
+transparent, as ImageMagick did.
+"""
+rasterizers = ["gs", "pdftoppm", "convert"]
+_rasterizer = None
+
+"""
+Snippets are rasterized at the smallest of these resolutions that is at
+least the resolution they are shown at, so a snippet is rasterized again
+only when it is shown larger than all its existing rasters. The workers
+add to the resolutions of a snippet while the Tk thread reads them, so
+they are changed under a lock and read as a copy
+"""
+latex_density = 600
+raster_levels = [75, 150, 300, 600, 1200, 2400]
+_raster_dpis = {}
+_raster_dpis_lock = threading.Lock()
+
+
+def find_rasterizer():
+    global _rasterizer
+    if _rasterizer is None:
+        for name in rasterizers:
+            if shutil.which(name) is not None:
+                _rasterizer = name
+                break
+        else:
+            raise SystemError("Cannot find ghostscript, pdftoppm or "
+                              "ImageMagick to rasterize pdf")
+    return _rasterizer
+
+
+def _rasterize_args(name, pdf, dpi):
+    if name == "gs":
+        return ["gs", "-q", "-dSAFER", "-dBATCH", "-dNOPAUSE",
+                "-sDEVICE=pngalpha", f"-r{dpi}", "-dTextAlphaBits=4",
+                "-dGraphicsAlphaBits=4", "-sOutputFile=out.png", pdf]
+    if name == "pdftoppm":
+        return ["pdftoppm", "-png", "-r", str(dpi), "-singlefile",
+                pdf, "out"]
+    return ["convert", "-density", str(dpi), pdf, "out.png"]
+
+
+def rasterize(pdf, path, dpi, on_process=None):
+    workdir = tempfile.mkdtemp(prefix="english2tikz-")
+    try:
+        args = _rasterize_args(find_rasterizer(), os.path.abspath(pdf), dpi)
+        ret = _run(args, workdir, on_process)
+        if ret != 0:
+            raise SystemError(f"Error converting {pdf} to png")
+        _publish(os.path.join(workdir, "out.png"), path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return path
+
+
+def compile_pdf(preamble, body, path, on_process=None):
+    """
+    Compile the document in a temporary directory of its own and move the
+    pdf to the path, so that concurrent compilations never write to the
+    same files. The on_process callback receives every child process, so
+    that the caller can kill it.
+    """
+    workdir = tempfile.mkdtemp(prefix="english2tikz-")
+    try:
+        fmt = get_format(preamble)
+        ret = None
+        while fmt is not None:
+            with open(os.path.join(workdir, "tmp.tex"), "w") as f:
+                f.write(body)
+            start = time.time()
+            ret = _run(["pdflatex", "-interaction=batchmode",
+                        f"-fmt={fmt}", "tmp.tex"], workdir, on_process)
+            if ret == 0:
+                _record("format", time.time() - start)
+                break
+            elif ret < 0:
+                raise SystemError(f"Compilation killed:\n{body}")
+            if not _format_failed(workdir):
+                break
+            fmt = rebuild_format(preamble)
+        if ret != 0:
+            with open(os.path.join(workdir, "tmp.tex"), "w") as f:
+                f.write(preamble + body)
+            start = time.time()
+            ret = _run(["pdflatex", "-interaction=batchmode", "tmp.tex"],
+                       workdir, on_process)
+            if ret != 0:
+                raise SystemError(f"Error compiling latex:\n{body}")
+            _record("plain", time.time() - start)
+        _publish(os.path.join(workdir, "tmp.pdf"), path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return path
+
+
+def raster_level(dpi):
+    for level in raster_levels:
+        if level >= dpi:
+            return level
+    return raster_levels[-1]
+
+
+def _raster_path(code, dpi):
+    return f"view/{code}@{dpi}.png"
+
+
+def _dpis_of(code):
+    dpis = _raster_dpis.get(code)
+    if dpis is None:
+        dpis = {dpi for dpi in raster_levels
+                if os.path.exists(_raster_path(code, dpi))}
+        _raster_dpis[code] = dpis
+    return dpis
+
+
+def _available_dpis(code):
+    with _raster_dpis_lock:
+        return tuple(_dpis_of(code))
+
+
+def _add_dpi(code, dpi):
+    with _raster_dpis_lock:
+        _dpis_of(code).add(dpi)
+
+
+compile_retry_seconds = 60
+
+
+class CompileScheduler(object):
+    """
+    Runs snippet compilations on worker threads, closest to the view
+    first. The canvas brackets every redraw with begin_frame and
+    end_frame. The jobs requested during the frame are then ordered by
+    the screen distance of their text from the view, and the queued jobs
+    that were not requested, e.g. for text that was edited or deleted,
+    are dropped. A job that fails, by returning False or raising, is
+    remembered for compile_retry_seconds, so that it is not run again at
+    every redraw, but is retried once e.g. a missing package is
+    installed. The failures older than that are forgotten at the end of
+    every frame, so that they do not pile up over a session.
+    """
+
+    def __init__(self, workers=os.cpu_count() or 2):
+        self._workers = workers
+        self._threads = []
+        self._cv = threading.Condition()
+        self._heap = []
+        self._seq = 0
+        self._jobs = {}
+        self._running = set()
+        self._failed = {}
+        self._priorities = {}
+        self._in_frame = False
+        self._view = None
+        self.completed = 0
+
+    def _priority(self, x, y):
+        if x is None or y is None or self._view is None:
+            return (math.inf, math.inf)
+        w, h = self._view
+        outside = math.hypot(max(0, -x, x - w), max(0, -y, y - h))
+        return (outside, math.hypot(x - w / 2, y - h / 2))
+
+    def _push(self, priority, key):
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, key))
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._cv.notify()
+
+    def begin_frame(self, width, height):
+        with self._cv:
+            self._in_frame = True
+            self._view = (width, height)
+            self._priorities = {}
+
+    def request(self, key, job, x=None, y=None):
+        priority = self._priority(x, y)
+        with self._cv:
+            if self._in_frame:
+                old = self._priorities.get(key)
+                if old is None or priority < old:
+                    self._priorities[key] = priority
+            failed = self._failed.get(key)
+            if (failed is not None and
+                    time.monotonic() - failed >= compile_retry_seconds):
+                del self._failed[key]
+                failed = None
+            if (key in self._jobs or key in self._running or
+                    failed is not None):
+                return
+            self._jobs[key] = job
+            self._push(priority, key)
+
+    def _forget_failures(self):
+        """
+        A key fails again only after its failure was forgotten, so the
+        failures are in the order they happened, oldest first
+        """
+        expired = time.monotonic() - compile_retry_seconds
+        keys = []
+        for key, failed in self._failed.items():
+            if failed > expired:
+                break
+            keys.append(key)
+        for key in keys:
+            del self._failed[key]
+
+    def end_frame(self):
+        with self._cv:
+            if not self._in_frame:
+                return
+            self._in_frame = False
+            self._forget_failures()
+            self._jobs = {key: job for key, job in self._jobs.items()
+                          if key in self._priorities}
+            self._heap = [(self._priorities[key], i, key)
+                          for i, key in enumerate(self._jobs)]
+            heapq.heapify(self._heap)
+            self._seq = len(self._heap)
+            self._cv.notify_all()
+
+    def cancel_frame(self):
+        """
+        End a frame in which the texts were not drawn, without dropping
+        the jobs requested before
+        """
+        with self._cv:
+            self._in_frame = False
+
+    def queued(self):
+        with self._cv:
+            return [key for _, _, key in sorted(self._heap)
+                    if key in self._jobs]
+
+    def _work(self):
+        while True:
+            with self._cv:
+                while len(self._heap) == 0:
+                    self._cv.wait()
+                _, _, key = heapq.heappop(self._heap)
+                job = self._jobs.pop(key, None)
+                if job is None:
+                    continue
+                self._running.add(key)
+            succeeded = False
+            try:
+                succeeded = job()
+            except Exception:
+                pass
+            finally:
+                with self._cv:
+                    self._running.discard(key)
+                    if not succeeded:
+                        self._failed[key] = time.monotonic()
+                    else:
+                        self.completed += 1
+
+
+compile_scheduler = CompileScheduler()
+
+
+def _compile_snippet(code, body, dpi):
+    pdf = f"view/{code}.pdf"
+    try:
+        if not os.path.exists(pdf):
+            compile_pdf(snippet_preamble, body, pdf)
+        rasterize(pdf, _raster_path(code, dpi), dpi)
+    except (OSError, SystemError):
+        return False
+    _add_dpi(code, dpi)
+    return True
+
+
+def latex_image(text, color="black", text_width=None, dpi=latex_density,
+                x=None, y=None, wait=False):
+    """
+    Returns the path of a raster of the text, whether it is ready, and
+    its resolution. When no raster is fine enough for the resolution, a
+    new one is made in the background, and a coarser one, if any, is
+    returned meanwhile. The screen position (x, y) of the text decides
+    how soon it is compiled. With wait, the raster is made before
+    returning instead, and is not ready only if it cannot be compiled.
+    """
     code = sha256(bytes(text, "utf8")).hexdigest()
     if color != "black":
         code = sha256(bytes(code + color, "utf8")).hexdigest()
@@ -18,66 +500,69 @@ def text_to_latex_image_path(text, color="black", text_width=None):
         os.mkdir("view")
     if not os.path.isdir("view"):
         raise IOError("view is not a directory")
-    if os.path.exists(f"view/{code}.png"):
-        return f"view/{code}.png", True
-    if os.path.exists(f"/tmp/{code}.png"):
-        os.system(f"cp /tmp/{code}.png view/{code}.png")
-        return f"view/{code}.png", True
-    if os.path.exists(f"/tmp/{code}.tex"):
-        return f"view/{code}.png", False
-    cwd = os.getcwd()
+    level = raster_level(dpi)
+    dpis = _available_dpis(code)
+    finer = [d for d in dpis if d >= level]
+    if len(finer) > 0:
+        return _raster_path(code, min(finer)), True, min(finer)
     if color is None:
         color = "black"
-    with open(f"/tmp/{code}.tex", "w") as f:
-        f.write(r"""
-\documentclass[varwidth=%s]{standalone}
-\usepackage{amsmath}
-\usepackage{amsfonts}
-\usepackage{amssymb}
-\usepackage{xcolor}
+    body = r"""\standaloneconfig{varwidth=%s}
 \begin{document}
 \textcolor{%s}{%s}
 \end{document}
 """ % (r"\maxdimen" if text_width is None else text_width,
-            color, escape_for_latex(text)))
-    cwd = os.getcwd()
-    cmd = f"cd /tmp && pdflatex {code}.tex 1> /dev/null 2> /dev/null && " \
-        f"convert -density 600 /tmp/{code}.pdf /tmp/{code}.png " \
-        "1> /dev/null 2> /dev/null && " \
-        f"cd {cwd} && cp /tmp/{code}.png view/{code}.png &"
-    os.system(cmd)
-    return f"view/{code}.png", False
+       color, escape_for_latex(text))
+    if wait:
+        ready = _compile_snippet(code, body, level)
+        return _raster_path(code, level), ready, level
+    compile_scheduler.request((code, level),
+                              partial(_compile_snippet, code, body, level),
+                              x, y)
+    if len(dpis) > 0:
+        return _raster_path(code, max(dpis)), True, max(dpis)
+    return _raster_path(code, level), False, level
 
 
-def tikzimage(code):
-    if not os.path.exists("view"):
-        os.mkdir("view")
-    if not os.path.isdir("view"):
-        raise IOError("view is not a directory")
-    cwd = os.getcwd()
-    with open("/tmp/tmp.tex", "w") as f:
-        f.write(r"""
-\documentclass[varwidth=\maxdimen]{standalone}
-\usepackage{amsmath}
-\usepackage{amsfonts}
-\usepackage{amssymb}
-\usepackage{xcolor}
-\usepackage{tikz}
-\usetikzlibrary{positioning}
-\begin{document}
+def text_to_latex_image_path(text, color="black", text_width=None):
+    path, ready, _ = latex_image(text, color, text_width)
+    return path, ready
+
+
+def tikz_body(code):
+    return r"""\begin{document}
 %s
 \end{document}
-""" % code)
-    ret = os.system("cd /tmp && pdflatex tmp.tex 1> /dev/null 2> /dev/null")
-    if ret != 0:
-        raise SystemError(f"Error compiling latex:\n{code}")
-    ret = os.system(
-        r"convert -density 600 /tmp/tmp.pdf /tmp/tmp.png "
-        r"1> /dev/null 2> /dev/null")
-    if ret != 0:
-        raise SystemError(
-            f"Error converting pdf to png in processing:\n{code}")
-    ret = os.system(f"cp /tmp/tmp.png view/view.png")
-    if ret != 0:
-        raise SystemError(f"Error copying png to view:\n{code}")
-    return f"view/view.png"
+""" % code
+
+
+def tikz_document(code):
+    return tikz_preamble + tikz_body(code)
+
+
+def tikz_hash(code):
+    return sha256(bytes(tikz_document(code), "utf8")).hexdigest()
+
+
+def tikz_cache_path(code, cache_dir="view"):
+    return os.path.join(cache_dir, f"{tikz_hash(code)}.png")
+
+
+def compile_tikz(code, cache_dir="view", on_process=None):
+    path = tikz_cache_path(code, cache_dir)
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    if not os.path.isdir(cache_dir):
+        raise IOError(f"{cache_dir} is not a directory")
+    pdf = path[:-len(".png")] + ".pdf"
+    if not os.path.exists(pdf):
+        compile_pdf(tikz_preamble, tikz_body(code), pdf, on_process)
+    return rasterize(pdf, path, latex_density, on_process)
+
+
+def tikzimage(code):
+    path = compile_tikz(code)
+    shutil.copyfile(path, "view/view.png")
+    return "view/view.png"
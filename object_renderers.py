@@ -1,4 +1,5 @@
 from english2tikz.errors import *
+from english2tikz.compact import is_mapping
 
 
 class ObjectRenderer(object):
@@ -27,7 +28,7 @@ class BoxObjectRenderer(ObjectRenderer, SupportMultipleRenderer):
 
 class TreeObjectRenderer(ObjectRenderer):
   def match(self, obj):
-    return isinstance(obj, dict) and "type" in obj and obj["type"] == "tree"
+    return is_mapping(obj) and "type" in obj and obj["type"] == "tree"
 
   def render(self, context, obj):
     ret = [{
@@ -83,7 +84,7 @@ class TreeObjectRenderer(ObjectRenderer):
 
 class GridObjectRenderer(ObjectRenderer):
   def match(self, obj):
-    return isinstance(obj, dict) and "type" in obj and obj["type"] == "grid"
+    return is_mapping(obj) and "type" in obj and obj["type"] == "grid"
 
   def render(self, context, obj):
     h, w, v_align, h_align = obj["rows"], obj["cols"], obj["v_align"], obj["h_align"]
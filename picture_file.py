@@ -0,0 +1,224 @@
+import io
+import sys
+import json
+import zlib
+import struct
+from collections import OrderedDict
+from english2tikz.errors import *
+from english2tikz.compact import json_default
+
+
+"""
+A chunked alternative to the JSON files written by the editor, for
+pictures too large to parse at once.
+
+  header   magic "E2TP", u32 version
+  chunks   u32 length, zlib compressed JSON list of objects
+  index    zlib compressed JSON: the offsets and lengths of the chunks,
+           for every object its id, chunk and bounding box, and the
+           other fields of the JSON file (nextid, bound_box, ...)
+  footer   u64 offset of the index, u32 length of the index, "E2TI"
+
+The chunks are written as the objects come, so a picture can be written
+without holding its serialization in memory, and a reader only needs the
+index to look up objects by id or region, decompressing just the chunks
+that contain them. The editor draws and searches the whole picture, so it
+loads every chunk, one at a time; the lookups by id or region are for
+tools reading parts of a picture, e.g. PictureReader.get and query.
+"""
+picture_file_extension = ".e2t"
+_magic = b"E2TP"
+_index_magic = b"E2TI"
+_version = 1
+_header = struct.Struct("<4sI")
+_length = struct.Struct("<I")
+_footer = struct.Struct("<QI4s")
+default_chunk_size = 64
+
+
+def is_picture_file(filename):
+  return filename.endswith(picture_file_extension)
+
+
+def _pack(value):
+  return zlib.compress(
+      json.dumps(value, default=json_default,
+                 separators=(",", ":")).encode("utf8"))
+
+
+def _unpack(data):
+  return json.loads(zlib.decompress(data).decode("utf8"))
+
+
+class PictureWriter(object):
+  def __init__(self, f, chunk_size=default_chunk_size):
+    self._f = f
+    self._chunk_size = chunk_size
+    self._chunk = []
+    self._chunks = []
+    self._objects = []
+    self._offset = 0
+    self._write(_header.pack(_magic, _version))
+
+  def _write(self, data):
+    self._f.write(data)
+    self._offset += len(data)
+
+  def _flush(self):
+    if len(self._chunk) == 0:
+      return
+    data = _pack(self._chunk)
+    self._chunks.append([self._offset + _length.size, len(data)])
+    self._write(_length.pack(len(data)))
+    self._write(data)
+    self._chunk = []
+
+  def write(self, obj, bound=None):
+    self._objects.append([obj.get("id"), len(self._chunks),
+                          None if bound is None else list(bound)])
+    self._chunk.append(obj)
+    if len(self._chunk) >= self._chunk_size:
+      self._flush()
+
+  def close(self, meta=None):
+    self._flush()
+    data = _pack({
+        "chunks": self._chunks,
+        "objects": self._objects,
+        "meta": {} if meta is None else meta,
+    })
+    offset = self._offset
+    self._write(data)
+    self._write(_footer.pack(offset, len(data), _index_magic))
+
+
+class PictureReader(object):
+  def __init__(self, f, cached_chunks=8):
+    self._f = f
+    self._cached_chunks = cached_chunks
+    self._chunk_cache = OrderedDict()
+    f.seek(0)
+    magic, version = _header.unpack(f.read(_header.size))
+    if magic != _magic:
+      raise UserInputError("Not a picture file")
+    if version > _version:
+      raise UserInputError(f"Unsupported picture file version {version}")
+    f.seek(-_footer.size, io.SEEK_END)
+    offset, length, magic = _footer.unpack(f.read(_footer.size))
+    if magic != _index_magic:
+      raise UserInputError("Picture file is truncated")
+    f.seek(offset)
+    index = _unpack(f.read(length))
+    self._chunks = index["chunks"]
+    self._objects = index["objects"]
+    self.meta = index["meta"]
+    """
+    The position of each object in its chunk
+    """
+    self._positions = []
+    self._by_id = {}
+    count = {}
+    for i, (id_, chunk, bound) in enumerate(self._objects):
+      self._positions.append(count.get(chunk, 0))
+      count[chunk] = count.get(chunk, 0) + 1
+      if id_ is not None:
+        self._by_id[id_] = i
+
+  def _chunk(self, i):
+    chunk = self._chunk_cache.get(i)
+    if chunk is not None:
+      self._chunk_cache.move_to_end(i)
+      return chunk
+    offset, length = self._chunks[i]
+    self._f.seek(offset)
+    chunk = _unpack(self._f.read(length))
+    self._chunk_cache[i] = chunk
+    if len(self._chunk_cache) > self._cached_chunks:
+      self._chunk_cache.popitem(last=False)
+    return chunk
+
+  def __len__(self):
+    return len(self._objects)
+
+  def __getitem__(self, i):
+    return self._chunk(self._objects[i][1])[self._positions[i]]
+
+  def __iter__(self):
+    for i in range(len(self._chunks)):
+      """
+      Read sequentially, without going through the cache
+      """
+      offset, length = self._chunks[i]
+      self._f.seek(offset)
+      yield from _unpack(self._f.read(length))
+
+  def ids(self):
+    return list(self._by_id.keys())
+
+  def bound(self, i):
+    return self._objects[i][2]
+
+  def get(self, id_):
+    i = self._by_id.get(id_)
+    if i is None:
+      return None
+    return self[i]
+
+  def query(self, x0, y0, x1, y1):
+    """
+    The objects whose bounding boxes, if recorded, intersect the region
+    """
+    ret = []
+    for i, (id_, chunk, bound) in enumerate(self._objects):
+      if bound is None:
+        continue
+      bx0, by0, bx1, by1 = bound
+      if bx0 <= x1 and x0 <= bx1 and by0 <= y1 and y0 <= by1:
+        ret.append(self[i])
+    return ret
+
+  def load(self):
+    data = {"picture": list(self)}
+    data.update(self.meta)
+    return data
+
+
+def dump(data, f, bound=None, chunk_size=default_chunk_size):
+  """
+  Write a dict in the layout of the JSON files (picture, nextid,
+  bound_box, ...), calling bound on every object for its bounding box
+  """
+  writer = PictureWriter(f, chunk_size)
+  for obj in data.get("picture", []):
+    writer.write(obj, None if bound is None else bound(obj))
+  writer.close({key: value for key, value in data.items()
+                if key != "picture"})
+
+
+def load(f):
+  return PictureReader(f).load()
+
+
+def json_to_picture_file(src, dst):
+  with open(src) as f:
+    data = json.loads(f.read())
+  with open(dst, "wb") as f:
+    dump(data, f)
+
+
+def picture_file_to_json(src, dst):
+  with open(src, "rb") as f:
+    data = load(f)
+  with open(dst, "w") as f:
+    f.write(json.dumps(data, default=json_default))
+
+
+if __name__ == "__main__":
+  if len(sys.argv) != 3:
+    print(f"Usage: python -m english2tikz.picture_file SRC DST\n"
+          f"Converts between JSON and {picture_file_extension} files")
+    sys.exit(1)
+  if is_picture_file(sys.argv[1]):
+    picture_file_to_json(sys.argv[1], sys.argv[2])
+  else:
+    json_to_picture_file(sys.argv[1], sys.argv[2])
@@ -14,6 +14,12 @@ class MockCanvas(object):
   def create_line(self, *args, **kwargs):
     pass
 
+  def create_polygon(self, *args, **kwargs):
+    pass
+
+  def create_image(self, *args, **kwargs):
+    pass
+
   def delete(self, *args, **kwargs):
     pass
 
@@ -23,6 +29,18 @@ class MockCanvas(object):
   def tag_lower(self, *args, **kwargs):
     pass
 
+  def coords(self, *args, **kwargs):
+    pass
+
+  def itemconfigure(self, *args, **kwargs):
+    pass
+
+  def move(self, *args, **kwargs):
+    pass
+
+  def tag_raise(self, *args, **kwargs):
+    pass
+
 
 class MockTk(object):
   def bind(self, *args, **kwargs):
@@ -31,5 +49,8 @@ class MockTk(object):
   def after(self, *args, **kwargs):
     pass
 
+  def after_idle(self, f, *args):
+    f(*args)
+
   def destroy(self, *args, **kwargs):
     pass
@@ -0,0 +1,62 @@
+import math
+import unittest
+from unittest import mock
+from english2tikz.gui import bezier
+from english2tikz.gui.bezier import *
+from english2tikz.gui.drawers import curve_flatness
+
+
+class TestBezier(unittest.TestCase):
+  def setUp(self):
+    flattened_curves.clear()
+
+  def tearDown(self):
+    flattened_curves.clear()
+
+  def test_numpy_matches_python(self):
+    if bezier.np is None:
+      self.skipTest("numpy is not installed")
+    t_values = [i / 50 for i in range(51)]
+    for points in [[(0, 0), (1, 2)], [(0, 0), (1, 2), (3, -1)],
+                   [(0, 0), (1, 3), (2, -3), (3, 0), (5, 1)]]:
+      expected = bezier._evaluate_python(t_values, points)
+      found = bezier._evaluate_numpy(t_values, points)
+      for (x0, y0), (x1, y1) in zip(expected, found):
+        self.assertAlmostEqual(x0, x1)
+        self.assertAlmostEqual(y0, y1)
+    with mock.patch.object(bezier, "np", None):
+      self.assertEqual(Bezier.Curve([0, 0.5, 1], (0, 0), (2, 2), (4, 0)),
+                       [[0, 0], [2, 1], [4, 0]])
+
+  def test_flatten_steps(self):
+    points = [(0, 0), (1, 3), (2, -3), (3, 0)]
+    for scale in [10, 100, 1000]:
+      tolerance = curve_flatness / scale
+      curve = Bezier.flatten(*points, tolerance=tolerance)
+      steps = min(max(flatten_steps(points, tolerance), min_flatten_steps),
+                  max_flatten_steps)
+      self.assertEqual(len(curve), steps + 1)
+      """
+      The midpoints of the chords in t stay within the tolerance of the
+      curve
+      """
+      for i in range(steps):
+        (x0, y0), (x1, y1) = curve[i], curve[i+1]
+        x, y = Bezier.Point((i + 0.5) / steps, *points)
+        self.assertLessEqual(math.hypot(x - (x0 + x1) / 2, y - (y0 + y1) / 2),
+                             tolerance)
+    self.assertEqual(flatten_steps([(0, 0), (1, 1)], 0.01), 1)
+    self.assertEqual(flatten_steps([(0, 0), (1, 0), (2, 0)], 0.01), 0)
+
+  def test_flattened_curves_lru(self):
+    with mock.patch.object(bezier, "flattened_curves_limit", 3):
+      curves = [Bezier.flatten((0, 0), (i, 1), (2, 0)) for i in range(3)]
+      self.assertIs(Bezier.flatten((0, 0), (0, 1), (2, 0)), curves[0])
+      Bezier.flatten((0, 0), (3, 1), (2, 0))
+      self.assertEqual(len(flattened_curves), 3)
+      self.assertIs(Bezier.flatten((0, 0), (0, 1), (2, 0)), curves[0])
+      self.assertIsNot(Bezier.flatten((0, 0), (1, 1), (2, 0)), curves[1])
+
+
+if __name__ == "__main__":
+  unittest.main()
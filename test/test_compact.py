@@ -0,0 +1,102 @@
+import unittest
+import json
+import copy
+import tempfile
+import os
+import tracemalloc
+from english2tikz.compact import *
+from english2tikz.gui.object_utils import *
+from english2tikz.object_renderers import (TreeObjectRenderer,
+                                           GridObjectRenderer)
+from english2tikz.picture_file import dump, picture_file_to_json
+
+
+def create_picture(n):
+  picture = []
+  for i in range(n):
+    text = create_text(f"node {i}", x=i, y=i * 0.5)
+    text["id"] = f"id{i}"
+    text["name"] = f"id{i}"
+    text["draw"] = True
+    text["fill"] = "blue!20"
+    text["line.width"] = "0.4"
+    picture.append(text)
+    if i > 0:
+      path = create_path([create_nodename(f"id{i-1}", "east"),
+                          create_line(),
+                          create_coordinate(i, i + 1),
+                          create_line(),
+                          create_nodename(f"id{i}")], "->")
+      path["items"][1]["annotates"] = [{
+          "id": f"ann{i}", "type": "text", "text": "x",
+          "in_path": True, "midway": True, "above": True,
+      }]
+      path["my.rare.key"] = "value"
+      picture.append(path)
+  return picture
+
+
+def allocated_size(f):
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  ret = f()
+  after = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return ret, after - before
+
+
+class TestCompact(unittest.TestCase):
+  def test_round_trip(self):
+    picture = create_picture(20)
+    compact = to_compact(picture)
+    self.assertEqual(json.dumps(from_compact(compact)), json.dumps(picture))
+    self.assertEqual(json.dumps(compact, default=json_default),
+                     json.dumps(picture))
+
+  def test_dict_view(self):
+    obj = to_compact(create_text("A", x=1, y=2))
+    self.assertEqual(obj, {"type": "text", "text": "A",
+                           "at": {"type": "coordinate",
+                                  "x": "1cm", "y": "2cm"}})
+    self.assertTrue(is_type(obj, "text"))
+    self.assertTrue(is_type(obj["at"], "coordinate"))
+    obj["color"] = "red"
+    obj["unusual"] = True
+    self.assertIn("color", obj)
+    self.assertIn("unusual", obj)
+    self.assertEqual(list(obj.keys())[-2:], ["color", "unusual"])
+    del obj["color"]
+    obj.pop("unusual")
+    self.assertNotIn("color", obj)
+    self.assertNotIn("unusual", obj)
+    self.assertEqual(obj.get("color", "black"), "black")
+    self.assertTrue(satisfy_filters(obj, [("text", "A")]))
+    self.assertFalse(satisfy_filters(obj, [("text", "B")]))
+    cloned = copy.deepcopy(obj)
+    self.assertEqual(cloned, obj)
+    cloned["at"]["x"] = "3cm"
+    self.assertEqual(obj["at"]["x"], "1cm")
+
+  def test_memory(self):
+    picture, dict_size = allocated_size(lambda: create_picture(1000))
+    compact, compact_size = allocated_size(lambda: to_compact(picture))
+    self.assertLess(compact_size, dict_size)
+
+  def test_consumers(self):
+    tree = to_compact({"type": "tree", "id": "t", "children": []})
+    grid = to_compact({"type": "grid", "id": "g"})
+    self.assertTrue(TreeObjectRenderer().match(tree))
+    self.assertTrue(GridObjectRenderer().match(grid))
+    picture = to_compact(create_picture(3))
+    with tempfile.TemporaryDirectory() as directory:
+      src = os.path.join(directory, "picture.pic")
+      dst = os.path.join(directory, "picture.json")
+      with open(src, "wb") as f:
+        dump({"picture": picture, "nextid": 3}, f)
+      picture_file_to_json(src, dst)
+      with open(dst) as f:
+        self.assertEqual(json.load(f)["picture"], from_compact(picture))
+
+
+if __name__ == "__main__":
+  unittest.main()
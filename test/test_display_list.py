@@ -0,0 +1,109 @@
+import random
+import unittest
+from english2tikz.test.mocks import MockCanvas
+from english2tikz.gui import display_list
+from english2tikz.gui.display_list import DisplayList
+from english2tikz.gui.backends import *
+
+
+class ItemCanvas(MockCanvas):
+  """
+  Keeps the items in stacking order
+  """
+  def __init__(self):
+    self.order = []
+    self.next_id = 0
+
+  def _create(self, *args, **kwargs):
+    self.next_id += 1
+    self.order.append(self.next_id)
+    return self.next_id
+
+  create_line = create_rectangle = create_oval = create_text = _create
+
+  def delete(self, *items):
+    self.order = [item for item in self.order if item not in items]
+
+  def tag_lower(self, item, below):
+    self.order.remove(item)
+    self.order.insert(self.order.index(below), item)
+
+
+class TestDisplayList(unittest.TestCase):
+  def _frame(self, xs):
+    c = DisplayList(MockCanvas())
+    for x in xs:
+      c.source = f"id{x}"
+      c.create_rectangle(x, 0, x + 5, 5, fill="red")
+    return c
+
+  def test_recording(self):
+    c = DisplayList(MockCanvas())
+    a = c.create_rectangle((0, 0, 10, 10), fill="blue")
+    b = c.create_oval(0, 0, 4, 4)
+    c.tag_lower(b, a)
+    self.assertEqual([item[0] for item in c.items()], ["oval", "rectangle"])
+    c.delete(a)
+    self.assertEqual(len(c), 1)
+    self.assertEqual(c.bbox(b), (-2, -2, 6, 6))
+
+  def test_lowering(self):
+    """
+    Lowered in any order, the items end up stacked as on a canvas
+    """
+    rand = random.Random(3)
+    for _ in range(20):
+      c, canvas = DisplayList(MockCanvas()), ItemCanvas()
+      items = []
+      for i in range(12):
+        items.append(c.create_line(i, 0, i, 1))
+        canvas._create()
+        if i > 0 and rand.random() < 0.7:
+          item, below = rand.sample(items, 2)
+          c.tag_lower(item, below)
+          canvas.tag_lower(item, below)
+      self.assertEqual([item[1][0] + 1 for item in c.items()], canvas.order)
+
+  def test_text_extents_bounded(self):
+    saved = display_list.text_extent_cache_max_entries
+    display_list.text_extent_cache_max_entries = 3
+    try:
+      c = DisplayList(MockCanvas())
+      for i in range(10):
+        c.create_text(0, 0, text=f"text {i}")
+      self.assertEqual(len(display_list._text_extents), 3)
+      self.assertIn((("text", "text 9"),), display_list._text_extents)
+    finally:
+      display_list.text_extent_cache_max_entries = saved
+
+  def test_tk_diff(self):
+    canvas = ItemCanvas()
+    backend = TkBackend(canvas)
+    backend.update(self._frame([1, 2, 3]))
+    first = list(canvas.order)
+    backend.update(self._frame([1, 2, 3]))
+    self.assertEqual(canvas.order, first)
+    self.assertEqual(backend.created, 3)
+    backend.update(self._frame([1, 9, 3, 4]))
+    self.assertEqual((backend.created, backend.deleted), (5, 1))
+    self.assertEqual(canvas.order, [first[0], 5, first[2], 4])
+    backend.update(self._frame([3, 1]))
+    self.assertEqual(len(canvas.order), 2)
+    self.assertEqual(canvas.order[0], first[2])
+
+  def test_other_backends(self):
+    frame = self._frame([1, 2])
+    recording = RecordingBackend()
+    recording.update(frame)
+    self.assertEqual(recording.last(),
+                     [("rectangle", (1, 0, 6, 5), "id1"),
+                      ("rectangle", (2, 0, 7, 5), "id2")])
+    self.assertEqual(len(frame.by_source("id2")), 1)
+    svg = render_svg(frame, 20, 10)
+    self.assertEqual(svg.count("<rect"), 2)
+    img = render_pil(frame, 20, 10)
+    self.assertEqual(img.getpixel((3, 2))[:3], (255, 0, 0))
+
+
+if __name__ == "__main__":
+  unittest.main()
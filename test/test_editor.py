@@ -29,6 +29,19 @@ class TestEditor(unittest.TestCase):
       keys, result = case.split("\n")
       self._test_editor_operation(keys.split(" "), result)
 
+  def test_fill_search_undo(self):
+    editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+    editor._parse('there.is.text "A" at.x.0.y.0')
+    editor._parse('there.is.text "B" at.x.1.y.0')
+    id_ = editor._context._picture[1]["id"]
+    editor._selection.select(id_)
+    editor._process_command("fill red")
+    editor._process_command("search fill=red")
+    self.assertEqual(editor._selection.ids(), [id_])
+    editor._undo()
+    editor._process_command("search fill=red")
+    self.assertEqual(editor._selection.ids(), [])
+
 
 if __name__ == "__main__":
   unittest.main()
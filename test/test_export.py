@@ -0,0 +1,127 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from english2tikz.gui import export
+from english2tikz.gui.export import ExportService
+from english2tikz.latex import tikz_cache_path
+from english2tikz.test.mocks import MockTk
+
+
+class RecordingTk(MockTk):
+  def __init__(self):
+    self.callbacks = []
+
+  def after(self, ms, f=None, *args):
+    if f is not None:
+      self.callbacks.append((f, args))
+
+
+class FakeProcess(object):
+  def __init__(self):
+    self.killed = threading.Event()
+
+  def kill(self):
+    self.killed.set()
+
+
+class FakeCompiler(object):
+  """
+  Stands for compile_tikz: writes the png, after waiting for the process
+  to be killed if the code asks to block
+  """
+  def __init__(self):
+    self.codes = []
+    self.processes = []
+    self.started = threading.Event()
+
+  def __call__(self, code, cache_dir, on_process=None):
+    self.codes.append(code)
+    if code.startswith("block"):
+      process = FakeProcess()
+      self.processes.append(process)
+      on_process(process)
+      self.started.set()
+      if not process.killed.wait(5):
+        raise AssertionError("not killed")
+      raise SystemError("killed")
+    path = tikz_cache_path(code, cache_dir)
+    with open(path, "w") as f:
+      f.write(code)
+    return path
+
+
+class TestExportService(unittest.TestCase):
+  def setUp(self):
+    self._dir = tempfile.TemporaryDirectory()
+    self.root = RecordingTk()
+    self.compiler = FakeCompiler()
+    self._patch = mock.patch.object(export, "compile_tikz", self.compiler)
+    self._patch.start()
+    self.service = ExportService(self.root, cache_dir=self._dir.name)
+    self.results = []
+
+  def tearDown(self):
+    self._patch.stop()
+    self._dir.cleanup()
+
+  def _callback(self, name):
+    def callback(path, error):
+      self.results.append((name, path, error,
+                           threading.current_thread() is
+                           threading.main_thread()))
+    return callback
+
+  def _run(self):
+    deadline = time.time() + 5
+    while self.service.pending():
+      self.assertLess(time.time(), deadline)
+      self.assertGreater(len(self.root.callbacks), 0)
+      f, args = self.root.callbacks.pop(0)
+      f(*args)
+      time.sleep(0.01)
+
+  def test_supersede_and_cancel(self):
+    self.service.submit("view", "block", self._callback("block"))
+    self.assertTrue(self.compiler.started.wait(5))
+    self.service.submit("out.png", "queued", self._callback("queued"))
+    self.service.submit("out.png", "newer", self._callback("newer"))
+    self.assertFalse(self.compiler.processes[0].killed.is_set())
+    self.service.submit("view", "view", self._callback("view"))
+    self.assertTrue(self.compiler.processes[0].killed.wait(5))
+    self._run()
+    self.assertNotIn("queued", self.compiler.codes)
+    self.assertEqual(sorted(name for name, _, _, _ in self.results),
+                     ["newer", "view"])
+    for name, path, error, main_thread in self.results:
+      self.assertIsNone(error)
+      self.assertTrue(main_thread)
+      with open(path) as f:
+        self.assertEqual(f.read(), name)
+
+  def test_cached(self):
+    self.service.submit("view", "a", self._callback("a"))
+    self._run()
+    self.service.submit("view", "a", self._callback("again"))
+    self._run()
+    self.assertEqual(self.compiler.codes, ["a"])
+    self.assertEqual([name for name, _, _, _ in self.results], ["a", "again"])
+
+  def test_evict(self):
+    snippet = os.path.join(self._dir.name, "0" * 64 + "@300.png")
+    open(snippet, "w").close()
+    with mock.patch.object(export, "export_cache_max_entries", 2):
+      for code in ["a", "b", "c"]:
+        self.service.submit("view", code, self._callback(code))
+        self._run()
+        time.sleep(0.01)
+    self.assertFalse(os.path.exists(tikz_cache_path("a", self._dir.name)))
+    self.assertTrue(os.path.exists(tikz_cache_path("b", self._dir.name)))
+    self.assertTrue(os.path.exists(tikz_cache_path("c", self._dir.name)))
+    self.assertTrue(os.path.exists(snippet))
+
+
+if __name__ == "__main__":
+  unittest.main()
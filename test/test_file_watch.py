@@ -0,0 +1,69 @@
+import os
+import unittest
+from english2tikz.gui.file_watch import *
+
+
+class ManualRoot(object):
+  """
+  Runs the callbacks scheduled with after only when told to
+  """
+  def __init__(self):
+    self.scheduled = []
+
+  def after(self, ms, f):
+    self.scheduled.append(f)
+
+  def run(self):
+    scheduled, self.scheduled = self.scheduled, []
+    for f in scheduled:
+      f()
+
+
+class TestFileWatch(unittest.TestCase):
+  def test_polling(self):
+    root = ManualRoot()
+    watcher = FileWatcher(root)
+    try:
+      path = watcher.path("command")
+      with open(path, "w") as f:
+        f.write("a")
+      changes = []
+      watcher.watch("command", changes.append)
+      root.run()
+      self.assertEqual(changes, [])
+      with open(path + ".new", "w") as f:
+        f.write("bc")
+      os.replace(path + ".new", path)
+      root.run()
+      root.run()
+      self.assertEqual(changes, ["bc"])
+      watcher.unwatch("command")
+      root.run()
+      self.assertEqual(root.scheduled, [])
+    finally:
+      watcher.close()
+    self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+  def test_sessions(self):
+    a, b = FileWatcher(ManualRoot()), FileWatcher(ManualRoot())
+    self.assertNotEqual(a.path("editing"), b.path("editing"))
+    a.close()
+    b.close()
+
+  def test_inotify(self):
+    watcher = FileWatcher(ManualRoot())
+    fd = open_inotify(os.path.dirname(watcher.path("editing")))
+    if fd is None:
+      watcher.close()
+      self.skipTest("inotify is not available")
+    try:
+      with open(watcher.path("editing"), "w") as f:
+        f.write("x")
+      self.assertGreater(len(os.read(fd, 4096)), 0)
+    finally:
+      os.close(fd)
+      watcher.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
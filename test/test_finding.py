@@ -0,0 +1,37 @@
+import unittest
+from english2tikz.errors import *
+from english2tikz.gui.finding import *
+from english2tikz.gui.object_utils import *
+
+
+class TestFinding(unittest.TestCase):
+  def test_label_length(self):
+    self.assertEqual(label_length(1), 1)
+    self.assertEqual(label_length(26), 1)
+    self.assertEqual(label_length(27), 2)
+    self.assertEqual(label_length(26 ** 3 + 1), 4)
+
+  def test_narrow_down(self):
+    path = create_path([create_coordinate(0, 0), create_line(),
+                        create_coordinate(1, 1)])
+    ids = [f"id{i}" for i in range(30)]
+    finding = Finding(ids + [path])
+    self.assertEqual(finding.get_chopped_code({"id": "id27"}), "BB")
+    self.assertEqual(finding.get_chopped_code(path), "BE")
+    self.assertIsNone(finding.get_chopped_code(dict(path)))
+    self.assertIsNone(finding.narrow_down("b"))
+    self.assertIsNone(finding.get_chopped_code({"id": "id0"}))
+    self.assertEqual(finding.get_chopped_code({"id": "id27"}), "B")
+    self.assertTrue(finding.back())
+    self.assertEqual(finding.narrow_down("a"), None)
+    self.assertEqual(finding.narrow_down("c"), "id2")
+    finding = Finding(ids + [path])
+    finding.narrow_down("b")
+    self.assertIs(finding.narrow_down("e"), path)
+    finding = Finding(ids)
+    with self.assertRaises(ErrorMessage):
+      finding.narrow_down("z")
+
+
+if __name__ == "__main__":
+  unittest.main()
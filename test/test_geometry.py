@@ -0,0 +1,126 @@
+import unittest
+import math
+import random
+from english2tikz.gui.geometry import *
+from english2tikz.gui.bounding_box import *
+
+
+def bisect_clip_line(x0, y0, x1, y1, clip):
+  x, y, w, h = clip
+  if x1 >= x and x1 <= x+w and y1 >= y and y1 <= y+h:
+    return None
+  while (x1 - x0) * (x1 - x0) + (y1 - y0) * (y1 - y0) > 0.001:
+    xm, ym = (x0 + x1) / 2, (y0 + y1) / 2
+    if xm >= x and xm <= x+w and ym >= y and ym <= y+h:
+      x0, y0 = xm, ym
+    else:
+      x1, y1 = xm, ym
+  return x1, y1
+
+
+def random_rect(rng):
+  return (rng.uniform(-10, 10), rng.uniform(-10, 10),
+          rng.uniform(0.1, 5), rng.uniform(0.1, 5))
+
+
+def random_inside(rng, rect):
+  x, y, w, h = rect
+  return rng.uniform(x, x + w), rng.uniform(y, y + h)
+
+
+class TestGeometry(unittest.TestCase):
+  def test_clip_line_matches_bisection(self):
+    rng = random.Random(0)
+    for _ in range(2000):
+      rect = random_rect(rng)
+      x0, y0 = random_inside(rng, rect)
+      x1, y1 = rng.uniform(-20, 20), rng.uniform(-20, 20)
+      expected = bisect_clip_line(x0, y0, x1, y1, rect)
+      actual = clip_line(x0, y0, x1, y1, rect)
+      if expected is None:
+        self.assertIsNone(actual)
+        continue
+      self.assertLess(euclidean_dist(expected, actual), 0.05)
+      x, y, w, h = rect
+      on_boundary = min(abs(actual[0] - x), abs(actual[0] - x - w),
+                        abs(actual[1] - y), abs(actual[1] - y - h))
+      self.assertAlmostEqual(on_boundary, 0)
+
+  def test_clip_line_rounded_rect(self):
+    rng = random.Random(1)
+    for _ in range(2000):
+      rect = random_rect(rng)
+      x, y, w, h = rect
+      cx, cy = x + w / 2, y + h / 2
+      r = rng.uniform(0, min(w, h) / 2)
+      x1, y1 = rng.uniform(-20, 20), rng.uniform(-20, 20)
+      point = clip_line_rounded_rect(cx, cy, x1, y1, rect, r)
+      if point is None:
+        self.assertIsNone(clip_line(cx, cy, x1, y1, rect))
+        continue
+      px, py = point
+      # On the ray from the center
+      cross = (px - cx) * (y1 - cy) - (py - cy) * (x1 - cx)
+      self.assertAlmostEqual(cross, 0, places=6)
+      # On the boundary of the rounded rectangle
+      qx = bound_by(px, x + r, x + w - r)
+      qy = bound_by(py, y + r, y + h - r)
+      if qx != px and qy != py:
+        self.assertAlmostEqual(euclidean_dist((px, py), (qx, qy)), r)
+      else:
+        self.assertLess(euclidean_dist(point,
+                                       clip_line(cx, cy, x1, y1, rect)),
+                        1e-9)
+
+  def test_ellipse(self):
+    rng = random.Random(2)
+    for _ in range(1000):
+      a, b = rng.uniform(0.1, 5), rng.uniform(0.1, 5)
+      x1, y1 = rng.uniform(-20, 20), rng.uniform(-20, 20)
+      px, py = ray_ellipse_point(1, 2, a, b, x1, y1)
+      self.assertAlmostEqual(((px - 1) / a) ** 2 + ((py - 2) / b) ** 2, 1)
+      bb = BoundingBox(1 - a, 2 - b, 2 * a, 2 * b, shape="ellipse",
+                       angle=rng.uniform(0, 360), center=(1, 2))
+      qx, qy = bb.get_point_at_direction(x1, y1)
+      self.assertAlmostEqual(euclidean_dist((1, 2), (qx, qy)),
+                             euclidean_dist((1, 2), bb.rev_rotate(qx, qy)))
+
+  def test_clip_curve(self):
+    rect = (0, 0, 2, 2)
+    for n in range(1, 40):
+      curve = [(1 + i / n * 3, 1 + i / n * 2) for i in range(n + 1)]
+      expected = None
+      for i in range(len(curve)):
+        if not point_in_rect(*curve[i], (0, 0, 2, 2), strict=True):
+          expected = curve[i:]
+          break
+      self.assertEqual(clip_curve(curve, rect), expected)
+      bb = BoundingBox(0, 0, 2, 2, center=(1, 1))
+      self.assertEqual(bb.clip_curve(curve), expected)
+    self.assertIsNone(clip_curve([(1, 1), (1.5, 1.5)], rect))
+
+  def test_clip_curve_crossings(self):
+    rect = (0, 0, 2, 2)
+    bb = BoundingBox(0, 0, 2, 2, center=(1, 1))
+    """
+    A loop from the node back to itself ends inside it
+    """
+    loop = [(1 + 2 * math.sin(i / 20 * math.pi), 1 - 1.5 * math.sin(
+        i / 10 * math.pi) ** 2) for i in range(21)]
+    first = next(i for i, p in enumerate(loop)
+                 if not point_in_rect(*p, (0, 0, 2, 2), strict=True))
+    self.assertEqual(clip_curve(loop, rect), loop[first:])
+    self.assertEqual(bb.clip_curve(loop), loop[first:])
+    """
+    A curve leaving, coming back and leaving again is clipped where it
+    last leaves
+    """
+    wiggle = [(1, 1), (2.5, 1), (1.5, 1), (3, 1), (4, 1)]
+    self.assertEqual(clip_curve(wiggle, rect), wiggle[3:])
+    self.assertEqual(bb.clip_curve(wiggle), wiggle[3:])
+    outside = [(3, 3), (4, 4)]
+    self.assertEqual(clip_curve(outside, rect), outside)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from english2tikz.test.mocks import MockCanvas
+from english2tikz.gui.coordinate_system import CoordinateSystem
+from english2tikz.gui.grid_layer import GridLayer
+from english2tikz.gui.display_list import DisplayList
+from english2tikz.gui.backends import TkBackend
+
+
+class CountingCanvas(MockCanvas):
+  def __init__(self):
+    self.created = 0
+    self.moves = []
+
+  def create_line(self, *args, **kwargs):
+    self.created += 1
+
+  def create_text(self, *args, **kwargs):
+    self.created += 1
+
+  def move(self, *args):
+    self.moves.append(args)
+
+
+class StackingCanvas(MockCanvas):
+  """
+  Keeps the items with their tags in stacking order, bottom first
+  """
+  def __init__(self):
+    self.order = []
+    self.tags = {}
+
+  def _create(self, *args, tags=(), **kwargs):
+    item = len(self.tags) + 1
+    self.tags[item] = (tags,) if isinstance(tags, str) else tuple(tags)
+    self.order.append(item)
+    return item
+
+  create_line = create_text = create_rectangle = _create
+
+  def _find(self, tag):
+    return [item for item in self.order
+            if item == tag or tag in self.tags[item]]
+
+  def delete(self, *tags):
+    for tag in tags:
+      for item in self._find(tag):
+        self.order.remove(item)
+
+  def tag_lower(self, tag, below=None):
+    items = self._find(tag)
+    rest = [item for item in self.order if item not in items]
+    index = 0 if below is None else rest.index(below)
+    self.order = rest[:index] + items + rest[index:]
+
+  def is_grid(self, item):
+    return "grid" in self.tags[item]
+
+
+class TestGridLayer(unittest.TestCase):
+  def test_below_picture(self):
+    canvas = StackingCanvas()
+    cs = CoordinateSystem(1200, 800, 100)
+    layer, backend = GridLayer(canvas), TkBackend(canvas)
+    frame = DisplayList(MockCanvas())
+    frame.create_rectangle(0, 0, 10, 10)
+    frame.create_line(0, 0, 10, 10)
+    for show_axes in [True, False, True]:
+      layer.draw(cs, 1, True, show_axes)
+      backend.update(frame)
+      grid = [i for i, item in enumerate(canvas.order)
+              if canvas.is_grid(item)]
+      picture = [i for i, item in enumerate(canvas.order)
+                 if not canvas.is_grid(item)]
+      self.assertEqual(len(picture), 2)
+      self.assertLess(max(grid), min(picture))
+    self.assertEqual(backend.created, 2)
+
+  def test_bounded_and_moved(self):
+    cs = CoordinateSystem(1200, 800, 100)
+    counts = []
+    for grid_size in [1, 0.1, 0.001]:
+      canvas = CountingCanvas()
+      GridLayer(canvas).draw(cs, grid_size, True, True)
+      counts.append(canvas.created)
+    self.assertLess(max(counts), 1000)
+
+    canvas = CountingCanvas()
+    layer = GridLayer(canvas)
+    layer.draw(cs, 0.1, True, True)
+    created = canvas.created
+    cs.scroll(30, -20)
+    layer.draw(cs, 0.1, True, True)
+    self.assertEqual(canvas.created, created)
+    self.assertIn(("grid.row", 0, -20), canvas.moves)
+    self.assertIn(("grid.col", 30, 0), canvas.moves)
+    cs.scroll(2000, 0)
+    layer.draw(cs, 0.1, True, True)
+    self.assertGreater(canvas.created, created)
+
+
+if __name__ == "__main__":
+  unittest.main()
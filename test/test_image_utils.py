@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+from PIL import Image
+from english2tikz.gui.image_utils import *
+
+
+class TestImageCache(unittest.TestCase):
+  def setUp(self):
+    self._dir = tempfile.TemporaryDirectory()
+    self._path = os.path.join(self._dir.name, "image.png")
+    Image.new("RGBA", (400, 200), (255, 0, 0, 255)).save(self._path)
+
+  def tearDown(self):
+    self._dir.cleanup()
+
+  def _touch(self, size):
+    Image.new("RGBA", size).save(self._path)
+    stat = os.stat(self._path)
+    os.utime(self._path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+  def test_levels_and_stats(self):
+    cache = ImageCache(photo_image=lambda img: img)
+    img = cache.get(self._path, 0.5)
+    self.assertEqual(img.size, (200, 100))
+    self.assertIs(cache.get(self._path, 0.5), img)
+    self.assertEqual(cache.get(self._path, 0.2).size, (80, 40))
+    self.assertEqual(cache.get(self._path, 0.5, angle=90).size, (100, 200))
+    self.assertEqual(cache.get(self._path, size=(30, 30)).size, (30, 30))
+    stats = cache.stats()
+    self.assertEqual(stats["hits"], 1)
+    self.assertEqual(stats["misses"], 4)
+    version = cache._version(self._path)
+    self.assertEqual(cache._nearest_level(self._path, version, (80, 40)), 2)
+
+  def test_bounded(self):
+    cache = ImageCache(max_bytes=400 * 200 * 4, photo_image=lambda img: img)
+    for i in range(1, 20):
+      cache.get(self._path, i / 20)
+      self.assertLessEqual(cache.stats()["bytes"], 400 * 200 * 4)
+    self.assertEqual(cache.get(self._path, 1).size, (400, 200))
+
+  def test_shown_images_kept(self):
+    cache = ImageCache(max_bytes=400 * 200 * 4, photo_image=lambda img: img)
+    cache.begin_frame()
+    shown = cache.get(self._path, 1)
+    cache.end_frame()
+    cache.begin_frame()
+    cache.get(self._path, 0.9)
+    self.assertNotIn(id(shown), [id(value) for value, _
+                                 in cache._entries.values()])
+    self.assertIs(cache.source(shown), shown)
+    cache.cancel_frame()
+    cache.begin_frame()
+    cache.end_frame()
+    self.assertIsNone(cache.source(shown))
+
+  def test_modified_file(self):
+    cache = ImageCache(photo_image=lambda img: img)
+    self.assertEqual(cache.get(self._path).size, (400, 200))
+    self._touch((100, 50))
+    self.assertEqual(cache.get(self._path).size, (100, 50))
+
+  def test_version_read_once_per_frame(self):
+    cache = ImageCache(photo_image=lambda img: img)
+    cache.begin_frame()
+    self.assertEqual(cache.get(self._path).size, (400, 200))
+    self._touch((100, 50))
+    self.assertEqual(cache.get(self._path).size, (400, 200))
+    cache.end_frame()
+    cache.begin_frame()
+    self.assertEqual(cache.get(self._path).size, (100, 50))
+    cache.cancel_frame()
+
+  def test_sizes_dropped(self):
+    cache = ImageCache(max_bytes=400 * 200 * 4, photo_image=lambda img: img)
+    cache.get(self._path)
+    for i in range(3):
+      self._touch((100 + i, 50))
+      self.assertEqual(cache.get(self._path).size, (100 + i, 50))
+    self.assertEqual(set(cache._sizes), {key[1:3] for key in cache._entries})
+    self.assertEqual(set(cache._counts), set(cache._sizes))
+    cache.clear()
+    self.assertEqual(cache._sizes, {})
+
+
+if __name__ == "__main__":
+  unittest.main()
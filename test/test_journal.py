@@ -0,0 +1,160 @@
+import os
+import sys
+import unittest
+import copy
+import tempfile
+import subprocess
+from english2tikz.gui.journal import *
+from english2tikz.gui.object_utils import *
+from english2tikz.gui.editor import Editor
+from english2tikz.test.mocks import MockCanvas, MockTk
+
+
+class RecordingJournal(object):
+  def __init__(self):
+    self.records = []
+
+  def record(self, before, after, nextid, splice):
+    self.records.append(copy.deepcopy((before, after, splice)))
+
+
+class TestJournal(unittest.TestCase):
+  def test_splice(self):
+    before = [1, 2, 3, 4, 5]
+    for after in [[1, 2, 3, 4, 5], [1, 9, 3, 4, 5], [1, 2, 4, 5],
+                  [0, 1, 2, 3, 4, 5], [1, 2, 3, 4, 5, 6], [], [7, 8]]:
+      picture = list(before)
+      apply_splice(picture, *picture_splice(before, after))
+      self.assertEqual(picture, after)
+    self.assertEqual(picture_splice(before, [1, 2, 9, 9, 4, 5]),
+                     (2, 1, [9, 9]))
+
+  def test_touched_splice(self):
+    a, b, c = create_text("A"), create_text("B"), create_text("C")
+    path = {"type": "path", "items": [{"type": "line", "annotates": [c]}]}
+    picture = [a, b, path, create_text("D")]
+    self.assertEqual(touched_splice(picture, [b, c]), (1, 2, [b, path]))
+    self.assertEqual(touched_splice(picture, []), (0, 0, []))
+    self.assertEqual(appended_splice(3, picture), (3, 0, picture[3:]))
+
+  def test_edit_splices(self):
+    editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+    journal = RecordingJournal()
+    editor._journal = journal
+    for i in range(3):
+      editor._parse(f'there.is.text "{i}" at.x.{i}.y.0')
+    editor._selection.select(editor._context._picture[1]["id"])
+    editor._set("draw")
+    editor._shift_selected_objects(1, 0)
+    editor._canvas_manager.draw()
+    editor._copy_selected_objects()
+    editor._paste()
+    for _ in range(3):
+      editor._undo()
+    editor._redo()
+    editor._redo()
+    self.assertEqual(len(journal.records), 11)
+    for before, after, splice in journal.records:
+      apply_splice(before, *splice)
+      self.assertEqual(before, after)
+
+  def test_names_and_fill_journaled(self):
+    editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+    journal = RecordingJournal()
+    editor._journal = journal
+    editor._parse('there.is.text "A" at.x.0.y.0')
+    obj = editor._context._picture[0]
+    obj.pop("name", None)
+    editor._ensure_name_is_id(obj["id"])
+    editor._ensure_name_is_id(obj["id"])
+    editor._selection.select(obj["id"])
+    editor._process_command("fill red")
+    self.assertEqual(len(journal.records), 3)
+    picture = []
+    for _, _, splice in journal.records:
+      apply_splice(picture, *splice)
+    self.assertEqual(picture[0]["name"], obj["id"])
+    self.assertEqual(picture[0]["fill"], "red")
+
+  def test_recover(self):
+    with tempfile.TemporaryDirectory() as directory:
+      journal = Journal(directory)
+      self.assertIsNone(journal.recover())
+      picture = [create_text("A", x=0, y=0)]
+      journal.start(picture, 1)
+      for i in range(5):
+        before = list(picture)
+        picture = picture + [create_text(f"B{i}", x=i, y=0)]
+        journal.record(before, picture, 2 + i)
+        if i == 2:
+          journal.snapshot(picture, 2 + i)
+      before = list(picture)
+      picture = picture[1:]
+      journal.record(before, picture, 6)
+      journal.close()
+      recovered = Journal(directory).recover()
+      self.assertEqual(recovered, {"picture": picture, "nextid": 6})
+
+      journal = Journal(directory)
+      journal.start(picture, 6)
+      journal.close(remove=not journal.dirty())
+      self.assertIsNone(Journal(directory).recover())
+
+  def test_untitled_sessions(self):
+    with tempfile.TemporaryDirectory() as base:
+      process = subprocess.Popen([sys.executable, "-c", "pass"])
+      process.wait()
+      left = journal_dir_for(base, pid=process.pid)
+      self.assertNotEqual(left, journal_dir_for(base))
+      journal = Journal(left)
+      journal.start([], 1)
+      journal.record([], [create_text("A")], 2)
+      journal.close()
+
+      editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+      editor._object_path = base
+      editor.start_journal()
+      self.assertEqual(editor._context._picture[0]["text"], "A")
+      self.assertFalse(os.path.exists(left))
+      self.assertTrue(os.path.exists(journal_dir_for(base)))
+
+      filename = os.path.join(base, "named.json")
+      editor._process_command(f"w {filename}")
+      self.assertFalse(os.path.exists(journal_dir_for(base)))
+      self.assertTrue(os.path.exists(journal_dir_for(base, filename)))
+      editor._parse('there.is.text "B" at.x.1.y.0')
+      editor._process_command("q")
+      self.assertFalse(os.path.exists(journal_dir_for(base, filename)))
+
+  def test_file_changed(self):
+    with tempfile.TemporaryDirectory() as base:
+      filename = os.path.join(base, "picture.json")
+      with open(filename, "w") as f:
+        f.write("{}")
+      for changed in [False, True]:
+        editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+        editor._object_path = base
+        editor.start_journal(filename)
+        editor._parse('there.is.text "A" at.x.0.y.0')
+        editor._journal.close()
+        if changed:
+          stat = os.stat(filename)
+          os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+        editor._object_path = base
+        editor.start_journal(filename)
+        editor._journal.close(remove=True)
+        directory = journal_dir_for(base, filename)
+        kept = [name for name in os.listdir(os.path.dirname(directory))
+                if name.startswith(os.path.basename(directory) + ".")]
+        if changed:
+          self.assertEqual(editor._context._picture, [])
+          self.assertIn("kept the journal", editor._error_msg)
+          self.assertEqual(len(kept), 1)
+        else:
+          self.assertEqual(editor._context._picture[0]["text"], "A")
+          self.assertEqual(kept, [])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,152 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest import mock
+from english2tikz.latex import *
+from english2tikz import latex
+from english2tikz.latex import _available_dpis, _add_dpi, _raster_dpis
+
+
+class TestCompileScheduler(unittest.TestCase):
+  def test_order_and_drop(self):
+    scheduler = CompileScheduler(workers=0)
+    scheduler.begin_frame(100, 100)
+    scheduler.request("far", None, 500, 500)
+    scheduler.request("near", None, 120, 50)
+    scheduler.request("hidden", None)
+    scheduler.request("visible", None, 50, 50)
+    scheduler.request("far", None, 0, 0)
+    scheduler.end_frame()
+    self.assertEqual(scheduler.queued(), ["visible", "far", "near", "hidden"])
+    scheduler.begin_frame(100, 100)
+    scheduler.request("near", None, 120, 50)
+    scheduler.request("hidden", None, 1000, 50)
+    scheduler.end_frame()
+    self.assertEqual(scheduler.queued(), ["near", "hidden"])
+
+  def _settle(self, scheduler, runs, count):
+    deadline = time.time() + 5
+    while len(runs) < count or len(scheduler._running) > 0:
+      self.assertLess(time.time(), deadline)
+      time.sleep(0.01)
+
+  def test_failures(self):
+    scheduler = CompileScheduler(workers=1)
+    runs = []
+
+    def job():
+      runs.append(1)
+      raise ValueError("job failed")
+
+    scheduler.request("key", job)
+    self._settle(scheduler, runs, 1)
+    self.assertIn("key", scheduler._failed)
+    scheduler.request("key", job)
+    self.assertEqual(scheduler.queued(), [])
+    with mock.patch("english2tikz.latex.compile_retry_seconds", 0):
+      scheduler.request("key", job)
+      self._settle(scheduler, runs, 2)
+    self.assertEqual(len(runs), 2)
+
+  def test_failures_forgotten(self):
+    scheduler = CompileScheduler(workers=0)
+    now = time.monotonic()
+    for i in range(4):
+      scheduler._failed[f"old{i}"] = now - compile_retry_seconds - 10 + i
+    scheduler._failed["new"] = now
+    scheduler.begin_frame(100, 100)
+    scheduler.end_frame()
+    self.assertEqual(list(scheduler._failed), ["new"])
+    scheduler.begin_frame(100, 100)
+    scheduler.request("new", None)
+    scheduler.end_frame()
+    self.assertEqual(scheduler.queued(), [])
+
+
+class TestRasterDpis(unittest.TestCase):
+  def test_copy(self):
+    code = "test-raster-dpis"
+    dpis = _available_dpis(code)
+    _add_dpi(code, 300)
+    self.assertEqual(dpis, ())
+    self.assertEqual(_available_dpis(code), (300,))
+    del _raster_dpis[code]
+
+
+class TestFormats(unittest.TestCase):
+  def setUp(self):
+    self._dir = tempfile.TemporaryDirectory()
+    self._patches = [
+        mock.patch.object(latex, "format_dir", self._dir.name),
+        mock.patch.object(latex, "_formats", {}),
+        mock.patch.object(latex, "_rebuilt_formats", set()),
+        mock.patch.object(latex, "_engine_version", "pdfTeX 3.1"),
+    ]
+    for patch in self._patches:
+      patch.start()
+    self.builds = []
+    self.runs = []
+
+  def tearDown(self):
+    for patch in reversed(self._patches):
+      patch.stop()
+    self._dir.cleanup()
+
+  def _build(self, preamble, path):
+    self.builds.append(path)
+    open(path, "w").close()
+    return True
+
+  def _run(self, args, cwd, on_process=None):
+    """
+    Compilations with a format fail, as with a format dumped by another
+    engine, and those without one succeed
+    """
+    self.runs.append(args)
+    if any(arg.startswith("-fmt=") for arg in args):
+      return 1
+    open(os.path.join(cwd, "tmp.pdf"), "w").close()
+    return 0
+
+  def _run_typo(self, args, cwd, on_process=None):
+    """
+    Compilations fail on an error in the document, after loading the
+    format
+    """
+    self.runs.append(args)
+    with open(os.path.join(cwd, "tmp.log"), "w") as f:
+      f.write("! Undefined control sequence.\n")
+    return 1
+
+  def test_keyed_by_engine(self):
+    with mock.patch.object(latex, "_build_format", self._build):
+      path = get_format("preamble")
+      with mock.patch.object(latex, "_engine_version", "pdfTeX 3.2"):
+        self.assertNotEqual(get_format("preamble"), path)
+    self.assertEqual(len(self.builds), 2)
+
+  def test_rebuilt_once(self):
+    pdf = os.path.join(self._dir.name, "out.pdf")
+    with mock.patch.object(latex, "_build_format", self._build), \
+         mock.patch.object(latex, "_run", self._run):
+      for _ in range(2):
+        compile_pdf("preamble", "body", pdf)
+    self.assertTrue(os.path.exists(pdf))
+    self.assertEqual(len(self.builds), 2)
+    self.assertEqual([any(arg.startswith("-fmt=") for arg in args)
+                      for args in self.runs],
+                     [True, True, False, True, False])
+
+  def test_document_error_not_rebuilt(self):
+    pdf = os.path.join(self._dir.name, "out.pdf")
+    with mock.patch.object(latex, "_build_format", self._build), \
+         mock.patch.object(latex, "_run", self._run_typo):
+      with self.assertRaises(SystemError):
+        compile_pdf("preamble", r"\typo", pdf)
+    self.assertEqual(len(self.builds), 1)
+    self.assertEqual(len(self.runs), 2)
+
+
+if __name__ == "__main__":
+  unittest.main()
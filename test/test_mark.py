@@ -0,0 +1,41 @@
+import unittest
+from english2tikz.gui.mark import MarkManager
+from english2tikz.gui.object_utils import *
+
+
+class TestMarkManager(unittest.TestCase):
+  def assertPos(self, found, expected):
+    self.assertIsNotNone(found)
+    for a, b in zip(found, expected):
+      self.assertAlmostEqual(a, b)
+
+  def test_relative_and_arc(self):
+    marks = MarkManager()
+    marks.add_coord(1, 2)
+    marks.append(create_coordinate(1, -1, relative=True))
+    marks.append(create_arc(0, 90, 1))
+    marks.append(create_coordinate(0.5, 0, relative=True))
+    self.assertPos(marks.get_pos(0, {}), (1, 2))
+    self.assertPos(marks.get_pos(1, {}), (2, 1))
+    self.assertPos(marks.get_pos(2, {}), (1, 2))
+    self.assertPos(marks.get_pos(3, {}), (1.5, 2))
+    self.assertPos(marks.get_last_pos({}), (1.5, 2))
+
+  def test_relative_first(self):
+    marks = MarkManager()
+    marks.append(create_coordinate(1, 1, relative=True))
+    marks.append(create_arc(0, 90, 1))
+    self.assertIsNone(marks.get_pos(0, {}))
+    self.assertIsNone(marks.get_pos(1, {}))
+
+  def test_last_pos_not_kept(self):
+    marks = MarkManager()
+    marks.add_coord(1, 2)
+    self.assertPos(marks.get_last_pos({}), (1, 2))
+    marks.clear()
+    marks.add_coord(3, 4)
+    self.assertPos(marks.get_last_pos({}), (3, 4))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import io
+import os
+import json
+import tempfile
+from unittest import mock
+from english2tikz.picture_file import *
+from english2tikz.gui.object_utils import *
+from english2tikz.gui.editor import Editor
+from english2tikz.test.mocks import MockCanvas, MockTk
+
+
+def create_data(n):
+  picture = []
+  for i in range(n):
+    text = create_text(f"node {i}", x=i, y=0)
+    text["id"] = f"id{i}"
+    picture.append(text)
+    if i > 0:
+      picture.append(create_path([create_nodename(f"id{i-1}"),
+                                  create_line(),
+                                  create_nodename(f"id{i}")]))
+  return {"picture": picture, "nextid": n, "bound_box": [0, 0, n, 1],
+          "width": n, "height": 1}
+
+
+def bound(obj):
+  if "id" in obj:
+    x = int(obj["id"][2:])
+    return x - 0.5, -0.5, x + 0.5, 0.5
+  return None
+
+
+class TestPictureFile(unittest.TestCase):
+  def test_round_trip(self):
+    data = create_data(200)
+    f = io.BytesIO()
+    dump(data, f, bound, chunk_size=16)
+    self.assertEqual(json.dumps(load(f)), json.dumps(data))
+
+  def test_lazy_loading(self):
+    data = create_data(200)
+    f = io.BytesIO()
+    dump(data, f, bound, chunk_size=16)
+    reader = PictureReader(f, cached_chunks=2)
+    self.assertEqual(len(reader), len(data["picture"]))
+    self.assertEqual(reader.meta["nextid"], 200)
+    self.assertEqual(reader.get("id123"), data["picture"][245])
+    self.assertIsNone(reader.get("missing"))
+    self.assertEqual([obj["id"] for obj in reader.query(9.8, 0, 12.2, 1)],
+                     ["id10", "id11", "id12"])
+    self.assertLessEqual(len(reader._chunk_cache), 2)
+
+  def test_failed_write_keeps_file(self):
+    editor = Editor(MockTk(), MockCanvas(), 1200, 800)
+    editor._parse('there.is.text "A" at.x.0.y.0')
+    editor._canvas_manager.draw()
+
+    def failing_dump(data, f, bound=None):
+      f.write(b"partial")
+      raise OSError("disk full")
+
+    with tempfile.TemporaryDirectory() as directory:
+      filename = os.path.join(directory, "picture" + picture_file_extension)
+      editor._process_command(f"w {filename}")
+      with open(filename, "rb") as f:
+        saved = f.read()
+      with mock.patch("english2tikz.picture_file.dump", failing_dump):
+        with self.assertRaises(OSError):
+          editor._write(filename)
+      with open(filename, "rb") as f:
+        self.assertEqual(f.read(), saved)
+      self.assertEqual(os.listdir(directory), ["picture.e2t"])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,37 @@
+import random
+import unittest
+from english2tikz.utils import *
+from english2tikz.gui.geometry import euclidean_dist
+from english2tikz.gui.bounding_box import BoundingBox
+from english2tikz.gui.object_utils import *
+from english2tikz.gui.point_collection import PointCollection
+
+
+class TestPointCollection(unittest.TestCase):
+  def test_closest(self):
+    rand = random.Random(1)
+    collection, points = PointCollection(), []
+    for i in range(300):
+      if rand.random() < 0.8:
+        x, y = rand.uniform(-10, 10), rand.uniform(-10, 10)
+        bb = BoundingBox(x, y, rand.uniform(0, 2), rand.uniform(0, 2),
+                         angle=rand.choice([0, 30, 90]), center=(x, y))
+        collection.add_box(f"id{i}", bb)
+        points += [(create_nodename(f"id{i}", a), bb.get_anchor_pos(a),
+                    None, None) for a in anchor_list]
+      else:
+        path = create_path([])
+        positions = [((rand.uniform(-10, 10), rand.uniform(-10, 10)),
+                      None, create_coordinate(0, 0), j) for j in range(3)]
+        collection.add_path(path, positions)
+        points += [(item, pos, path, index)
+                   for pos, _, item, index in positions]
+    for _ in range(100):
+      x, y = rand.uniform(-12, 12), rand.uniform(-12, 12)
+      expected = min(points, key=lambda p: euclidean_dist(p[1], (x, y)))
+      self.assertEqual(collection.closest(x, y), expected)
+    self.assertIsNone(PointCollection().closest(0, 0))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from english2tikz.describe_it import DescribeIt
+from english2tikz.test.mocks import MockCanvas
+from english2tikz.gui.preview import *
+from english2tikz.gui.display_list import DisplayList
+
+
+class TestPreview(unittest.TestCase):
+  def _picture(self):
+    context = DescribeIt()
+    context.parse(r"""
+there.is.a.tree.with.branches.2 with.texts "H" "a" "b"
+  with.names "root" "a" "b"
+for.all.text set.draw
+draw from.root.south point.to.a
+""")
+    return context._picture
+
+  def test_layout(self):
+    display_list, width, height = layout_picture(self._picture(),
+                                                 MockCanvas(), margin=5)
+    x0 = min(item[3][0] for item in display_list.items())
+    y0 = min(item[3][1] for item in display_list.items())
+    self.assertAlmostEqual(x0, 5)
+    self.assertAlmostEqual(y0, 5)
+    self.assertEqual(len(display_list.by_source("id1")), 2)
+    self.assertGreater(width, 10)
+    self.assertGreater(height, 10)
+
+  def test_outputs(self):
+    svg = preview_svg(self._picture(), MockCanvas())
+    self.assertEqual(svg.count("<rect"), 3)
+    self.assertEqual(svg.count("<text"), 3)
+    img = preview_image(self._picture(), MockCanvas())
+    self.assertEqual(img.getpixel((0, 0)), preview_background)
+
+  def test_empty(self):
+    self.assertEqual(layout_picture([], MockCanvas(), margin=5)[1:], (10, 10))
+
+  def test_svg_text(self):
+    display_list = DisplayList(MockCanvas())
+    display_list.create_text(10, 10, text="a<b\nc", angle=90)
+    svg = render_svg(display_list, 20, 20)
+    self.assertIn('transform="rotate(-90 10.5 10.5)"', svg)
+    self.assertEqual(svg.count("<tspan"), 2)
+    self.assertIn(">a&lt;b</tspan>", svg)
+    self.assertIn(">c</tspan>", svg)
+    display_list = DisplayList(MockCanvas())
+    display_list.create_text(10, 10, text="a")
+    svg = render_svg(display_list, 20, 20)
+    self.assertNotIn("transform", svg)
+    self.assertEqual(svg.count("<tspan"), 1)
+
+  def test_formula_not_compiled(self):
+    context = DescribeIt()
+    context.parse(r"""there.is.text "$x^2$" at.x.0.y.0""")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+      os.chdir(directory)
+      try:
+        with mock.patch("english2tikz.latex._compile_snippet",
+                        return_value=False) as compile_snippet:
+          svg = preview_svg(context._picture, MockCanvas())
+      finally:
+        os.chdir(cwd)
+    self.assertGreater(compile_snippet.call_count, 0)
+    self.assertNotIn("x^2", svg)
+    self.assertNotIn("<ellipse", svg)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,82 @@
+import copy
+import random
+import unittest
+from english2tikz.gui.search_index import SearchIndex
+from english2tikz.gui.journal import picture_splice
+from english2tikz.gui.object_utils import *
+
+
+class TestSearchIndex(unittest.TestCase):
+  def _scan(self, picture, filters):
+    ret = []
+    for obj in picture:
+      if satisfy_filters(obj, filters):
+        ret.append(obj)
+      for item in obj.get("items", []):
+        for annotate in item.get("annotates", []):
+          if satisfy_filters(annotate, filters):
+            ret.append(annotate)
+    return ret
+
+  def _random_object(self, rand, i):
+    text = "".join(rand.choice("abcab ") for _ in range(rand.randint(0, 8)))
+    if rand.random() < 0.3:
+      line = create_line()
+      annotate = create_text(text)
+      if rand.random() < 0.5:
+        annotate["id"] = f"id{i}"
+      line["annotates"] = [annotate]
+      path = create_path([create_coordinate(i, 0), line,
+                          create_coordinate(i, 1)])
+      path["color"] = "red"
+      return path
+    obj = create_text(text, x=i, y=0)
+    obj["id"] = f"id{i}"
+    if rand.random() < 0.5:
+      obj["text.color"] = rand.choice(["blue", "red", "black"])
+    return obj
+
+  def test_search(self):
+    rand = random.Random(1)
+    index = SearchIndex()
+    picture = []
+    queries = [[("text", "ab")], [("text", "a")], [("text", "abca")],
+               [("text", "")], [(None, "re")], [("color", None)],
+               [("text", "b"), ("color", "bl")], [("type", "path")],
+               [(None, "zz")]]
+    for i in range(200):
+      before = list(picture)
+      if len(picture) > 0 and rand.random() < 0.3:
+        del picture[rand.randrange(len(picture))]
+      else:
+        picture.insert(rand.randint(0, len(picture)),
+                       self._random_object(rand, i))
+      index.apply(picture, *picture_splice(before, picture))
+      for filters in queries:
+        expected = self._scan(picture, filters)
+        found = index.search(filters)
+        self.assertEqual([id(obj) for obj in found],
+                         [id(obj) for obj in expected])
+
+  def test_repoint(self):
+    rand = random.Random(2)
+    picture = [self._random_object(rand, i) for i in range(30)]
+    index = SearchIndex()
+    index.rebuild(picture)
+    for start, delete, count in [(3, 2, 1), (0, 0, 2), (10, 1, 1)]:
+      replaced = copy.deepcopy(picture)
+      insert = [self._random_object(rand, 100 + i) for i in range(count)]
+      replaced[start:start+delete] = insert
+      uids = index._next_uid
+      index.repoint(replaced, start, delete, insert)
+      picture = replaced
+      self.assertEqual(index._next_uid - uids,
+                       sum(len(index._units_of(obj)) for obj in insert))
+      for filters in [[("text", "ab")], [("type", "path")]]:
+        self.assertEqual(
+            [id(obj) for obj in index.search(filters)],
+            [id(obj) for obj in self._scan(picture, filters)])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import copy
+from english2tikz.describe_it import DescribeIt
+from english2tikz.gui.selection import Selection
+from english2tikz.gui.object_utils import *
+
+
+class TestSelection(unittest.TestCase):
+  def setUp(self):
+    self._context = DescribeIt()
+    self._paths = [create_path([create_coordinate(i, 0), create_line(),
+                                create_coordinate(i, 1)])
+                   for i in range(3)]
+    self._context._picture = list(self._paths)
+    self._selection = Selection(self._context)
+
+  def test_identity(self):
+    selection = self._selection
+    path = self._paths[0]
+    selection.include(path, "a", "b", "a")
+    self.assertEqual(selection.ids(), ["a", "b"])
+    self.assertTrue(selection.selected(path))
+    self.assertFalse(selection.selected_path(copy.deepcopy(path)))
+    selection.toggle("b", "c", self._paths[1])
+    self.assertEqual(selection.ids(), ["a", "c"])
+    self.assertEqual(selection.paths(), self._paths[:2])
+    selection.exclude(path, "a")
+    self.assertEqual(selection.ids(), ["c"])
+    self.assertEqual(selection.paths(), [self._paths[1]])
+    selection.intersect("c", "d", self._paths[1], self._paths[2])
+    self.assertEqual(selection.ids(), ["c"])
+    self.assertEqual(selection.paths(), [self._paths[1]])
+
+  def test_refresh(self):
+    self._selection.include(self._paths[1])
+    self._context._picture = copy.deepcopy(self._paths)
+    self.assertFalse(self._selection.selected(self._context._picture[1]))
+    self._selection.refresh()
+    self.assertTrue(self._selection.selected(self._context._picture[1]))
+
+
+if __name__ == "__main__":
+  unittest.main()
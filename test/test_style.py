@@ -0,0 +1,31 @@
+import unittest
+from english2tikz.utils import color_to_tk
+from english2tikz.gui.style import *
+
+
+class TestStyle(unittest.TestCase):
+  def test_shared(self):
+    a = {"type": "text", "id": "a", "text": "x", "fill": "blue!20"}
+    b = {"type": "text", "id": "b", "text": "y", "fill": "blue!20"}
+    self.assertIs(box_style(a), box_style(b))
+    self.assertEqual(box_style(a).fill_tk, "#ccccff")
+    b["dashed"] = True
+    self.assertIsNot(box_style(a), box_style(b))
+    self.assertEqual(box_style(b).dash, 2)
+
+  def test_path(self):
+    path = {"type": "path", "draw": True, "stealth": True,
+            "line.width": 2, "items": []}
+    style = path_style(path)
+    self.assertEqual((style.arrow, style.line_width), ("last", 5))
+    path["items"].append({"type": "line"})
+    self.assertIs(path_style(path), style)
+
+  def test_color(self):
+    self.assertEqual(color_to_tk("red!50!blue"), "#7f007f")
+    self.assertIs(color_to_tk("red!50!blue"), color_to_tk("red!50!blue"))
+    self.assertEqual(text_font(1), (text_font_family, font_size, "normal"))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+from english2tikz.gui.editor import Editor
+from english2tikz.test.mocks import MockCanvas, MockTk
+
+
+class RecordingTk(MockTk):
+  """
+  Keeps the callbacks given to after, for the test to run them
+  """
+  def __init__(self):
+    self.callbacks = []
+
+  def after(self, ms, f=None, *args):
+    if f is not None:
+      self.callbacks.append((f, args))
+
+
+class CountingSuggestor(object):
+  def __init__(self):
+    self.calls = 0
+
+  def suggest(self, editor, current, index, hint):
+    self.calls += 1
+    return []
+
+
+class TestSuggest(unittest.TestCase):
+  def setUp(self):
+    self.root = RecordingTk()
+    self.editor = Editor(self.root, MockCanvas(), 1200, 800)
+    self.suggest = self.editor._suggest
+    self.suggestors = [CountingSuggestor() for _ in range(3)]
+    self.suggest._suggestors = self.suggestors
+    self.suggest.activate()
+    self.root.callbacks = []
+
+  def _calls(self):
+    return [suggestor.calls for suggestor in self.suggestors]
+
+  def test_state_key(self):
+    self.assertEqual(self._calls(), [1, 1, 1])
+    self.suggest._propose_suggestions()
+    self.assertEqual(self._calls(), [1, 1, 1])
+    self.editor._picture_version += 1
+    self.suggest._propose_suggestions()
+    self.assertEqual(self._calls(), [2, 2, 2])
+    self.suggest._hint = {"direction": "left"}
+    self.suggest._propose_suggestions()
+    self.assertEqual(self._calls(), [3, 3, 3])
+    self.suggest._propose_suggestions()
+    self.assertEqual(self._calls(), [3, 3, 3])
+
+  def test_streaming(self):
+    with mock.patch("english2tikz.gui.suggest.suggest_frame_budget", 0):
+      self.editor._picture_version += 1
+      self.suggest._propose_suggestions()
+      self.assertEqual(self._calls(), [2, 1, 1])
+      self.assertTrue(self.suggest.pending())
+      self.assertEqual(len(self.root.callbacks), 1)
+      f, args = self.root.callbacks.pop()
+      f(*args)
+      self.assertEqual(self._calls(), [2, 2, 1])
+      stale, args = self.root.callbacks.pop()
+
+      """
+      A change of state starts over, and the callbacks of the previous
+      proposal do nothing
+      """
+      self.editor._picture_version += 1
+      self.suggest._propose_suggestions()
+      self.assertEqual(self._calls(), [3, 2, 1])
+      stale(*args)
+      self.assertEqual(self._calls(), [3, 2, 1])
+      while len(self.root.callbacks) > 0:
+        f, args = self.root.callbacks.pop(0)
+        f(*args)
+      self.assertEqual(self._calls(), [3, 3, 2])
+      self.assertFalse(self.suggest.pending())
+
+
+if __name__ == "__main__":
+  unittest.main()
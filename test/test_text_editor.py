@@ -0,0 +1,90 @@
+import random
+import unittest
+from english2tikz.gui.text_editor import TextEditor
+
+
+class Reference(object):
+  """
+  The text as a string and the cursor as an index
+  """
+  def __init__(self, s):
+    self.s, self.p = s, len(s)
+
+  def lines(self):
+    return self.s.split("\n")
+
+  def coordinate(self):
+    before = self.s[:self.p].split("\n")
+    return len(before[-1]), len(before) - 1
+
+  def set_coordinate(self, x, y):
+    lines = self.lines()
+    if 0 <= y < len(lines):
+      self.p = (sum(len(line) + 1 for line in lines[:y]) +
+                max(0, min(x, len(lines[y]))))
+
+
+class TestTextEditor(unittest.TestCase):
+  def test_api(self):
+    editor = TextEditor("ab\ncde")
+    self.assertEqual(editor.get_coordinate(), (3, 1))
+    editor.move_up()
+    self.assertEqual(editor.get_coordinate(), (2, 0))
+    editor.insert("x\ny")
+    self.assertEqual(str(editor), "abx\ny\ncde")
+    self.assertEqual(editor.view(), "abx\ny█\ncde")
+    editor.move_down()
+    editor.move_to_eol()
+    self.assertEqual(editor.char_under_cursor(), "e")
+    self.assertIsNone(editor.char_next_cursor())
+    editor.move_to_sol()
+    editor.delete()
+    self.assertEqual(editor.get_lines(), ["abx", "ycde"])
+    self.assertEqual(editor.get_position_by_coordinate(9, 0), 3)
+    self.assertIsNone(editor.get_position_by_coordinate(0, 2))
+    editor.set("a")
+    self.assertTrue(editor.at_end())
+    self.assertEqual(len(editor), 1)
+
+  def test_random(self):
+    rnd = random.Random(0)
+    editor, ref = TextEditor("start\n"), Reference("start\n")
+    for _ in range(3000):
+      op = rnd.randrange(6)
+      if op == 0:
+        c = rnd.choice(["a", "\n", "bc", "d\ne\n", "x" * 40])
+        editor.insert(c)
+        ref.s, ref.p = ref.s[:ref.p] + c + ref.s[ref.p:], ref.p + len(c)
+      elif op == 1:
+        editor.delete()
+        if ref.p > 0:
+          ref.s, ref.p = ref.s[:ref.p-1] + ref.s[ref.p:], ref.p - 1
+      elif op == 2:
+        offset = rnd.randint(-8, 8)
+        editor.move_cursor(offset)
+        ref.p = max(0, min(ref.p + offset, len(ref.s)))
+      elif op == 3:
+        x, y = ref.coordinate()
+        dx, dy = rnd.choice([(0, -1), (0, 1), (-1, 0), (1, 0)])
+        getattr(editor, {(0, -1): "move_up", (0, 1): "move_down",
+                         (-1, 0): "move_left", (1, 0): "move_right"}
+                [(dx, dy)])()
+        ref.set_coordinate(x + dx, y + dy)
+      elif op == 4:
+        x, y = rnd.randrange(50), rnd.randrange(10)
+        editor.set_coordinate(x, y)
+        ref.set_coordinate(x, y)
+      else:
+        if rnd.random() < 0.5:
+          editor.move_to_eol()
+          ref.set_coordinate(len(ref.s), ref.coordinate()[1])
+        else:
+          editor.move_to_sol()
+          ref.set_coordinate(0, ref.coordinate()[1])
+      self.assertEqual(str(editor), ref.s)
+      self.assertEqual(editor.get_coordinate(), ref.coordinate())
+      self.assertEqual(editor.view(), ref.s[:ref.p] + "█" + ref.s[ref.p:])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from english2tikz.test.mocks import MockCanvas
+from english2tikz.gui.display_list import DisplayList
+from english2tikz.gui.tiles import TileCache
+
+
+class ImageTarget(MockCanvas):
+  def __init__(self):
+    self.images = []
+    self.lines = []
+
+  def create_image(self, *args, **kwargs):
+    self.images.append((args, kwargs["image"]))
+
+  def create_line(self, *args, **kwargs):
+    self.lines.append(args)
+
+
+class TestTiles(unittest.TestCase):
+  def _record(self, cache, key, xs, origin=(0, 0)):
+    static, live = DisplayList(MockCanvas()), DisplayList(MockCanvas())
+    for x in xs:
+      static.create_line(x + origin[0], 10 + origin[1],
+                         x + origin[0], 20 + origin[1],
+                         fill="red", width=2)
+    live.create_line(origin[0], origin[1], origin[0] + 5, origin[1] + 5)
+    cache.record(key, 100, origin, static, live)
+
+  def test_invalidate_by_region(self):
+    cache = TileCache(photo_image=lambda img: img, size=100)
+    self._record(cache, 1, [10, 150])
+    target = ImageTarget()
+    cache.draw(target, 0, 0, 300, 300)
+    self.assertEqual(cache.rendered, 2)
+    self.assertEqual([args for args, _ in target.images],
+                     [(0, 0), (100, 0)])
+    self.assertEqual(target.lines, [(0, 0, 5, 5)])
+    img = target.images[0][1]
+    self.assertEqual(img.getpixel((10, 15))[:3], (255, 0, 0))
+    self.assertEqual(img.getpixel((50, 15))[3], 0)
+
+    """
+    Recorded after a scroll, with only the line in the second tile moved
+    """
+    self._record(cache, 2, [10, 160], origin=(30, 40))
+    target = ImageTarget()
+    cache.draw(target, 30, 40, 300, 300)
+    self.assertEqual(cache.rendered, 3)
+    self.assertEqual([args for args, _ in target.images],
+                     [(30, 40), (130, 40)])
+    self.assertEqual(target.lines, [(30, 40, 35, 45)])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+from english2tikz import utils
+from english2tikz.utils import *
+
+
+class TestDist(unittest.TestCase):
+  def setUp(self):
+    utils._parsed_dists.clear()
+
+  def test_get_dist(self):
+    obj = {"width": "1.5cm", "height": "2", "scale": 0.5, "x": "-3cm"}
+    self.assertEqual(get_dist(obj, "width"), 1.5)
+    self.assertEqual(get_dist(obj, "height"), 2.0)
+    self.assertEqual(get_num(obj, "scale"), 0.5)
+    self.assertEqual(get_dist(obj, "missing"), 0)
+    self.assertEqual(get_dist(obj, "missing", "1cm"), 1.0)
+    self.assertEqual(get_num(obj, "missing", 1), 1.0)
+    self.assertIsNone(get_dist_or_none(obj, "missing"))
+    self.assertEqual(get_dist_or_none(obj, "width"), 1.5)
+    self.assertEqual(get_xy(obj), (-3.0, 0.0))
+    self.assertEqual(get_xy(obj, "width", "height"), (1.5, 2.0))
+
+  def test_bad_input(self):
+    for value in ["wide", "1.5mm", "cm", ""]:
+      with self.assertRaises(ValueError):
+        get_dist({"width": value}, "width")
+      self.assertNotIn(value, utils._parsed_dists)
+    with self.assertRaises(TypeError):
+      get_dist({"width": None}, "width")
+
+  def test_cache(self):
+    obj = {"width": "1cm"}
+    self.assertEqual(get_dist(obj, "width"), 1.0)
+    self.assertEqual(utils._parsed_dists, {"1cm": 1.0})
+    obj["width"] = "2cm"
+    self.assertEqual(get_dist(obj, "width"), 2.0)
+    with mock.patch.object(utils, "_parsed_dists_limit", 3):
+      for i in range(3, 6):
+        get_dist({"width": f"{i}cm"}, "width")
+      self.assertLessEqual(len(utils._parsed_dists), 3)
+      self.assertIn("5cm", utils._parsed_dists)
+      self.assertNotIn("1cm", utils._parsed_dists)
+      self.assertEqual(get_dist(obj, "width"), 2.0)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,7 +1,9 @@
 import math
 import re
+import sys
 from datetime import datetime
 from english2tikz.errors import *
+from english2tikz.compact import is_mapping
 
 
 mutually_exclusive = [
@@ -141,11 +143,28 @@ def common_part(dics):
   return {key: dics[0][key] for key in keys}
 
 
+"""
+Parsed values of distance strings like "1.5cm". The attributes in the
+JSON objects are immutable strings, so writing a new value to an attribute
+simply looks up a different key here, and the cache never goes stale.
+"""
+_parsed_dists = {}
+_parsed_dists_limit = 1 << 16
+
+
 def _dist_to_num(dist):
   if isinstance(dist, str):
+    num = _parsed_dists.get(dist)
+    if num is not None:
+      return num
     if dist.endswith("cm"):
-      return float(dist[:-2])
-    return float(dist)
+      num = float(dist[:-2])
+    else:
+      num = float(dist)
+    if len(_parsed_dists) >= _parsed_dists_limit:
+      _parsed_dists.clear()
+    _parsed_dists[dist] = num
+    return num
   return float(dist)
 
 
@@ -157,6 +176,25 @@ def dist_to_num(*dists):
   return [_dist_to_num(dist) for dist in dists]
 
 
+def get_dist(dic, key, default=0):
+  return _dist_to_num(dic.get(key, default))
+
+
+def get_dist_or_none(dic, key):
+  value = dic.get(key)
+  if value is None:
+    return None
+  return _dist_to_num(value)
+
+
+def get_num(dic, key, default=0):
+  return _dist_to_num(dic.get(key, default))
+
+
+def get_xy(dic, xkey="x", ykey="y"):
+  return _dist_to_num(dic.get(xkey, 0)), _dist_to_num(dic.get(ykey, 0))
+
+
 def _num_to_dist(num):
   if isinstance(num, str):
     if num.endswith("cm"):
@@ -234,9 +272,23 @@ def smart_key_value(key, value):
   return ret
 
 
+"""
+The Tk colors of the xcolor expressions already parsed, interned
+"""
+_tk_colors = {}
+
+
 def color_to_tk(color):
   if color is None:
     return None
+  ret = _tk_colors.get(color)
+  if ret is None:
+    ret = sys.intern(_color_to_tk(color))
+    _tk_colors[color] = ret
+  return ret
+
+
+def _color_to_tk(color):
   if color == "":
     return ""
   if "!" in color:
@@ -412,7 +464,7 @@ def order(a, b):
 
 
 def get_type_if_dict(dic):
-  if not isinstance(dic, dict):
+  if not is_mapping(dic):
     return None
   return dic.get("type")
 